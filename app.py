@@ -1,29 +1,228 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import (Blueprint, Flask, current_app, g, render_template, request, redirect, url_for, flash, session,
+                   jsonify, Response, stream_with_context)
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.exc import IntegrityError, InterfaceError, OperationalError, TimeoutError as PoolTimeout
+from werkzeug.http import parse_content_range_header
+from werkzeug.local import LocalProxy
 from werkzeug.utils import secure_filename
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode
+import base64
+import click
+import functools
+import hashlib
+import itertools
+import json
+import math
 import os
+import re
+import threading
+import time
 import uuid
 from flask_cors import CORS
+from cache import create_cache
+from catalog import CatalogFormatError, FORMATS as CATALOG_FORMATS, detect_format, read_listings, write_listings
+from passwords import HashingBusy
+from uploads import UploadError, SHA256_PATTERN
+from preflight import read_report
+from pubsub import Broker
+from replicas import ReplicaSet, RoutingSession
+from serializers import Computed, DateTime, Field, FieldSelectionError, Schema, dumps as encode_json, requested_fields
+from instrumentation import Instrumentation
+from shipping import ShippingRatesUnavailable
+from snapshot import SnapshotUnavailable, write_snapshot
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)  # Enable CORS for React frontend
+MIGRATIONS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
 
-# Configuration
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-for-pressly')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///pressly.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static/uploads')
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload
-app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'ai', 'psd', 'eps', 'svg'}
+# Extensions and services
+# Nothing here touches the configuration, the filesystem or the database at import time.
+# create_app() binds the database to an app; each service is built for that app the first
+# time a request needs it, so a worker or serverless function only imports and allocates
+# what it actually uses (NumPy for matching, bcrypt's process pool, the rates HTTP session).
+# The schema is owned by the Alembic migrations in migrations/ (python init_db.py or flask db upgrade).
+# Sessions route the reads of replica_reads endpoints to read replicas (see replicas.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
-# Ensure the upload directory exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+SERVICE_BUILDERS = {}  # name -> function(app) returning the service
+services_lock = threading.Lock()
 
-# Initialize database
-db = SQLAlchemy(app)
+def app_service(name, build=True):
+    # The current app's instance of a service; with build=False, None until something has built it
+    services = current_app.extensions['pressly']
+    instance = services.get(name)
+    if instance is None and build:
+        with services_lock:
+            instance = services.get(name)
+            if instance is None:
+                instance = services[name] = SERVICE_BUILDERS[name](current_app)
+    return instance
+
+def loaded_service(name):
+    # A matrix or index service once it holds data; changes made before then are read when it loads
+    instance = app_service(name, build=False)
+    return instance if instance is not None and instance.loaded_at is not None else None
+
+def lazy_service(name, builder):
+    SERVICE_BUILDERS[name] = builder
+    return LocalProxy(lambda: app_service(name))
+
+def build_passwords(app):
+    from passwords import PasswordHasher
+    return PasswordHasher(app.config)
+
+def build_upload_store(app):
+    from uploads import UploadStore
+    return UploadStore(app.config['UPLOAD_FOLDER'], app.config['UPLOAD_TMP_FOLDER'],
+                       app.config['UPLOAD_MAX_FILE_SIZE'], app.config['ALLOWED_EXTENSIONS'])
+
+def build_preflight_queue(app):
+    from preflight import PreflightQueue
+    return PreflightQueue(app.config['PREFLIGHT_WORKERS'], app.config['PREFLIGHT_THUMBNAIL_SIZES'])
+
+def build_producer_matrix(app):
+    from matching import ProducerMatrix
+    return ProducerMatrix(app.config['MATCH_MATRIX_MAX_AGE'])
+
+def build_capacity_index(app):
+    from capacity import CapacityIndex
+    return CapacityIndex(app.config['CAPACITY_HORIZON_DAYS'], app.config['CAPACITY_INDEX_MAX_AGE'])
+
+def build_shipping_rates(app):
+    from shipping import ShippingRates
+    return ShippingRates(app.config)
+
+def build_replicas(app):
+    return ReplicaSet({name: db.engines[name] for name in replica_bind_keys(app)}, app.config['REPLICA_EJECT_SECONDS'],
+                      app.config['REPLICA_MAX_LAG'], app.config['REPLICA_CHECK_INTERVAL'], app.logger)
+
+def build_producer_snapshot(app):
+    from snapshot import ProducerSnapshot
+    return ProducerSnapshot(app.config['PRODUCER_SNAPSHOT_URL'], app.config['PRODUCER_SNAPSHOT_MAX_AGE'],
+                            app.config['PRODUCER_SNAPSHOT_TIMEOUT'], app.logger)
+
+# Response cache, password hashing, design-file storage and preflight, live message
+# delivery, request metrics, producer matching and capacity, shipping-rate lookups,
+# the precomputed producer snapshot, read replica health
+cache = lazy_service('cache', lambda app: create_cache(app.config))
+passwords = lazy_service('passwords', build_passwords)
+upload_store = lazy_service('upload_store', build_upload_store)
+preflight_queue = lazy_service('preflight_queue', build_preflight_queue)
+message_broker = lazy_service('message_broker', lambda app: Broker())
+instrumentation = lazy_service('instrumentation', lambda app: Instrumentation(app.config, app.logger))
+producer_matrix = lazy_service('producer_matrix', build_producer_matrix)
+capacity_index = lazy_service('capacity_index', build_capacity_index)
+shipping_rates = lazy_service('shipping_rates', build_shipping_rates)
+producer_snapshot = lazy_service('producer_snapshot', build_producer_snapshot)
+replicas = lazy_service('replicas', build_replicas)
+
+# Blueprints
+# Server-rendered pages and the JSON API; CLI commands hang off the app itself (flask reconcile-rollups)
+pages = Blueprint('pages', __name__)
+api = Blueprint('api', __name__, cli_group=None)
+
+# Application factory
+def create_app(config=None, migrations=None):
+    """Build a Pressly app.
+
+    `config` overrides the settings read from the environment. Migrations need
+    Flask-Migrate, which imports Alembic, so by default they are only set up when
+    running under the flask command; pass migrations=True to use them elsewhere.
+    """
+    app = Flask(__name__)
+    CORS(app)  # Enable CORS for React frontend
+
+    # Configuration
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-for-pressly')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///pressly.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))  # connections each worker keeps open
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 10))  # extra connections opened under bursts
+    app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('DB_POOL_TIMEOUT', 10))  # seconds to wait for a connection before answering 503
+    app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # seconds; replace connections before the server drops idle ones
+    app.config['DB_POOL_PRE_PING'] = os.environ.get('DB_POOL_PRE_PING', '1') != '0'  # test connections on checkout
+    app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static/uploads')
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max request body; larger files use chunked uploads
+    app.config['UPLOAD_TMP_FOLDER'] = os.path.join(app.instance_path, 'uploads')  # in-progress chunked uploads, not publicly served
+    app.config['UPLOAD_MAX_FILE_SIZE'] = int(os.environ.get('UPLOAD_MAX_FILE_SIZE', 2 * 1024 * 1024 * 1024))  # 2GB
+    app.config['UPLOAD_CHUNK_SIZE'] = 8 * 1024 * 1024  # suggested to clients; must stay below MAX_CONTENT_LENGTH
+    app.config['PREFLIGHT_WORKERS'] = int(os.environ.get('PREFLIGHT_WORKERS', 1))
+    app.config['PREFLIGHT_THUMBNAIL_SIZES'] = (256, 1024)
+    app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'ai', 'psd', 'eps', 'svg'}
+    app.config['CACHE_URL'] = os.environ.get('CACHE_URL')  # e.g. redis://localhost:6379/0; in-process LRU if unset
+    app.config['CACHE_TTL'] = int(os.environ.get('CACHE_TTL', 300))
+    app.config['CACHE_MAX_ENTRIES'] = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+    app.config['PASSWORD_HASH_SCHEME'] = os.environ.get('PASSWORD_HASH_SCHEME', 'bcrypt')  # or a werkzeug method, e.g. pbkdf2:sha256:600000
+    app.config['BCRYPT_ROUNDS'] = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))  # 0 hashes inline
+    app.config['PASSWORD_HASH_QUEUE_LIMIT'] = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 4 * app.config['PASSWORD_HASH_WORKERS']))
+    app.config['MESSAGE_POLL_TIMEOUT'] = int(os.environ.get('MESSAGE_POLL_TIMEOUT', 25))  # longest a long-poll request is held open
+    app.config['MESSAGE_STREAM_RESYNC'] = int(os.environ.get('MESSAGE_STREAM_RESYNC', 30))  # seconds between database catch-ups on open streams
+    app.config['METRICS_N_PLUS_ONE_THRESHOLD'] = int(os.environ.get('METRICS_N_PLUS_ONE_THRESHOLD', 10))  # warn when one statement runs more often in a request
+    app.config['PROFILE_SLOW_REQUESTS'] = float(os.environ['PROFILE_SLOW_REQUESTS']) if os.environ.get('PROFILE_SLOW_REQUESTS') else None  # seconds; unset disables the profiler
+    app.config['PROFILE_INTERVAL'] = float(os.environ.get('PROFILE_INTERVAL', 0.005))  # seconds between stack samples
+    app.config['PROFILE_FOLDER'] = os.path.join(app.instance_path, 'profiles')  # folded stacks of slow requests
+    app.config['MATCH_MATRIX_MAX_AGE'] = int(os.environ.get('MATCH_MATRIX_MAX_AGE', 300))  # seconds before the producer matrix is reloaded
+    app.config['CAPACITY_HORIZON_DAYS'] = int(os.environ.get('CAPACITY_HORIZON_DAYS', 90))  # how far ahead capacity can be queried and booked
+    app.config['CAPACITY_INDEX_MAX_AGE'] = int(os.environ.get('CAPACITY_INDEX_MAX_AGE', 300))  # seconds before the capacity index is reloaded
+    app.config['SHIPPING_RATES_URL'] = os.environ.get('SHIPPING_RATES_URL')  # external rates service; quotes answer 503 if unset
+    app.config['SHIPPING_RATES_API_KEY'] = os.environ.get('SHIPPING_RATES_API_KEY')
+    app.config['SHIPPING_RATES_CONNECT_TIMEOUT'] = float(os.environ.get('SHIPPING_RATES_CONNECT_TIMEOUT', 2))
+    app.config['SHIPPING_RATES_TIMEOUT'] = float(os.environ.get('SHIPPING_RATES_TIMEOUT', 10))  # seconds to wait for a quote
+    app.config['SHIPPING_RATES_POOL_SIZE'] = int(os.environ.get('SHIPPING_RATES_POOL_SIZE', 20))  # keep-alive connections to the rates service per worker
+    app.config['PRODUCER_SNAPSHOT_URL'] = os.environ.get('PRODUCER_SNAPSHOT_URL')  # http(s) URL or path of the exported snapshot; unset serves listings from the database
+    app.config['PRODUCER_SNAPSHOT_MAX_AGE'] = int(os.environ.get('PRODUCER_SNAPSHOT_MAX_AGE', 60))  # seconds between checks for a newer snapshot
+    app.config['PRODUCER_SNAPSHOT_TIMEOUT'] = float(os.environ.get('PRODUCER_SNAPSHOT_TIMEOUT', 5))  # seconds to wait for the snapshot source
+    app.config['PRODUCER_FEATURED_COUNT'] = int(os.environ.get('PRODUCER_FEATURED_COUNT', 12))
+    app.config['DESIGN_SYNC_LAG'] = int(os.environ.get('DESIGN_SYNC_LAG', 5))  # seconds design sync cursors trail the clock, longer than any write transaction
+    app.config['DATABASE_REPLICA_URLS'] = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]  # read replicas of DATABASE_URL for catalog and dashboard reads
+    app.config['REPLICA_STICKY_SECONDS'] = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))  # a client's reads stay on the primary this long after it writes; keep above normal replication lag
+    app.config['REPLICA_MAX_LAG'] = float(os.environ.get('REPLICA_MAX_LAG', 5))  # seconds a Postgres replica may fall behind before it stops serving reads
+    app.config['REPLICA_EJECT_SECONDS'] = int(os.environ.get('REPLICA_EJECT_SECONDS', 30))  # how long a replica whose connection failed is skipped
+    app.config['REPLICA_CHECK_INTERVAL'] = int(os.environ.get('REPLICA_CHECK_INTERVAL', 10))  # seconds between health and lag probes of each replica
+    app.config.update(config or {})
+
+    # Pool settings apply to server databases; SQLite connections are local files and
+    # an in-memory database must stay on its single static connection
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {
+            'pool_size': app.config['DB_POOL_SIZE'],
+            'max_overflow': app.config['DB_MAX_OVERFLOW'],
+            'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+            'pool_recycle': app.config['DB_POOL_RECYCLE'],
+            'pool_pre_ping': app.config['DB_POOL_PRE_PING'],
+        })
+    # Replicas are extra binds with the same pool settings; no model maps to them
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    for index, url in enumerate(app.config['DATABASE_REPLICA_URLS']):
+        pool_options = {} if url.startswith('sqlite') else app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        binds.setdefault(f'replica_{index}', {'url': url, **pool_options})
+
+    db.init_app(app)
+    if migrations or (migrations is None and click.get_current_context(silent=True) is not None):
+        init_migrations(app)
+
+    app.extensions['pressly'] = {}
+    with app.app_context():
+        # Request metrics hook every request, so they are built with the app rather than on first use
+        instrumentation.init_app(app, db.engines.values())
+
+    app.register_blueprint(pages)
+    app.register_blueprint(api)
+    return app
+
+def replica_bind_keys(app):
+    return [key for key in app.config['SQLALCHEMY_BINDS'] if key and key.startswith('replica_')]
+
+def init_migrations(app):
+    from flask_migrate import Migrate
+    Migrate(app, db, directory=MIGRATIONS_FOLDER)
+
+def __getattr__(name):
+    # `from app import app` (scripts, benchmarks, FLASK_APP=app.py) gets a full app, built on first use
+    if name == 'app':
+        app = globals()['app'] = create_app(migrations=True)
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 # Models
 class User(db.Model):
@@ -43,7 +242,7 @@ class User(db.Model):
 
 class Designer(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False, index=True)
     brand_name = db.Column(db.String(100), nullable=True)
     bio = db.Column(db.Text, nullable=True)
     portfolio_url = db.Column(db.String(255), nullable=True)
@@ -56,16 +255,33 @@ class Designer(db.Model):
 
 class Producer(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False, index=True)
     business_name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     production_capabilities = db.Column(db.JSON, nullable=True)
     rating = db.Column(db.Float, default=0.0)
     verified = db.Column(db.Boolean, default=False)
+    capacity = db.Column(db.Float, nullable=True)  # share of production capacity currently free, 0 to 1
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
     orders = db.relationship('Order', backref='producer', lazy=True)
+    
+    # Keyset pagination on the producer listing walks (joined_at, id); location search
+    # falls back to the (latitude, longitude) B-tree where there is no spatial index
+    __table_args__ = (
+        db.Index('ix_producer_joined_at_id', 'joined_at', 'id'),
+        db.Index('ix_producer_latitude_longitude', 'latitude', 'longitude'),
+    )
+
+class ProducerCapability(db.Model):
+    # Normalized copy of Producer.production_capabilities so search can match in SQL
+    producer_id = db.Column(db.String(36), db.ForeignKey('producer.id', ondelete='CASCADE'), primary_key=True)
+    capability = db.Column(db.String(50), primary_key=True)
+    
+    __table_args__ = (db.Index('ix_producer_capability_capability', 'capability', 'producer_id'),)
 
 class Design(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -79,13 +295,20 @@ class Design(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     licensing_terms = db.Column(db.JSON, nullable=True)
     file_path = db.Column(db.String(255), nullable=True)  # Path to uploaded design file
+    preflight_report = db.Column(db.JSON, nullable=True)  # Dimensions, DPI, color space and previews of the file
     
     # Relationships
     product_listings = db.relationship('ProductListing', backref='design', lazy=True, cascade='all, delete-orphan')
+    
+    # A designer's designs, optionally narrowed by status; sync reads them in update order
+    __table_args__ = (
+        db.Index('ix_design_designer_id_status', 'designer_id', 'status'),
+        db.Index('ix_design_designer_id_updated_at_id', 'designer_id', 'updated_at', 'id'),
+    )
 
 class ProductListing(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    design_id = db.Column(db.String(36), db.ForeignKey('design.id'), nullable=False)
+    design_id = db.Column(db.String(36), db.ForeignKey('design.id'), nullable=False, index=True)
     sku = db.Column(db.String(50), unique=True, nullable=False)
     base_price = db.Column(db.Float, nullable=False)
     available_sizes = db.Column(db.JSON, nullable=True)
@@ -102,171 +325,723 @@ class Order(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     customer_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
     producer_id = db.Column(db.String(36), db.ForeignKey('producer.id'), nullable=False)
-    product_listing_id = db.Column(db.String(36), db.ForeignKey('product_listing.id'), nullable=False)
+    product_listing_id = db.Column(db.String(36), db.ForeignKey('product_listing.id'), nullable=False, index=True)
     total_amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default='pending')  # pending, in_production, shipped, delivered, dispute
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     shipping_details = db.Column(db.JSON, nullable=True)
     payment_details = db.Column(db.JSON, nullable=True)
+    
+    # Producer work queues filter by status and page by age; the trailing columns make the index
+    # covering for the queue view. Customers list their orders newest first.
+    __table_args__ = (
+        db.Index('ix_order_producer_queue', 'producer_id', 'status', 'created_at', 'id', 'product_listing_id', 'total_amount'),
+        db.Index('ix_order_customer_id_created_at', 'customer_id', 'created_at'),
+    )
+
+class OrderRollup(db.Model):
+    # Order count and revenue per producer or designer and order status, kept for the dashboards
+    owner_type = db.Column(db.String(10), primary_key=True)  # 'producer' or 'designer'
+    owner_id = db.Column(db.String(36), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
 
 class Message(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     sender_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
     receiver_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
-    order_id = db.Column(db.String(36), db.ForeignKey('order.id'), nullable=True)
+    order_id = db.Column(db.String(36), db.ForeignKey('order.id'), nullable=True, index=True)
     content = db.Column(db.Text, nullable=False)
     sent_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
+    
+    # Inbox and unread counts filter by receiver and read state, newest first; the sent folder by sender.
+    # Inbox pages and conversation threads walk (sent_at, id) for keyset pagination.
+    __table_args__ = (
+        db.Index('ix_message_receiver_id_is_read_sent_at', 'receiver_id', 'is_read', 'sent_at'),
+        db.Index('ix_message_sender_id_sent_at', 'sender_id', 'sent_at'),
+        db.Index('ix_message_receiver_id_sent_at_id', 'receiver_id', 'sent_at', 'id'),
+        db.Index('ix_message_sender_id_receiver_id_sent_at_id', 'sender_id', 'receiver_id', 'sent_at', 'id'),
+    )
+
+class CapacitySlot(db.Model):
+    # Units of one capability a producer can run on one day, and how many are booked
+    producer_id = db.Column(db.String(36), db.ForeignKey('producer.id', ondelete='CASCADE'), primary_key=True)
+    capability = db.Column(db.String(50), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    capacity = db.Column(db.Integer, nullable=False)
+    booked = db.Column(db.Integer, nullable=False, default=0)
+
+class CapacityBooking(db.Model):
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    producer_id = db.Column(db.String(36), db.ForeignKey('producer.id'), nullable=False, index=True)
+    capability = db.Column(db.String(50), nullable=False)
+    order_id = db.Column(db.String(36), db.ForeignKey('order.id'), nullable=True, index=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    allocations = db.Column(db.JSON, nullable=False)  # [[day, units], ...]
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 # Helper functions
+def upsert_statement(dialect, table):
+    # INSERT ... ON CONFLICT for Postgres or SQLite, imported per dialect so SQLite deployments skip Postgres's
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+# Producer capability index
+CAPABILITY_MAX_LENGTH = ProducerCapability.__table__.c.capability.type.length
+
+class CapabilityError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+def normalize_capabilities(production_capabilities, strict=True):
+    # Capabilities are stored either as {'capabilities': [...]} or as a bare list.
+    # A name longer than the index column raises CapabilityError (a 400), or with
+    # strict=False is skipped, for data read back that no indexed producer can match
+    if isinstance(production_capabilities, dict):
+        production_capabilities = production_capabilities.get('capabilities')
+    if not isinstance(production_capabilities, (list, tuple)):
+        return []
+    names = {str(name).strip().lower() for name in production_capabilities}
+    too_long = sorted(name for name in names if len(name) > CAPABILITY_MAX_LENGTH)
+    if too_long and strict:
+        raise CapabilityError(f'Capability names can be at most {CAPABILITY_MAX_LENGTH} characters: {too_long[0][:20]}...')
+    return sorted(name for name in names if name and len(name) <= CAPABILITY_MAX_LENGTH)
+
+def capability_rows(producer_id, production_capabilities, strict=True):
+    return [{'producer_id': producer_id, 'capability': name}
+            for name in normalize_capabilities(production_capabilities, strict)]
+
+def sync_producer_capabilities(connection, producer_id, production_capabilities):
+    table = ProducerCapability.__table__
+    connection.execute(table.delete().where(table.c.producer_id == producer_id))
+    rows = capability_rows(producer_id, production_capabilities)
+    if rows:
+        connection.execute(table.insert(), rows)
+
+def rebuild_producer_capabilities():
+    # Backfill the index for rows written before it existed or outside the ORM
+    table = ProducerCapability.__table__
+    db.session.execute(table.delete())
+    rows = []
+    for producer_id, production_capabilities in db.session.query(Producer.id, Producer.production_capabilities):
+        # Rows stored before names were length-checked lose the names the index can't hold
+        rows.extend(capability_rows(producer_id, production_capabilities, strict=False))
+    if rows:
+        db.session.execute(table.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+@db.event.listens_for(Producer, 'after_insert')
+def producer_capabilities_inserted(mapper, connection, target):
+    sync_producer_capabilities(connection, target.id, target.production_capabilities)
+
+@db.event.listens_for(Producer, 'after_update')
+def producer_capabilities_updated(mapper, connection, target):
+    if db.inspect(target).attrs.production_capabilities.history.has_changes():
+        sync_producer_capabilities(connection, target.id, target.production_capabilities)
+
+@db.event.listens_for(Producer, 'after_delete')
+def producer_capabilities_deleted(mapper, connection, target):
+    sync_producer_capabilities(connection, target.id, None)
+
+# Producer read path
+# Producers and their users are fetched in one joined query that only loads the
+# columns the API returns, so listing N producers costs one round trip instead of N+1.
+PRODUCER_COLUMNS = (
+    Producer.id,
+    Producer.business_name,
+    Producer.description,
+    Producer.production_capabilities,
+    Producer.rating,
+    Producer.verified,
+    Producer.latitude,
+    Producer.longitude,
+    Producer.joined_at,
+    User.email,
+    User.full_name,
+    User.phone,
+)
+
+def producer_rows_query():
+    return db.session.query(*PRODUCER_COLUMNS).outerjoin(User, User.id == Producer.user_id)
+
+def producer_location(latitude, longitude):
+    return {'lat': latitude, 'lng': longitude} if latitude is not None and longitude is not None else None
+
+# Rows are turned into API objects by encoders compiled from these schemas (see serializers.py),
+# reading columns by position; queries may add columns after PRODUCER_COLUMNS. Listings shown
+# to anyone (featured, search, matching) leave out contact details
+PRODUCER_SCHEMA = Schema(
+    'producer',
+    Field('id'),
+    Field('businessName', 'business_name'),
+    Field('description'),
+    Field('capabilities', 'production_capabilities'),
+    Field('rating'),
+    Field('verified'),
+    Computed('location', producer_location, 'latitude', 'longitude'),
+    DateTime('joinedAt', 'joined_at'),
+    Field('fullName', 'full_name'),
+    Field('email'),
+    Field('phone'),
+    columns=[column.key for column in PRODUCER_COLUMNS],
+)
+PUBLIC_PRODUCER_SCHEMA = PRODUCER_SCHEMA.only('id', 'businessName', 'description', 'capabilities', 'rating', 'verified',
+                                              'location', 'joinedAt', 'fullName')
+
+def producer_row_to_dict(row, include_contact=True):
+    return (PRODUCER_SCHEMA if include_contact else PUBLIC_PRODUCER_SCHEMA).encoder()(row)
+
+# Producer full-text search
+# Postgres keeps a trigger-maintained, GIN-indexed tsvector column on producer;
+# SQLite keeps an FTS5 table in step through triggers. Both are created by the
+# migrations; databases without either fall back to ILIKE.
+def producer_search_backend():
+    backend = current_app.config.get('PRODUCER_SEARCH_BACKEND')
+    if backend is None:
+        inspector = db.inspect(db.engine)
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite' and inspector.has_table('producer_fts'):
+            backend = 'fts5'
+        elif dialect == 'postgresql' and 'search_vector' in {column['name'] for column in inspector.get_columns('producer')}:
+            backend = 'tsvector'
+        else:
+            backend = 'ilike'
+        current_app.config['PRODUCER_SEARCH_BACKEND'] = backend
+    return backend
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())[:8]
+
+def producer_text_search(query, text):
+    # Every term must match; terms are prefix-matched so the search box can query per keystroke
+    terms = search_terms(text)
+    backend = producer_search_backend()
+    
+    if not terms:
+        return query
+    
+    if backend == 'fts5':
+        matches = db.text(
+            "SELECT producer_id, bm25(producer_fts, 0.0, 10.0, 1.0) AS rank "
+            "FROM producer_fts WHERE producer_fts MATCH :match"
+        ).bindparams(match=' AND '.join(f'"{term}"*' for term in terms))
+        matches = matches.columns(producer_id=db.String, rank=db.Float).subquery('producer_fts_match')
+        return query.join(matches, matches.c.producer_id == Producer.id).order_by(matches.c.rank)
+    
+    if backend == 'tsvector':
+        vector = db.literal_column('producer.search_vector')
+        tsquery = db.func.to_tsquery('english', ' & '.join(f'{term}:*' for term in terms))
+        return query.filter(vector.op('@@')(tsquery)).order_by(db.func.ts_rank(vector, tsquery).desc())
+    
+    for term in terms:
+        # \w+ terms can contain _, which LIKE would treat as a wildcard
+        pattern = '%' + re.sub(r'([\\%_])', r'\\\1', term) + '%'
+        query = query.filter(Producer.business_name.ilike(pattern, escape='\\')
+                             | Producer.description.ilike(pattern, escape='\\'))
+    return query
+
+# Producer location search
+# SQLite keeps an R*Tree of producer coordinates in step through triggers; Postgres
+# has a GiST index on point(longitude, latitude). Both are created by the migrations;
+# other databases use the (latitude, longitude) B-tree. Radius and nearest queries
+# only fetch producers inside a bounding box found through the index and compute
+# great-circle distances for those.
+EARTH_RADIUS_KM = 6371.0
+NEAREST_START_RADIUS_KM = 50.0
+
+def producer_location_backend():
+    backend = current_app.config.get('PRODUCER_LOCATION_BACKEND')
+    if backend is None:
+        inspector = db.inspect(db.engine)
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite' and inspector.has_table('producer_rtree'):
+            backend = 'rtree'
+        elif dialect == 'postgresql' and 'ix_producer_location' in {index['name'] for index in inspector.get_indexes('producer')}:
+            backend = 'gist'
+        else:
+            backend = 'btree'
+        current_app.config['PRODUCER_LOCATION_BACKEND'] = backend
+    return backend
+
+def distance_km(latitude, longitude, other_latitude, other_longitude):
+    half_dlat = math.radians(other_latitude - latitude) / 2
+    half_dlon = math.radians(other_longitude - longitude) / 2
+    a = (math.sin(half_dlat) ** 2 +
+         math.cos(math.radians(latitude)) * math.cos(math.radians(other_latitude)) * math.sin(half_dlon) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+def bounding_box(latitude, longitude, radius_km):
+    # (min_lat, max_lat, min_lng, max_lng) around the circle; spans every longitude near
+    # the poles or across the antimeridian rather than splitting into two boxes
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return min_lat, max_lat, -180.0, 180.0
+    dlng = math.degrees(math.asin(min(math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude)), 1.0)))
+    if longitude - dlng < -180.0 or longitude + dlng > 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, longitude - dlng, longitude + dlng
+
+def producers_in_box(query, box):
+    min_lat, max_lat, min_lng, max_lng = box
+    backend = producer_location_backend()
+    
+    if backend == 'rtree':
+        matches = db.text(
+            "SELECT producer_id FROM producer_rtree "
+            "WHERE max_lat >= :min_lat AND min_lat <= :max_lat AND max_lng >= :min_lng AND min_lng <= :max_lng"
+        ).bindparams(min_lat=min_lat, max_lat=max_lat, min_lng=min_lng, max_lng=max_lng)
+        matches = matches.columns(producer_id=db.String).subquery('producer_rtree_match')
+        return query.join(matches, matches.c.producer_id == Producer.id)
+    
+    if backend == 'gist':
+        point = db.func.point(Producer.longitude, Producer.latitude)
+        box = db.func.box(db.func.point(min_lng, min_lat), db.func.point(max_lng, max_lat))
+        return query.filter(point.op('<@')(box))
+    
+    return query.filter(Producer.latitude.between(min_lat, max_lat), Producer.longitude.between(min_lng, max_lng))
+
+def producers_within(query, latitude, longitude, radius_km):
+    # (row, distance) pairs inside the circle, in the query's order; rows need latitude and longitude
+    for row in producers_in_box(query, bounding_box(latitude, longitude, radius_km)).yield_per(PRODUCER_STREAM_BATCH):
+        distance = distance_km(latitude, longitude, row.latitude, row.longitude)
+        if distance <= radius_km:
+            yield row, distance
+
+def nearest_producers(query, latitude, longitude, k, max_radius_km=None):
+    # Widens the box until it holds k producers within its inscribed circle (or hits the limit)
+    radius = min(NEAREST_START_RADIUS_KM, max_radius_km or NEAREST_START_RADIUS_KM)
+    limit = min(max_radius_km or math.pi * EARTH_RADIUS_KM, math.pi * EARTH_RADIUS_KM)
+    while True:
+        found = sorted(producers_within(query, latitude, longitude, radius), key=lambda match: match[1])
+        if len(found) >= k or radius >= limit:
+            return found[:k]
+        radius = min(radius * 4, limit)
+
+# Search ranking: share of requested capabilities matched, rating and verification
+SEARCH_CAPABILITY_WEIGHT = 0.6
+SEARCH_RATING_WEIGHT = 0.3
+SEARCH_VERIFIED_WEIGHT = 0.1
+
+def capability_match_query(query, capabilities, match_all=False):
+    # Filters and ranks producer rows in SQL using the capability index
+    capabilities = normalize_capabilities(capabilities)
+    score = (db.func.coalesce(Producer.rating, 0.0) * (SEARCH_RATING_WEIGHT / 5.0) +
+             db.case((Producer.verified == db.true(), SEARCH_VERIFIED_WEIGHT), else_=0.0))
+    
+    if capabilities:
+        matched = db.func.count(ProducerCapability.capability)
+        matches = (db.select(ProducerCapability.producer_id, matched.label('matched'))
+                   .where(ProducerCapability.capability.in_(capabilities))
+                   .group_by(ProducerCapability.producer_id))
+        if match_all:
+            matches = matches.having(matched == len(capabilities))
+        matches = matches.subquery()
+        query = query.join(matches, matches.c.producer_id == Producer.id)
+        score = score + matches.c.matched * (SEARCH_CAPABILITY_WEIGHT / len(capabilities))
+    
+    score = score.label('match_score')
+    return query.add_columns(score).order_by(score.desc(), Producer.id)
+
+# Keyset pagination
+# Cursors are opaque (timestamp, id) pairs; producers page over (joined_at, id)
+PRODUCER_PAGE_SIZE = 50
+PRODUCER_PAGE_MAX = 500
+PRODUCER_STREAM_BATCH = 1000
+
+def encode_cursor(timestamp, row_id):
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), str(row_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def producers_after(query, cursor=None):
+    if cursor:
+        joined_at, producer_id = decode_cursor(cursor)
+        # Row-value comparison lets the (joined_at, id) index seek straight to the cursor
+        query = query.filter(db.tuple_(Producer.joined_at, Producer.id) > db.tuple_(joined_at, producer_id))
+    return query.order_by(Producer.joined_at, Producer.id)
+
+# Read replicas
+# Catalog and dashboard endpoints are decorated with replica_reads: each request reads from
+# one replica, chosen round-robin among the healthy ones, and falls back to the next
+# replica or the primary when its connection fails. A response that wrote to the primary
+# sets a cookie that keeps that client's reads on the primary for REPLICA_STICKY_SECONDS,
+# so a client sees its own writes even when the replicas are behind.
+PRIMARY_READS_COOKIE = 'pressly_read_primary'
+
+def replica_reads(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config['DATABASE_REPLICA_URLS'] or PRIMARY_READS_COOKIE in request.cookies:
+            return view(*args, **kwargs)
+        failed = set()
+        while True:
+            g.read_replica = replicas.choose(exclude=failed)
+            if g.read_replica is None:
+                return view(*args, **kwargs)
+            try:
+                return view(*args, **kwargs)
+            except (OperationalError, InterfaceError) as e:
+                # The endpoint only reads, so it is safe to run again elsewhere
+                if g.get('wrote_primary'):
+                    raise
+                db.session.rollback()
+                replicas.eject(g.read_replica, e.orig)
+                failed.add(g.read_replica)
+    return wrapper
+
+def served_from_replica():
+    return g.get('read_replica') is not None and not g.get('wrote_primary')
+
+@api.after_app_request
+def keep_reads_on_primary_after_write(response):
+    if g.get('wrote_primary') and response.status_code < 400 and current_app.config['DATABASE_REPLICA_URLS']:
+        response.set_cookie(PRIMARY_READS_COOKIE, '1', max_age=current_app.config['REPLICA_STICKY_SECONDS'],
+                            httponly=True, samesite='Lax')
+    return response
+
+# Producer response cache
+# Profiles are keyed by producer id. Listings are keyed by a fingerprint of their
+# query string under a generation number that every producer change bumps.
+def producer_cache_key(producer_id):
+    return f'producer:{producer_id}'
+
+def producer_listing_cache_key(args):
+    generation = cache.get('producers:generation') or 0
+    fingerprint = hashlib.sha1(urlencode(sorted(args.items(multi=True))).encode()).hexdigest()
+    return f'producers:{generation}:{fingerprint}'
+
+def json_body_response(body, status=200):
+    # A body already encoded with encode_json
+    return Response(body, status=status, mimetype='application/json')
+
+def cached_json_response(key, build):
+    # Serves cached JSON with ETag/Last-Modified; a matching conditional request gets a 304 without touching the DB.
+    # build() returns a payload for the app's JSON provider, or bytes already encoded with encode_json
+    entry = cache.get(key)
+    if entry is None:
+        payload = build()
+        if payload is None:
+            return None
+        body = payload.decode() if isinstance(payload, bytes) else current_app.json.dumps(payload)
+        entry = {
+            'body': body,
+            'etag': hashlib.sha1(body.encode()).hexdigest(),
+            'lastModified': int(datetime.utcnow().timestamp())
+        }
+        # A lagging replica can rebuild an entry from before the change that invalidated it; keep those briefly
+        cache.set(key, entry, ttl=current_app.config['REPLICA_STICKY_SECONDS'] if served_from_replica() else None)
+    
+    response = Response(entry['body'], mimetype='application/json')
+    response.set_etag(entry['etag'])
+    response.last_modified = entry['lastModified']
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def queue_producer_invalidation(target, producer_ids):
+    # Entries are dropped after commit so a concurrent request can't re-cache uncommitted state
+    session = db.inspect(target).session
+    if session is not None:
+        session.info.setdefault('producer_cache_invalidations', set()).update(producer_ids)
+
+@db.event.listens_for(Producer, 'after_insert')
+@db.event.listens_for(Producer, 'after_update')
+@db.event.listens_for(Producer, 'after_delete')
+def producer_changed(mapper, connection, target):
+    queue_producer_invalidation(target, [target.id])
+
+@db.event.listens_for(User, 'after_insert')
+@db.event.listens_for(User, 'after_update')
+def user_changed(mapper, connection, target):
+    if target.user_type == 'producer':
+        producer_ids = connection.execute(db.select(Producer.id).where(Producer.user_id == target.id)).scalars().all()
+        queue_producer_invalidation(target, producer_ids)
+
+@db.event.listens_for(db.session, 'after_commit')
+def invalidate_producer_cache(session):
+    producer_ids = session.info.pop('producer_cache_invalidations', None)
+    if producer_ids is not None:
+        cache.delete(*(producer_cache_key(producer_id) for producer_id in producer_ids))
+        cache.incr('producers:generation')
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_producer_cache_invalidations(session):
+    session.info.pop('producer_cache_invalidations', None)
+
+# Featured producers: verified, best rated first, without contact details
+def featured_producer_rows():
+    # The listing order breaks rating ties, so the selection is stable between exports
+    return producer_rows_query().filter(Producer.verified.is_(True)) \
+        .order_by(Producer.rating.desc().nulls_last(), Producer.joined_at, Producer.id) \
+        .limit(current_app.config['PRODUCER_FEATURED_COUNT']).all()
+
+def featured_producers_cache_key(fields=None):
+    projection = ':' + ','.join(sorted(fields)) if fields else ''
+    return f"producers:{cache.get('producers:generation') or 0}:featured{projection}"
+
+# Producer snapshot
+# With PRODUCER_SNAPSHOT_URL set, the full producer listing and the featured selection
+# are served from an artifact that `flask export-snapshot` writes from the database,
+# so those requests never open a database connection (the serverless function serves
+# them from a warm container without one). Schedule the export every few minutes and
+# publish the file where PRODUCER_SNAPSHOT_URL points; see snapshot.py for the format.
+def export_producer_snapshot(path):
+    featured = [producer_row_to_dict(row, include_contact=False) for row in featured_producer_rows()]
+    rows = producers_after(producer_rows_query()) \
+        .execution_options(stream_results=True, yield_per=PRODUCER_STREAM_BATCH)
+    return write_snapshot(path, {
+        'producers': (producer_row_to_dict(row) for row in rows),
+        'featured': featured,
+    })
+
+@api.cli.command('export-snapshot')
+@click.argument('output', required=False)
+def export_snapshot_command(output):
+    """Write the producer listing and featured selection to a snapshot file."""
+    output = output or current_app.config['PRODUCER_SNAPSHOT_URL']
+    if not output or output.startswith(('http://', 'https://')):
+        raise click.UsageError('Give the file to write, then publish it where PRODUCER_SNAPSHOT_URL points')
+    documents = export_producer_snapshot(output[len('file://'):] if output.startswith('file://') else output)
+    for name, document in documents.items():
+        click.echo(f'{name}: {document.size} bytes of JSON, {len(document.body)} gzipped, ETag {document.etag}')
+
+def snapshot_response(name):
+    # The stored gzip bytes go out as they are; clients that don't accept gzip get them decompressed
+    document = producer_snapshot.document(name)
+    if request.accept_encodings['gzip']:
+        response = Response(document.body, mimetype='application/json')
+        response.content_encoding = 'gzip'
+        response.set_etag(document.etag + '-gzip')
+    else:
+        response = Response(document.decompress(), mimetype='application/json')
+        response.set_etag(document.etag)
+    response.vary.add('Accept-Encoding')
+    response.last_modified = producer_snapshot.generated_at
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 # Routes
-@app.route('/')
+@pages.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@pages.route('/register', methods=['GET', 'POST'])
 def register():
     # We'll use client-side localStorage for user registration in this version
     return render_template('register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@pages.route('/login', methods=['GET', 'POST'])
 def login():
     # We'll use client-side localStorage for authentication in this version
     return render_template('login.html')
 
-@app.route('/logout')
+@pages.route('/logout')
 def logout():
     # We'll use client-side localStorage for authentication in this version
-    return redirect(url_for('index'))
+    return redirect(url_for('pages.index'))
 
-@app.route('/designer/dashboard')
+@pages.route('/designer/dashboard')
 def designer_dashboard():
     # Authentication is handled client-side using localStorage in this version
     return render_template('designer_dashboard.html')
 
-@app.route('/producer/dashboard')
+@pages.route('/producer/dashboard')
 def producer_dashboard():
     # Authentication is handled client-side using localStorage in this version
     return render_template('producer_dashboard.html')
 
-@app.route('/designs', methods=['GET', 'POST'])
+@pages.route('/designs', methods=['GET', 'POST'])
 def designs():
     # Authentication is handled client-side using localStorage in this version
     return render_template('designs.html', designs=[])
 
-@app.route('/producers')
+@pages.route('/producers')
 def producers():
     # Authentication is handled client-side using localStorage in this version
     return render_template('producers.html', producers=[])
 
-@app.route('/messages')
+@pages.route('/messages')
 def messages():
     # Authentication is handled client-side using localStorage in this version
     return render_template('messages.html')
 
-@app.route('/capacity', methods=['GET', 'POST'])
+@pages.route('/capacity', methods=['GET', 'POST'])
 def capacity():
     # Authentication is handled client-side using localStorage in this version
     return render_template('capacity.html')
 
 # API routes for React frontend
+@api.route('/api/health', methods=['GET'])
+def api_health():
+    # Answers without touching the database, so it also measures a cold start
+    return jsonify({'status': 'ok'})
 
 # Enhanced Producer routes
-@app.route('/api/producers', methods=['GET'])
+@api.route('/api/producers', methods=['GET'])
+@replica_reads
 def api_producers():
-    producers = Producer.query.all()
-    result = []
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit')
+    fields = requested_fields(request.args.get('fields'))
+    
+    if current_app.config['PRODUCER_SNAPSHOT_URL'] and cursor is None and limit is None and fields is None \
+            and 'format' not in request.args:
+        return snapshot_response('producers')
+    
+    encode = PRODUCER_SCHEMA.encoder(fields)
+    try:
+        query = producers_after(producer_rows_query(), cursor)
+        if limit is not None:
+            limit = max(1, min(int(limit), PRODUCER_PAGE_MAX))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid cursor or limit'}), 400
+    
+    # NDJSON export: rows are streamed from a server-side cursor in batches,
+    # so memory stays flat no matter how many producers there are
+    if request.args.get('format') == 'ndjson':
+        if limit is not None:
+            query = query.limit(limit)
+        query = query.execution_options(stream_results=True, yield_per=PRODUCER_STREAM_BATCH)
+        
+        def generate():
+            for row in query:
+                yield encode_json(encode(row)) + b'\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
     
-    for producer in producers:
-        user = User.query.get(producer.user_id)
-        result.append({
-            'id': producer.id,
-            'businessName': producer.business_name,
-            'description': producer.description,
-            'capabilities': producer.production_capabilities,
-            'rating': producer.rating,
-            'verified': producer.verified,
-            'joinedAt': producer.joined_at.isoformat(),
-            'email': user.email if user else None,
-            'fullName': user.full_name if user else None,
-            'phone': user.phone if user else None
+    def build():
+        # Without paging parameters keep returning the full list for existing clients
+        if limit is None and cursor is None:
+            return encode_json(list(map(encode, query)))
+        
+        rows = query.limit((limit or PRODUCER_PAGE_SIZE) + 1).all()
+        page = rows[:limit or PRODUCER_PAGE_SIZE]
+        next_cursor = None
+        if len(rows) > len(page):
+            next_cursor = encode_cursor(page[-1].joined_at, page[-1].id)
+        
+        return encode_json({
+            'producers': list(map(encode, page)),
+            'nextCursor': next_cursor
         })
     
-    return jsonify(result)
+    return cached_json_response(producer_listing_cache_key(request.args), build)
 
-@app.route('/api/producers/<producer_id>', methods=['GET'])
+@api.route('/api/producers/<producer_id>', methods=['GET'])
+@replica_reads
 def api_producer(producer_id):
-    producer = Producer.query.get(producer_id)
+    fields = requested_fields(request.args.get('fields'))
+    encode = PRODUCER_SCHEMA.encoder(fields)
     
-    if not producer:
+    def build():
+        row = producer_rows_query().filter(Producer.id == producer_id).first()
+        return encode_json(encode(row)) if row else None
+    
+    if fields:
+        # Only the full profile is cached, since invalidation drops entries by producer id
+        body = build()
+        response = json_body_response(body) if body is not None else None
+    else:
+        response = cached_json_response(producer_cache_key(producer_id), build)
+    
+    if response is None:
         return jsonify({'success': False, 'message': 'Producer not found'}), 404
     
-    user = User.query.get(producer.user_id)
+    return response
+
+@api.route('/api/producers/featured', methods=['GET'])
+@replica_reads
+def api_featured_producers():
+    fields = requested_fields(request.args.get('fields'))
+    if current_app.config['PRODUCER_SNAPSHOT_URL'] and fields is None:
+        return snapshot_response('featured')
     
-    result = {
-        'id': producer.id,
-        'businessName': producer.business_name,
-        'description': producer.description,
-        'capabilities': producer.production_capabilities,
-        'rating': producer.rating,
-        'verified': producer.verified,
-        'joinedAt': producer.joined_at.isoformat(),
-        'email': user.email if user else None,
-        'fullName': user.full_name if user else None,
-        'phone': user.phone if user else None
-    }
+    encode = PUBLIC_PRODUCER_SCHEMA.encoder(fields)
     
-    return jsonify(result)
+    def build():
+        return encode_json(list(map(encode, featured_producer_rows())))
+    
+    return cached_json_response(featured_producers_cache_key(fields), build)
 
-@app.route('/api/producers/search', methods=['POST'])
+@api.route('/api/producers/search', methods=['POST'])
+@replica_reads
 def api_producers_search():
     data = request.json
     query = data.get('query', '')
     capabilities = data.get('capabilities', [])
-    location = data.get('location', 'all')
+    location = data.get('location', 'all')  # {'lat': ..., 'lng': ...}; any other value means anywhere
+    match_all = data.get('match', 'any') == 'all'
+    nearest = data.get('sort') == 'distance'
+    
+    try:
+        limit = max(1, min(int(data.get('limit', PRODUCER_PAGE_MAX)), PRODUCER_PAGE_MAX))
+        radius = float(data['radiusKm']) if data.get('radiusKm') is not None else None
+        if isinstance(location, dict):
+            latitude, longitude = float(location['lat']), float(location['lng'])
+        else:
+            latitude = longitude = None
+    except (TypeError, ValueError, KeyError):
+        return jsonify({'success': False, 'message': 'Invalid limit, location or radiusKm'}), 400
+    
+    if (radius is not None or nearest) and latitude is None:
+        return jsonify({'success': False, 'message': 'radiusKm and sort=distance need a location'}), 400
     
     # Base query
-    producers_query = Producer.query
+    producers_query = producer_rows_query()
     
-    # Apply filters
+    # Text relevance orders results first, capability ranking breaks ties
     if query:
-        producers_query = producers_query.filter(Producer.business_name.ilike(f'%{query}%') | 
-                                              Producer.description.ilike(f'%{query}%'))
+        producers_query = producer_text_search(producers_query, query)
     
-    # Execute query
-    producers = producers_query.all()
-    result = []
+    # Capability filtering ('any' or 'all' of the requested ones) and ranking run in SQL
+    producers_query = capability_match_query(producers_query, capabilities, match_all)
     
-    for producer in producers:
-        user = User.query.get(producer.user_id)
-        
-        # Filter by capabilities (if producer.production_capabilities is a dict with a 'capabilities' key)
-        if capabilities and producer.production_capabilities and 'capabilities' in producer.production_capabilities:
-            producer_capabilities = producer.production_capabilities.get('capabilities', [])
-            if not any(capability in producer_capabilities for capability in capabilities):
-                continue
-        
-        result.append({
-            'id': producer.id,
-            'businessName': producer.business_name,
-            'description': producer.description,
-            'capabilities': producer.production_capabilities,
-            'rating': producer.rating,
-            'verified': producer.verified,
-            'joinedAt': producer.joined_at.isoformat(),
-            'fullName': user.full_name if user else None
-        })
+    # Nearest first (k-nearest), or relevance order inside a radius, both pruned by the location index
+    if nearest:
+        matches = nearest_producers(producers_query, latitude, longitude, limit, radius)
+    elif radius is not None:
+        matches = itertools.islice(producers_within(producers_query, latitude, longitude, radius), limit)
+    else:
+        matches = ((row, None) for row in producers_query.limit(limit))
     
-    return jsonify(result)
+    encode = PUBLIC_PRODUCER_SCHEMA.encoder()
+    result = []
+    for row, distance in matches:
+        producer = encode(row)
+        producer['matchScore'] = round(row.match_score, 4)
+        if latitude is not None:
+            if distance is None and row.latitude is not None and row.longitude is not None:
+                distance = distance_km(latitude, longitude, row.latitude, row.longitude)
+            producer['distanceKm'] = round(distance, 1) if distance is not None else None
+        result.append(producer)
+    
+    return json_body_response(encode_json(result))
 
-@app.route('/api/register', methods=['POST'])
+@api.route('/api/register', methods=['POST'])
 def api_register():
     data = request.json
     
+    if not data.get('email') or not data.get('password'):
+        return jsonify({'success': False, 'message': 'Email and password are required'}), 400
+    
     # Same logic as register route but returns JSON
     existing_user = User.query.filter_by(email=data.get('email')).first()
     if existing_user:
@@ -275,7 +1050,7 @@ def api_register():
     # Create new user
     new_user = User(
         email=data.get('email'),
-        password_hash=generate_password_hash(data.get('password')),
+        password_hash=passwords.hash(data.get('password')),
         full_name=data.get('fullName'),
         phone=data.get('phone'),
         user_type=data.get('userType')
@@ -290,7 +1065,10 @@ def api_register():
     elif data.get('userType') == 'producer':
         new_producer = Producer(
             user_id=new_user.id,
-            business_name=data.get('businessName', '')
+            business_name=data.get('businessName', ''),
+            capacity=data.get('capacity'),
+            latitude=data.get('latitude'),
+            longitude=data.get('longitude')
         )
         db.session.add(new_producer)
     
@@ -298,13 +1076,20 @@ def api_register():
     
     return jsonify({'success': True, 'message': 'Registration successful'})
 
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
 def api_login():
     data = request.json
     
     user = User.query.filter_by(email=data.get('email')).first()
     
-    if user and check_password_hash(user.password_hash, data.get('password')):
+    matches, needs_rehash = passwords.verify(user.password_hash, data.get('password')) if user else (False, False)
+    
+    if matches:
+        # Legacy werkzeug hashes and outdated cost settings are upgraded transparently
+        if needs_rehash:
+            user.password_hash = passwords.hash(data.get('password'))
+            db.session.commit()
+        
         return jsonify({
             'success': True,
             'user': {
@@ -317,19 +1102,1595 @@ def api_login():
     else:
         return jsonify({'success': False, 'message': 'Invalid credentials'}), 401
 
-# Initialize the database
-with app.app_context():
-    db.create_all()
+# Designs
+# A designer's library is synced incrementally: a client keeps the cursor from its last
+# sync and gets back only the designs created, changed or deleted since, read in
+# (updated_at, id) order from ix_design_designer_id_updated_at_id. Deleting a design
+# deactivates it (orders keep their listings), so the deletion reaches clients as a
+# tombstone. Cursors trail the clock by DESIGN_SYNC_LAG seconds: a write stamped just
+# before a sync but committed just after it is still sent next time, and designs in
+# that window may arrive twice, which applying a delta tolerates.
+DESIGN_SYNC_PAGE_SIZE = 500
+DESIGN_SYNC_PAGE_MAX = 1000
+DESIGN_BATCH_MAX = 500
+DESIGN_STATUSES = ('draft', 'active', 'archived')
+# Writable fields: API name -> column
+DESIGN_FIELDS = {
+    'title': 'title',
+    'description': 'description',
+    'specifications': 'specifications',
+    'status': 'status',
+    'licensingTerms': 'licensing_terms',
+}
+
+def design_to_dict(design):
+    result = {
+        'id': design.id,
+        'designerId': design.designer_id,
+        'title': design.title,
+        'description': design.description,
+        'specifications': design.specifications,
+        'status': design.status,
+        'licensingTerms': design.licensing_terms,
+        'filePath': design.file_path,
+        'preflightStatus': (design.preflight_report or {}).get('status'),
+        'thumbnails': {},
+        'createdAt': design.created_at.isoformat(),
+        'updatedAt': design.updated_at.isoformat()
+    }
+    if design.file_path and design.preflight_report:
+        result['thumbnails'] = preflight_thumbnail_urls(preflight_paths(design.file_path)[2], design.preflight_report)
+    return result
+
+def resolve_designer_id(designer_id):
+    # The pages sign in client-side and only know the user's id, so a designer's user id is accepted too
+    return db.session.execute(db.select(Designer.id).where(
+        db.or_(Designer.id == designer_id, Designer.user_id == designer_id))).scalar()
+
+def design_changes(designer_id, cursor=None, limit=DESIGN_SYNC_PAGE_SIZE):
+    # Without a cursor this is a full sync, which only needs the designs that still exist
+    query = Design.query.filter(Design.designer_id == designer_id)
+    if cursor:
+        updated_at, design_id = decode_cursor(cursor)
+        query = query.filter(db.tuple_(Design.updated_at, Design.id) > db.tuple_(updated_at, design_id))
+    else:
+        query = query.filter(Design.is_active == db.true())
+    return query.order_by(Design.updated_at, Design.id).limit(limit + 1).all()
+
+def design_sync_page(designer_id, cursor, limit):
+    started_at = datetime.utcnow()
+    rows = design_changes(designer_id, cursor, limit)
+    page = rows[:limit]
+    has_more = len(rows) > len(page)
+    next_cursor = encode_cursor(page[-1].updated_at, page[-1].id) if page else cursor
+    if not has_more:
+        # The last page leaves the cursor DESIGN_SYNC_LAG behind the clock so late commits are picked up
+        horizon = started_at - timedelta(seconds=current_app.config['DESIGN_SYNC_LAG'])
+        if next_cursor is None or decode_cursor(next_cursor) > (horizon, ''):
+            next_cursor = encode_cursor(horizon, '')
+    return {
+        'designs': [design_to_dict(design) for design in page if design.is_active],
+        'deleted': [design.id for design in page if not design.is_active],
+        'cursor': next_cursor,
+        'hasMore': has_more
+    }
+
+def design_values(item, creating):
+    # Returns (column values, None) for a valid change, or (None, message)
+    values = {}
+    for field, column in DESIGN_FIELDS.items():
+        if field in item:
+            values[column] = item[field]
+    if creating or 'title' in values:
+        if not isinstance(values.get('title'), str) or not values['title'].strip() or len(values['title']) > 100:
+            return None, 'title must be 1 to 100 characters'
+    if values.get('description') is not None and not isinstance(values['description'], str):
+        return None, 'description must be a string'
+    for column in ('specifications', 'licensing_terms'):
+        if values.get(column) is not None and not isinstance(values[column], dict):
+            return None, f'{column} must be an object'
+    if 'status' in values and values['status'] not in DESIGN_STATUSES:
+        return None, f'status must be one of {", ".join(DESIGN_STATUSES)}'
+    return values, None
+
+def save_designs(designer_id, changes, deleted):
+    """Create, update and delete a batch of a designer's designs in one transaction.
+
+    Changes with an unknown or missing id create designs; clients should send
+    their own UUIDs so a retried batch doesn't create duplicates. Returns the
+    saved designs, the deleted ids and per-item errors.
+    """
+    errors = []
+    by_id = {}
+    for index, item in enumerate(changes):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'message': 'Each design must be an object'})
+            continue
+        try:
+            design_id = str(uuid.UUID(item['id'])) if item.get('id') is not None else str(uuid.uuid4())
+        except (TypeError, ValueError, AttributeError):
+            errors.append({'index': index, 'message': 'id must be a UUID'})
+            continue
+        # A design changed twice in one batch keeps its last change
+        by_id[design_id] = (index, item)
+    
+    existing = {row.id: row for row in db.session.execute(
+        db.select(Design.id, Design.designer_id, Design.is_active).where(Design.id.in_(by_id)))}
+    now = datetime.utcnow()
+    inserts = []
+    updates = []
+    for design_id, (index, item) in by_id.items():
+        current = existing.get(design_id)
+        if current is not None and (current.designer_id != designer_id or not current.is_active):
+            errors.append({'index': index, 'message': 'Design not found'})
+            continue
+        values, error = design_values(item, creating=current is None)
+        if error:
+            errors.append({'index': index, 'message': error})
+        elif current is None:
+            inserts.append(dict({'status': 'draft', 'description': None, 'specifications': None,
+                                 'licensing_terms': None}, **values, id=design_id, designer_id=designer_id,
+                                is_active=True, created_at=now, updated_at=now))
+        else:
+            updates.append(dict(values, id=design_id, updated_at=now))
+    
+    removed = []
+    if deleted:
+        removed = db.session.execute(db.select(Design.id).where(
+            Design.id.in_(deleted), Design.designer_id == designer_id, Design.is_active == db.true())).scalars().all()
+        errors.extend({'id': design_id, 'message': 'Design not found'} for design_id in set(deleted) - set(removed))
+    
+    if inserts:
+        db.session.execute(Design.__table__.insert(), inserts)
+    if updates:
+        db.session.execute(db.update(Design), updates)
+    if removed:
+        db.session.execute(db.update(Design).where(Design.id.in_(removed))
+                           .values(is_active=False, updated_at=now).execution_options(synchronize_session=False))
+        # Listings of a deleted design can't be ordered any more
+        db.session.execute(db.update(ProductListing).where(ProductListing.design_id.in_(removed))
+                           .values(is_active=False, updated_at=now).execution_options(synchronize_session=False))
+    db.session.commit()
+    
+    saved_ids = [row['id'] for row in inserts + updates]
+    saved = Design.query.filter(Design.id.in_(saved_ids)).order_by(Design.updated_at, Design.id).all() if saved_ids else []
+    return [design_to_dict(design) for design in saved], removed, errors
+
+@api.route('/api/designers/<designer_id>/designs', methods=['GET'])
+def api_designer_designs(designer_id):
+    # ?since=<cursor from the last sync>; pages while hasMore, then keep the final cursor
+    designer_id = resolve_designer_id(designer_id)
+    if not designer_id:
+        return jsonify({'success': False, 'message': 'Designer not found'}), 404
+    
+    try:
+        limit = max(1, min(int(request.args.get('limit', DESIGN_SYNC_PAGE_SIZE)), DESIGN_SYNC_PAGE_MAX))
+        return jsonify(design_sync_page(designer_id, request.args.get('since'), limit))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid cursor or limit'}), 400
+
+@api.route('/api/designers/<designer_id>/designs', methods=['POST'])
+def api_save_designs(designer_id):
+    # Accepts {'designs': [...], 'deleted': [ids]}; valid changes are saved even if others in the batch fail
+    data = request.get_json(silent=True) or {}
+    changes = data.get('designs', [])
+    deleted = data.get('deleted', [])
+    
+    designer_id = resolve_designer_id(designer_id)
+    if not designer_id:
+        return jsonify({'success': False, 'message': 'Designer not found'}), 404
+    if not isinstance(changes, list) or not isinstance(deleted, list) or not all(isinstance(i, str) for i in deleted):
+        return jsonify({'success': False, 'message': 'designs must be a list and deleted a list of ids'}), 400
+    if not (changes or deleted) or len(changes) + len(deleted) > DESIGN_BATCH_MAX:
+        return jsonify({'success': False, 'message': f'Send between 1 and {DESIGN_BATCH_MAX} changes'}), 400
+    
+    saved, removed, errors = save_designs(designer_id, changes, deleted)
+    success = bool(saved or removed)
+    return jsonify({'success': success, 'designs': saved, 'deleted': removed, 'errors': errors}), 200 if success else 400
+
+# Chunked design-file uploads
+# POST creates an upload (or completes it instantly when the sha256 is already stored),
+# PUT appends a chunk described by Content-Range, GET reports the offset to resume from.
+def attach_upload(result):
+    design_id = result['metadata'].get('designId')
+    if design_id:
+        Design.query.filter_by(id=design_id).update({'file_path': result['path'], 'preflight_report': {'status': 'pending'}})
+        db.session.commit()
+        queue_preflight(design_id, result['path'])
+
+# Design file preflight
+# Reports and previews are cached per file content under static/uploads/previews
+def preflight_paths(file_path):
+    name = os.path.basename(file_path)
+    key = name if SHA256_PATTERN.match(name) else hashlib.sha256(file_path.encode()).hexdigest()
+    source = os.path.join(current_app.config['UPLOAD_FOLDER'], file_path)
+    output_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'previews', key[:2], key)
+    return key, source, output_dir
+
+def preflight_thumbnail_urls(output_dir, report):
+    preview_root = os.path.relpath(output_dir, os.path.join(current_app.root_path, 'static'))
+    return {size: url_for('static', filename=f'{preview_root}/{name}')
+            for size, name in report.get('thumbnails', {}).items()}
+
+def queue_preflight(design_id, file_path):
+    key, source, output_dir = preflight_paths(file_path)
+    app = current_app._get_current_object()
+    
+    def record(report):
+        # Runs on the pool's callback thread, outside the request
+        with app.app_context():
+            Design.query.filter_by(id=design_id, file_path=file_path).update({'preflight_report': report})
+            db.session.commit()
+    
+    preflight_queue.submit(key, source, output_dir, record)
+
+@api.route('/api/designs/<design_id>/preflight', methods=['GET'])
+def api_design_preflight(design_id):
+    design = db.session.get(Design, design_id)
+    
+    if not design or not design.file_path:
+        return jsonify({'success': False, 'message': 'Design file not found'}), 404
+    
+    key, source, output_dir = preflight_paths(design.file_path)
+    report = design.preflight_report
+    if not report or report.get('status') == 'pending':
+        # The queue lives in memory, so requeue work lost to a restart
+        if not preflight_queue.in_flight(key):
+            queue_preflight(design.id, design.file_path)
+        report = read_report(output_dir)
+        if report is None:
+            return jsonify({'status': 'pending'}), 202
+    
+    return jsonify(dict(report, thumbnails=preflight_thumbnail_urls(output_dir, report)))
+
+@api.route('/api/uploads', methods=['POST'])
+def api_upload_create():
+    data = request.json or {}
+    filename = secure_filename(data.get('filename', ''))
+    design_id = data.get('designId')
+    
+    if not allowed_file(filename):
+        return jsonify({'success': False, 'message': 'File type not allowed'}), 415
+    if design_id and not db.session.get(Design, design_id):
+        return jsonify({'success': False, 'message': 'Design not found'}), 404
+    
+    result = upload_store.create(filename, data.get('size'), data.get('sha256'), {'designId': design_id})
+    if result['complete']:
+        attach_upload(result)
+        return jsonify(result)
+    
+    result['chunkSize'] = current_app.config['UPLOAD_CHUNK_SIZE']
+    return jsonify(result), 201
+
+@api.route('/api/uploads/<upload_id>', methods=['PUT'])
+def api_upload_chunk(upload_id):
+    content_range = parse_content_range_header(request.headers.get('Content-Range'))
+    length = request.content_length
+    
+    if content_range is None or content_range.stop - content_range.start != length:
+        return jsonify({'success': False, 'message': 'A Content-Range matching the body is required'}), 400
+    
+    # request.stream is read in blocks, so the chunk never sits in memory as a whole
+    result = upload_store.write_chunk(upload_id, content_range.start, request.stream, length)
+    if result['complete']:
+        attach_upload(result)
+    
+    return jsonify(result)
+
+@api.route('/api/uploads/<upload_id>', methods=['GET'])
+def api_upload_status(upload_id):
+    return jsonify(upload_store.status(upload_id))
+
+@api.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def api_upload_discard(upload_id):
+    upload_store.discard(upload_id)
+    return jsonify({'success': True})
+
+# Messaging
+# Folders and threads are paged newest first over (sent_at, id). New messages are
+# published to the receiver's open long-poll and SSE connections after commit, so
+# idle clients wait on the in-process broker instead of polling the database.
+MESSAGE_PAGE_SIZE = 50
+MESSAGE_PAGE_MAX = 200
+MESSAGE_STREAM_HEARTBEAT = 15
+
+def message_to_dict(message):
+    return {
+        'id': message.id,
+        'senderId': message.sender_id,
+        'receiverId': message.receiver_id,
+        'orderId': message.order_id,
+        'content': message.content,
+        'sentAt': message.sent_at.isoformat(),
+        'isRead': message.is_read
+    }
+
+def message_channel(user_id):
+    return f'messages:{user_id}'
+
+def message_user_id():
+    # Authentication is handled client-side in this version, so callers name the user they act as
+    return request.args.get('userId') or (request.get_json(silent=True) or {}).get('userId')
+
+def message_page_limit():
+    return max(1, min(int(request.args.get('limit', MESSAGE_PAGE_SIZE)), MESSAGE_PAGE_MAX))
+
+def messages_before(query, cursor=None):
+    if cursor:
+        sent_at, message_id = decode_cursor(cursor)
+        query = query.filter(db.tuple_(Message.sent_at, Message.id) < db.tuple_(sent_at, message_id))
+    return query.order_by(Message.sent_at.desc(), Message.id.desc())
+
+def messages_received_after(user_id, cursor):
+    # Oldest first, for catching a client up from the last message it saw
+    query = Message.query.filter(Message.receiver_id == user_id)
+    if cursor:
+        sent_at, message_id = decode_cursor(cursor)
+        query = query.filter(db.tuple_(Message.sent_at, Message.id) > db.tuple_(sent_at, message_id))
+    return query.order_by(Message.sent_at, Message.id).limit(MESSAGE_PAGE_MAX).all()
+
+def latest_message_cursor(user_id):
+    newest = messages_before(db.session.query(Message.sent_at, Message.id).filter(Message.receiver_id == user_id)).first()
+    return encode_cursor(newest.sent_at, newest.id) if newest else None
+
+def message_page(query, cursor, limit):
+    rows = messages_before(query, cursor).limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > len(page):
+        next_cursor = encode_cursor(page[-1].sent_at, page[-1].id)
+    return {'messages': [message_to_dict(message) for message in page], 'nextCursor': next_cursor}
+
+def unread_message_count(user_id):
+    return db.session.query(db.func.count(Message.id)).filter(
+        Message.receiver_id == user_id, Message.is_read == db.false()).scalar()
+
+def message_position(message):
+    return datetime.fromisoformat(message['sentAt']), message['id']
+
+def message_events_after(events, cursor):
+    # Drops messages the client already has and returns the cursor after the newest one
+    position = decode_cursor(cursor) if cursor else None
+    fresh = []
+    for event in events:
+        if event['type'] == 'message':
+            if position is not None and message_position(event['message']) <= position:
+                continue
+            position = message_position(event['message'])
+        fresh.append(event)
+    return fresh, encode_cursor(*position) if position else cursor
+
+@db.event.listens_for(Message, 'after_insert')
+def message_inserted(mapper, connection, target):
+    session = db.inspect(target).session
+    if session is not None:
+        session.info.setdefault('message_events', []).append(
+            (target.receiver_id, {'type': 'message', 'message': message_to_dict(target)}))
+
+@db.event.listens_for(db.session, 'after_commit')
+def publish_message_events(session):
+    for user_id, event in session.info.pop('message_events', ()):
+        message_broker.publish(message_channel(user_id), event)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_message_events(session):
+    session.info.pop('message_events', None)
+
+@api.route('/api/messages', methods=['GET'])
+def api_messages():
+    user_id = message_user_id()
+    folder = request.args.get('folder', 'inbox')
+    
+    if not user_id:
+        return jsonify({'success': False, 'message': 'userId is required'}), 400
+    
+    if folder == 'inbox':
+        query = Message.query.filter(Message.receiver_id == user_id)
+    elif folder == 'unread':
+        query = Message.query.filter(Message.receiver_id == user_id, Message.is_read == db.false())
+    elif folder == 'sent':
+        query = Message.query.filter(Message.sender_id == user_id)
+    else:
+        return jsonify({'success': False, 'message': 'Unknown folder'}), 400
+    
+    try:
+        return jsonify(message_page(query, request.args.get('cursor'), message_page_limit()))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid cursor or limit'}), 400
+
+@api.route('/api/messages', methods=['POST'])
+def api_send_message():
+    data = request.json or {}
+    content = (data.get('content') or '').strip()
+    
+    if not data.get('senderId') or not content:
+        return jsonify({'success': False, 'message': 'senderId and content are required'}), 400
+    if not all(isinstance(data.get(key), str) for key in ('senderId', 'receiverId', 'orderId') if data.get(key)):
+        return jsonify({'success': False, 'message': 'senderId, receiverId and orderId must be strings'}), 400
+    # Checked here so a bad id is a 404 rather than a foreign key violation on insert
+    if not db.session.get(User, data['senderId']):
+        return jsonify({'success': False, 'message': 'Sender not found'}), 404
+    if not db.session.get(User, data.get('receiverId') or ''):
+        return jsonify({'success': False, 'message': 'Recipient not found'}), 404
+    if data.get('orderId') and not db.session.get(Order, data['orderId']):
+        return jsonify({'success': False, 'message': 'Order not found'}), 404
+    
+    message = Message(
+        sender_id=data['senderId'],
+        receiver_id=data['receiverId'],
+        order_id=data.get('orderId'),
+        content=content
+    )
+    db.session.add(message)
+    db.session.commit()
+    
+    return jsonify(message_to_dict(message)), 201
+
+@api.route('/api/messages/threads/<other_user_id>', methods=['GET'])
+def api_message_thread(other_user_id):
+    user_id = message_user_id()
+    
+    if not user_id:
+        return jsonify({'success': False, 'message': 'userId is required'}), 400
+    
+    # Each direction is an equality match on the (sender_id, receiver_id, sent_at, id) index
+    query = Message.query.filter(db.or_(
+        db.and_(Message.sender_id == user_id, Message.receiver_id == other_user_id),
+        db.and_(Message.sender_id == other_user_id, Message.receiver_id == user_id)
+    ))
+    
+    try:
+        return jsonify(message_page(query, request.args.get('cursor'), message_page_limit()))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid cursor or limit'}), 400
+
+@api.route('/api/messages/unread-count', methods=['GET'])
+def api_unread_message_count():
+    user_id = message_user_id()
+    
+    if not user_id:
+        return jsonify({'success': False, 'message': 'userId is required'}), 400
+    
+    return jsonify({'unreadCount': unread_message_count(user_id)})
+
+@api.route('/api/messages/read', methods=['POST'])
+def api_mark_messages_read():
+    data = request.json or {}
+    user_id = data.get('userId')
+    
+    if not user_id:
+        return jsonify({'success': False, 'message': 'userId is required'}), 400
+    ids, sender_id = data.get('ids'), data.get('senderId')
+    if (not isinstance(user_id, str) or (ids is not None and not isinstance(ids, list))
+            or not all(isinstance(id, str) for id in ids or []) or (sender_id is not None and not isinstance(sender_id, str))):
+        return jsonify({'success': False, 'message': 'userId and senderId must be strings and ids a list of strings'}), 400
+    
+    # One UPDATE for the given ids, a whole conversation, or everything when neither is given
+    query = Message.query.filter(Message.receiver_id == user_id, Message.is_read == db.false())
+    if ids:
+        query = query.filter(Message.id.in_(ids))
+    elif sender_id:
+        query = query.filter(Message.sender_id == sender_id)
+    updated = query.update({'is_read': True}, synchronize_session=False)
+    db.session.commit()
+    
+    unread_count = unread_message_count(user_id)
+    if updated:
+        # Other open tabs of the same user refresh their badge
+        message_broker.publish(message_channel(user_id), {'type': 'read', 'unreadCount': unread_count})
+    
+    return jsonify({'success': True, 'updated': updated, 'unreadCount': unread_count})
+
+@api.route('/api/messages/poll', methods=['GET'])
+def api_poll_messages():
+    # Long-poll: answers as soon as something arrives after the cursor, or empty after the timeout
+    user_id = message_user_id()
+    
+    if not user_id:
+        return jsonify({'success': False, 'message': 'userId is required'}), 400
+    
+    try:
+        timeout = min(float(request.args.get('timeout', current_app.config['MESSAGE_POLL_TIMEOUT'])),
+                      current_app.config['MESSAGE_POLL_TIMEOUT'])
+        # Subscribe before reading so nothing committed in between is missed
+        with message_broker.subscribe(message_channel(user_id)) as subscription:
+            cursor = request.args.get('cursor') or latest_message_cursor(user_id)
+            events = [{'type': 'message', 'message': message_to_dict(message)}
+                      for message in messages_received_after(user_id, cursor)]
+            # Give the connection back to the pool while waiting
+            db.session.close()
+            if not events and timeout > 0:
+                events = subscription.wait(timeout)
+            events, cursor = message_events_after(events, cursor)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid cursor or timeout'}), 400
+    
+    return jsonify({'events': events, 'cursor': cursor})
+
+@api.route('/api/messages/stream', methods=['GET'])
+def api_stream_messages():
+    # Server-Sent Events; the event id is a cursor, so EventSource resumes via Last-Event-ID
+    user_id = message_user_id()
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+    
+    if not user_id:
+        return jsonify({'success': False, 'message': 'userId is required'}), 400
+    
+    try:
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+    
+    resync = current_app.config['MESSAGE_STREAM_RESYNC']
+    app = current_app._get_current_object()
+    # The body is read after the request's app context is gone, so resolve the service now
+    broker = message_broker._get_current_object()
+    
+    def catch_up(cursor):
+        # Picks up messages missed before connecting or published by other worker processes
+        with app.app_context():
+            if cursor is None:
+                return [], latest_message_cursor(user_id)
+            return [{'type': 'message', 'message': message_to_dict(message)}
+                    for message in messages_received_after(user_id, cursor)], cursor
+    
+    def generate():
+        position = cursor
+        # Subscribed before the first catch-up so nothing committed in between is missed
+        with broker.subscribe(message_channel(user_id)) as subscription:
+            yield 'retry: 3000\n\n'
+            events, position = catch_up(position)
+            next_resync = time.monotonic() + resync
+            while True:
+                if resync and time.monotonic() >= next_resync:
+                    missed, position = catch_up(position)
+                    events.extend(missed)
+                    next_resync = time.monotonic() + resync
+                if not events:
+                    events = subscription.wait(min(MESSAGE_STREAM_HEARTBEAT, resync or MESSAGE_STREAM_HEARTBEAT))
+                    if not events:
+                        yield ': keep-alive\n\n'
+                        continue
+                events, position = message_events_after(events, position)
+                for event in events:
+                    data = json.dumps(event, separators=(',', ':'))
+                    if event['type'] == 'message':
+                        event_id = encode_cursor(*message_position(event['message']))
+                        yield f'id: {event_id}\nevent: message\ndata: {data}\n\n'
+                    else:
+                        yield f'event: {event["type"]}\ndata: {data}\n\n'
+                events = []
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # keep nginx from buffering the stream
+    return response
+
+# Product listing catalog
+# Designers import whole collections as CSV or NDJSON (see catalog.py), through the API
+# or `flask import-listings`. Rows are read from the stream and validated in batches of
+# LISTING_IMPORT_BATCH with one design lookup each; every batch is one INSERT ... ON
+# CONFLICT (sku) upsert in its own transaction, so memory stays flat however long the
+# file is and an invalid row is reported without failing the rest of its batch.
+LISTING_IMPORT_BATCH = 1000
+LISTING_IMPORT_ERRORS_MAX = 1000  # errors reported row by row; any beyond are only counted
+LISTING_EXPORT_BATCH = 1000
+LISTING_UPSERT_COLUMNS = ('design_id', 'base_price', 'available_sizes', 'available_colors',
+                          'printing_requirements', 'is_active', 'updated_at')
+LISTING_COLUMNS = (
+    ProductListing.sku,
+    ProductListing.design_id,
+    ProductListing.base_price,
+    ProductListing.available_sizes,
+    ProductListing.available_colors,
+    ProductListing.printing_requirements,
+    ProductListing.is_active,
+)
+
+def listing_row_to_record(row):
+    return {
+        'sku': row.sku,
+        'designId': row.design_id,
+        'basePrice': row.base_price,
+        'availableSizes': row.available_sizes,
+        'availableColors': row.available_colors,
+        'printingRequirements': row.printing_requirements,
+        'isActive': row.is_active
+    }
+
+def listing_row(record, designs, now):
+    # Returns (row, None) for a valid record, or (None, message)
+    sku = record.get('sku')
+    sku = sku.strip() if isinstance(sku, str) else ''
+    if not sku or len(sku) > 50:
+        return None, 'sku must be 1 to 50 characters'
+    if not isinstance(record.get('designId'), str) or record['designId'] not in designs:
+        return None, 'Design not found'
+    base_price = record.get('basePrice')
+    try:
+        base_price = float(base_price) if not isinstance(base_price, bool) else None
+    except (TypeError, ValueError):
+        base_price = None
+    if base_price is None or not math.isfinite(base_price) or base_price < 0:
+        return None, 'Invalid basePrice'
+    for field in ('availableSizes', 'availableColors'):
+        values = record.get(field)
+        if values is not None and not (isinstance(values, list) and all(isinstance(value, str) for value in values)):
+            return None, f'{field} must be a list of strings'
+    if record.get('printingRequirements') is not None and not isinstance(record['printingRequirements'], dict):
+        return None, 'printingRequirements must be an object'
+    is_active = record.get('isActive', True)
+    if not isinstance(is_active, bool):
+        return None, 'isActive must be true or false'
+    return {
+        'id': str(uuid.uuid4()),
+        'design_id': record['designId'],
+        'sku': sku,
+        'base_price': base_price,
+        'available_sizes': record.get('availableSizes'),
+        'available_colors': record.get('availableColors'),
+        'printing_requirements': record.get('printingRequirements'),
+        'is_active': is_active,
+        'created_at': now,
+        'updated_at': now
+    }, None
+
+def upsert_listings(rows):
+    # New skus are inserted; existing ones keep their id and created_at and take everything else
+    table = ProductListing.__table__
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = upsert_statement(dialect, table)
+        connection.execute(insert.on_conflict_do_update(
+            index_elements=[table.c.sku],
+            set_={name: insert.excluded[name] for name in LISTING_UPSERT_COLUMNS}), rows)
+        return
+    
+    for row in rows:
+        result = connection.execute(table.update().where(table.c.sku == row['sku'])
+                                    .values({name: row[name] for name in LISTING_UPSERT_COLUMNS}))
+        if result.rowcount == 0:
+            connection.execute(table.insert(), row)
+
+def import_listing_batch(batch, report):
+    # batch is (line, record) pairs; returns how many listings were written
+    design_ids = {record.get('designId') for _, record in batch if isinstance(record.get('designId'), str)}
+    designs = set(db.session.execute(db.select(Design.id).where(Design.id.in_(design_ids))).scalars())
+    now = datetime.utcnow()
+    rows = {}
+    for line, record in batch:
+        row, error = listing_row(record, designs, now)
+        if error:
+            report(line, record.get('sku'), error)
+        else:
+            # A sku repeated within a batch keeps its last row, as if the rows were written in order
+            rows[row['sku']] = (line, row)
+    if not rows:
+        db.session.rollback()
+        return 0
+    
+    try:
+        upsert_listings([row for _, row in rows.values()])
+        db.session.commit()
+        return len(rows)
+    except IntegrityError:
+        db.session.rollback()
+    
+    # Something changed under the batch (e.g. a design was deleted); write it row by row to find the culprits
+    written = 0
+    for line, row in rows.values():
+        try:
+            upsert_listings([row])
+            db.session.commit()
+            written += 1
+        except IntegrityError:
+            db.session.rollback()
+            report(line, row['sku'], 'Listing could not be written')
+    return written
+
+def import_listings(lines):
+    """Upsert listings from (line number, record, error) tuples as read_listings yields them.
+
+    Returns the number of listings written and failed, with the first
+    LISTING_IMPORT_ERRORS_MAX failures by line.
+    """
+    summary = {'written': 0, 'failed': 0, 'errors': []}
+    
+    def report(line, sku, message):
+        summary['failed'] += 1
+        if len(summary['errors']) < LISTING_IMPORT_ERRORS_MAX:
+            summary['errors'].append({'line': line, 'sku': sku, 'message': message})
+    
+    batch = []
+    for line, record, error in lines:
+        if error:
+            report(line, None, error)
+            continue
+        batch.append((line, record))
+        if len(batch) >= LISTING_IMPORT_BATCH:
+            summary['written'] += import_listing_batch(batch, report)
+            batch = []
+    if batch:
+        summary['written'] += import_listing_batch(batch, report)
+    return summary
+
+def listing_records(design_id=None, designer_id=None):
+    # Streams listings in sku order from a server-side cursor
+    query = db.select(*LISTING_COLUMNS).order_by(ProductListing.sku)
+    if design_id:
+        query = query.where(ProductListing.design_id == design_id)
+    if designer_id:
+        query = query.join(Design, Design.id == ProductListing.design_id).where(Design.designer_id == designer_id)
+    rows = db.session.execute(query.execution_options(stream_results=True, yield_per=LISTING_EXPORT_BATCH))
+    return (listing_row_to_record(row) for row in rows)
+
+@api.route('/api/listings/import', methods=['POST'])
+def api_import_listings():
+    # The body is the CSV or NDJSON file itself; rows are upserted on sku
+    format_name = detect_format(request.args.get('format'), request.content_type)
+    summary = import_listings(read_listings(request.stream, format_name))
+    status = 200 if summary['written'] or not summary['failed'] else 400
+    return jsonify({'success': status == 200, **summary}), status
+
+@api.route('/api/listings/export', methods=['GET'])
+@replica_reads
+def api_export_listings():
+    format_name = detect_format(request.args.get('format', 'ndjson'))
+    records = listing_records(request.args.get('designId'), request.args.get('designerId'))
+    response = Response(stream_with_context(write_listings(records, format_name)),
+                        mimetype=CATALOG_FORMATS[format_name])
+    response.headers['Content-Disposition'] = f'attachment; filename=listings.{format_name}'
+    return response
+
+def catalog_file_format(format_name, filename):
+    # --format, or the file's extension
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    format_name = format_name or {'jsonl': 'ndjson'}.get(extension, extension)
+    if format_name not in CATALOG_FORMATS:
+        raise click.UsageError('Pass --format csv or --format ndjson')
+    return format_name
+
+@api.cli.command('import-listings')
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'format_name', type=click.Choice(list(CATALOG_FORMATS)))
+def import_listings_command(source, format_name):
+    """Upsert product listings from a CSV or NDJSON file ('-' reads stdin)."""
+    try:
+        summary = import_listings(read_listings(source, catalog_file_format(format_name, source.name)))
+    except CatalogFormatError as e:
+        raise click.UsageError(e.message)
+    for error in summary['errors']:
+        click.echo(f"line {error['line']}: {error['message']}", err=True)
+    click.echo(f"Wrote {summary['written']} listings, {summary['failed']} rows failed")
+
+@api.cli.command('export-listings')
+@click.argument('output', type=click.File('w', encoding='utf-8'), default='-')
+@click.option('--format', 'format_name', type=click.Choice(list(CATALOG_FORMATS)))
+@click.option('--design-id')
+@click.option('--designer-id')
+def export_listings_command(output, format_name, design_id, designer_id):
+    """Write product listings as CSV or NDJSON ('-' writes stdout)."""
+    format_name = format_name or ('ndjson' if output.name == '<stdout>' else catalog_file_format(None, output.name))
+    for chunk in write_listings(listing_records(design_id, designer_id), format_name):
+        output.write(chunk)
+
+# Orders
+# Orders are created and moved through their lifecycle in batches: a batch of new orders
+# is one multi-row INSERT and a status change is one UPDATE that only matches orders
+# whose current status may move to the requested one.
+ORDER_TRANSITIONS = {
+    'pending': ('in_production', 'dispute'),
+    'in_production': ('shipped', 'dispute'),
+    'shipped': ('delivered', 'dispute'),
+    'delivered': ('dispute',),
+    'dispute': ('in_production', 'delivered'),
+}
+ORDER_BATCH_MAX = 1000
+ORDER_PAGE_SIZE = 50
+ORDER_PAGE_MAX = 500
+
+# Every work-queue column is part of ix_order_producer_queue, so the queue is read from the index alone
+ORDER_QUEUE_COLUMNS = (
+    Order.id,
+    Order.status,
+    Order.created_at,
+    Order.product_listing_id,
+    Order.total_amount,
+)
+
+def order_to_dict(order):
+    return {
+        'id': order.id,
+        'customerId': order.customer_id,
+        'producerId': order.producer_id,
+        'productListingId': order.product_listing_id,
+        'totalAmount': order.total_amount,
+        'status': order.status,
+        'createdAt': order.created_at.isoformat()
+    }
+
+# A work-queue row as the queue endpoint returns it
+ORDER_QUEUE_SCHEMA = Schema(
+    'order',
+    Field('id'),
+    Field('status'),
+    DateTime('createdAt', 'created_at'),
+    Field('productListingId', 'product_listing_id'),
+    Field('totalAmount', 'total_amount'),
+    columns=[column.key for column in ORDER_QUEUE_COLUMNS],
+)
+
+def order_sources(status):
+    return [source for source, targets in ORDER_TRANSITIONS.items() if status in targets]
+
+def order_queue_query(producer_id, status, cursor=None):
+    # Oldest first, so producers work through their queue in arrival order
+    query = db.session.query(*ORDER_QUEUE_COLUMNS).filter(Order.producer_id == producer_id, Order.status == status)
+    if cursor:
+        created_at, order_id = decode_cursor(cursor)
+        query = query.filter(db.tuple_(Order.created_at, Order.id) > db.tuple_(created_at, order_id))
+    return query.order_by(Order.created_at, Order.id)
+
+def transition_orders(order_ids, status, producer_id=None):
+    # Returns the ids that moved; orders in any other state are left untouched by the guard
+    guard = [Order.id.in_(order_ids), Order.status.in_(order_sources(status))]
+    if producer_id:
+        guard.append(Order.producer_id == producer_id)
+    
+    # Lock the matching orders and read what the rollups need before moving them
+    moving = db.session.execute(
+        db.select(Order.id, Order.producer_id, Design.designer_id, Order.status, Order.total_amount)
+        .join(ProductListing, ProductListing.id == Order.product_listing_id)
+        .join(Design, Design.id == ProductListing.design_id)
+        .where(*guard)
+        .with_for_update(of=Order)).all()
+    if not moving:
+        db.session.commit()
+        return []
+    
+    # Each UPDATE matches the status the rollup delta is computed from. FOR UPDATE is a no-op on
+    # SQLite, so an overlapping transition may have moved an order since it was read; it then
+    # matches nothing here and only the transition that actually moved it counts it
+    by_status = {}
+    for row in moving:
+        by_status.setdefault(row.status, []).append(row)
+    
+    now = datetime.utcnow()
+    moved = set()
+    for source, rows in by_status.items():
+        statement = (db.update(Order)
+                     .where(Order.status == source, *guard[2:])
+                     .values(status=status, updated_at=now)
+                     .execution_options(synchronize_session=False))
+        if db.engine.dialect.update_returning:
+            ids = [row.id for row in rows]
+            moved.update(db.session.execute(statement.where(Order.id.in_(ids)).returning(Order.id)).scalars())
+        else:
+            # Without RETURNING, one statement per order tells from its rowcount whether it moved
+            moved.update(row.id for row in rows if db.session.execute(statement.where(Order.id == row.id)).rowcount)
+    
+    updated = [row.id for row in moving if row.id in moved]
+    deltas = {}
+    for row in moving:
+        if row.id in moved:
+            add_rollup_delta(deltas, row.producer_id, row.designer_id, row.status, row.total_amount, -1)
+            add_rollup_delta(deltas, row.producer_id, row.designer_id, status, row.total_amount, 1)
+    apply_rollup_deltas(db.session.connection(), deltas)
+    db.session.commit()
+    return updated
+
+def new_order_rows(items):
+    # Validates a batch with one lookup per referenced table; returns (rows, per-item errors)
+    def ids(key):
+        # Only strings are looked up, so a list or object id fails its item instead of the set
+        return {item.get(key) for item in items if isinstance(item.get(key), str)}
+    
+    listing_ids = ids('productListingId')
+    producer_ids = ids('producerId')
+    customer_ids = ids('customerId')
+    listings = dict(db.session.query(ProductListing.id, ProductListing.base_price)
+                    .filter(ProductListing.id.in_(listing_ids), ProductListing.is_active == db.true()))
+    producers = set(db.session.execute(db.select(Producer.id).where(Producer.id.in_(producer_ids))).scalars())
+    customers = set(db.session.execute(db.select(User.id).where(User.id.in_(customer_ids))).scalars())
+    
+    now = datetime.utcnow()
+    rows = []
+    errors = []
+    for index, item in enumerate(items):
+        total_amount = item.get('totalAmount', listings.get(item.get('productListingId')))
+        if not all(isinstance(item.get(key), str) for key in ('customerId', 'producerId', 'productListingId')):
+            errors.append({'index': index, 'message': 'customerId, producerId and productListingId must be strings'})
+        elif item['customerId'] not in customers:
+            errors.append({'index': index, 'message': 'Customer not found'})
+        elif item['producerId'] not in producers:
+            errors.append({'index': index, 'message': 'Producer not found'})
+        elif item['productListingId'] not in listings:
+            errors.append({'index': index, 'message': 'Product listing not found or inactive'})
+        elif (not isinstance(total_amount, (int, float)) or isinstance(total_amount, bool)
+              or not math.isfinite(total_amount) or total_amount < 0):
+            errors.append({'index': index, 'message': 'Invalid totalAmount'})
+        else:
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'customer_id': item['customerId'],
+                'producer_id': item['producerId'],
+                'product_listing_id': item['productListingId'],
+                'total_amount': float(total_amount),
+                'status': 'pending',
+                'created_at': now,
+                'updated_at': now,
+                'shipping_details': item.get('shippingDetails'),
+                'payment_details': item.get('paymentDetails')
+            })
+    return rows, errors
+
+@api.route('/api/orders', methods=['POST'])
+def api_create_orders():
+    # Accepts one order or {'orders': [...]}; valid orders are created even if others in the batch fail
+    data = request.json or {}
+    items = data['orders'] if isinstance(data.get('orders'), list) else [data]
+    
+    if not items or len(items) > ORDER_BATCH_MAX:
+        return jsonify({'success': False, 'message': f'Send between 1 and {ORDER_BATCH_MAX} orders'}), 400
+    if not all(isinstance(item, dict) for item in items):
+        return jsonify({'success': False, 'message': 'Each order must be an object'}), 400
+    
+    rows, errors = new_order_rows(items)
+    if rows:
+        db.session.execute(Order.__table__.insert(), rows)
+        connection = db.session.connection()
+        orders = [(row['producer_id'], row['product_listing_id'], row['status'], row['total_amount']) for row in rows]
+        apply_rollup_deltas(connection, order_rollup_delta(connection, orders, 1))
+        db.session.commit()
+    
+    created = [{'id': row['id'], 'customerId': row['customer_id'], 'producerId': row['producer_id'],
+                'productListingId': row['product_listing_id'], 'totalAmount': row['total_amount'],
+                'status': row['status'], 'createdAt': row['created_at'].isoformat()} for row in rows]
+    return jsonify({'success': bool(rows), 'created': created, 'errors': errors}), 201 if rows else 400
+
+@api.route('/api/orders/<order_id>', methods=['GET'])
+def api_order(order_id):
+    order = db.session.get(Order, order_id)
+    
+    if not order:
+        return jsonify({'success': False, 'message': 'Order not found'}), 404
+    
+    return jsonify(order_to_dict(order))
+
+@api.route('/api/orders/transition', methods=['POST'])
+def api_transition_orders():
+    data = request.json or {}
+    status = data.get('status')
+    order_ids = data.get('ids')
+    
+    if status not in ORDER_TRANSITIONS:
+        return jsonify({'success': False, 'message': 'Unknown status'}), 400
+    if not isinstance(order_ids, list) or not order_ids or len(order_ids) > ORDER_BATCH_MAX:
+        return jsonify({'success': False, 'message': f'Send between 1 and {ORDER_BATCH_MAX} order ids'}), 400
+    
+    order_ids = list(dict.fromkeys(str(order_id) for order_id in order_ids))
+    updated = transition_orders(order_ids, status, data.get('producerId'))
+    
+    # Report why the rest did not move: their current status, or null when the order doesn't exist
+    moved = set(updated)
+    unmoved = [order_id for order_id in order_ids if order_id not in moved]
+    current = dict(db.session.query(Order.id, Order.status).filter(Order.id.in_(unmoved))) if unmoved else {}
+    rejected = [{'id': order_id, 'status': current.get(order_id)} for order_id in unmoved]
+    
+    return jsonify({'success': True, 'status': status, 'updated': updated, 'rejected': rejected})
+
+@api.route('/api/producers/<producer_id>/orders', methods=['GET'])
+@replica_reads
+def api_producer_orders(producer_id):
+    status = request.args.get('status', 'pending')
+    
+    if status not in ORDER_TRANSITIONS:
+        return jsonify({'success': False, 'message': 'Unknown status'}), 400
+    
+    encode = ORDER_QUEUE_SCHEMA.encoder(requested_fields(request.args.get('fields')))
+    try:
+        limit = max(1, min(int(request.args.get('limit', ORDER_PAGE_SIZE)), ORDER_PAGE_MAX))
+        rows = order_queue_query(producer_id, status, request.args.get('cursor')).limit(limit + 1).all()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid cursor or limit'}), 400
+    
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > len(page):
+        next_cursor = encode_cursor(page[-1].created_at, page[-1].id)
+    
+    return json_body_response(encode_json({'orders': list(map(encode, page)), 'nextCursor': next_cursor}))
+
+@api.route('/api/producers/<producer_id>/orders/counts', methods=['GET'])
+@replica_reads
+def api_producer_order_counts(producer_id):
+    counts = dict.fromkeys(ORDER_TRANSITIONS, 0)
+    counts.update((row.status, row.order_count) for row in order_rollup_rows('producer', producer_id))
+    return jsonify(counts)
+
+# Dashboard rollups
+# order_rollup keeps the order count and revenue per (producer or designer, status), so a
+# dashboard reads at most one row per status however long the owner's order history is.
+# Orders written through the ORM adjust it from mapper events; the bulk order endpoints,
+# which bypass those, apply their deltas in the same transaction. `flask reconcile-rollups`
+# recomputes it from the orders table and corrects any drift; run it periodically.
+ROLLUP_REVENUE_TOLERANCE = 0.005
+
+def listing_designers(connection, listing_ids):
+    query = (db.select(ProductListing.id, Design.designer_id)
+             .join(Design, Design.id == ProductListing.design_id)
+             .where(ProductListing.id.in_(listing_ids)))
+    return dict(connection.execute(query).all())
+
+def add_rollup_delta(deltas, producer_id, designer_id, status, amount, sign):
+    for owner_type, owner_id in (('producer', producer_id), ('designer', designer_id)):
+        if owner_id is not None:
+            delta = deltas.setdefault((owner_type, owner_id, status), [0, 0.0])
+            delta[0] += sign
+            delta[1] += sign * (amount or 0.0)
+
+def apply_rollup_deltas(connection, deltas):
+    # Upserts in key order so concurrent batches lock rollup rows in the same order
+    rows = [{'owner_type': owner_type, 'owner_id': owner_id, 'status': status,
+             'order_count': count, 'revenue': revenue}
+            for (owner_type, owner_id, status), (count, revenue) in sorted(deltas.items())
+            if count or revenue]
+    if not rows:
+        return
+    
+    table = OrderRollup.__table__
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = upsert_statement(dialect, table)
+        connection.execute(insert.on_conflict_do_update(
+            index_elements=[table.c.owner_type, table.c.owner_id, table.c.status],
+            set_={'order_count': table.c.order_count + insert.excluded.order_count,
+                  'revenue': table.c.revenue + insert.excluded.revenue}), rows)
+        return
+    
+    for row in rows:
+        key = db.and_(table.c.owner_type == row['owner_type'], table.c.owner_id == row['owner_id'],
+                      table.c.status == row['status'])
+        result = connection.execute(table.update().where(key).values(
+            order_count=table.c.order_count + row['order_count'], revenue=table.c.revenue + row['revenue']))
+        if result.rowcount == 0:
+            connection.execute(table.insert(), row)
+
+def order_rollup_delta(connection, orders, sign):
+    # orders are (producer_id, product_listing_id, status, total_amount) tuples
+    designers = listing_designers(connection, {order[1] for order in orders})
+    deltas = {}
+    for producer_id, listing_id, status, amount in orders:
+        add_rollup_delta(deltas, producer_id, designers.get(listing_id), status, amount, sign)
+    return deltas
+
+@db.event.listens_for(Order, 'after_insert')
+def order_rollup_inserted(mapper, connection, target):
+    order = (target.producer_id, target.product_listing_id, target.status, target.total_amount)
+    apply_rollup_deltas(connection, order_rollup_delta(connection, [order], 1))
+
+@db.event.listens_for(Order, 'after_update')
+def order_rollup_updated(mapper, connection, target):
+    # An attribute set while expired has no previous value; reconciliation corrects those
+    state = db.inspect(target)
+    columns = ('producer_id', 'product_listing_id', 'status', 'total_amount')
+    histories = [state.attrs[name].history for name in columns]
+    if not any(history.has_changes() for history in histories):
+        return
+    
+    old = tuple(history.deleted[0] if history.deleted else getattr(target, name)
+                for name, history in zip(columns, histories))
+    new = tuple(getattr(target, name) for name in columns)
+    deltas = order_rollup_delta(connection, [old], -1)
+    for key, (count, revenue) in order_rollup_delta(connection, [new], 1).items():
+        delta = deltas.setdefault(key, [0, 0.0])
+        delta[0] += count
+        delta[1] += revenue
+    apply_rollup_deltas(connection, deltas)
+
+@db.event.listens_for(Order, 'after_delete')
+def order_rollup_deleted(mapper, connection, target):
+    order = (target.producer_id, target.product_listing_id, target.status, target.total_amount)
+    apply_rollup_deltas(connection, order_rollup_delta(connection, [order], -1))
+
+def order_rollup_totals(connection):
+    # What the rollups should hold, grouped from the orders table
+    amount = db.func.coalesce(db.func.sum(Order.total_amount), 0.0)
+    by_producer = (db.select(db.literal('producer', db.String), Order.producer_id, Order.status, db.func.count(), amount)
+                   .group_by(Order.producer_id, Order.status))
+    by_designer = (db.select(db.literal('designer', db.String), Design.designer_id, Order.status, db.func.count(), amount)
+                   .join(ProductListing, ProductListing.id == Order.product_listing_id)
+                   .join(Design, Design.id == ProductListing.design_id)
+                   .group_by(Design.designer_id, Order.status))
+    return {(owner_type, owner_id, status): (count, revenue)
+            for owner_type, owner_id, status, count, revenue in connection.execute(db.union_all(by_producer, by_designer))}
+
+def reconcile_order_rollups():
+    # Corrects rollup rows that drifted from the orders table and returns how many did.
+    # Both sides are read in one serializable snapshot, so the corrections are applied as
+    # deltas and compose with order changes committed while this runs.
+    with db.engine.connect().execution_options(isolation_level='SERIALIZABLE') as connection:
+        table = OrderRollup.__table__
+        expected = order_rollup_totals(connection)
+        current = {(row.owner_type, row.owner_id, row.status): (row.order_count, row.revenue)
+                   for row in connection.execute(db.select(table))}
+        
+        drift = {}
+        for key in expected.keys() | current.keys():
+            count, revenue = expected.get(key, (0, 0.0))
+            current_count, current_revenue = current.get(key, (0, 0.0))
+            if count != current_count or abs(revenue - current_revenue) > ROLLUP_REVENUE_TOLERANCE:
+                drift[key] = [count - current_count, revenue - current_revenue]
+        apply_rollup_deltas(connection, drift)
+        connection.commit()
+    return len(drift)
+
+@api.cli.command('reconcile-rollups')
+def reconcile_rollups_command():
+    """Correct dashboard order rollups that drifted from the orders table."""
+    click.echo(f'Corrected {reconcile_order_rollups()} order rollup rows')
+
+def order_rollup_rows(owner_type, owner_id):
+    return db.session.execute(db.select(OrderRollup.status, OrderRollup.order_count, OrderRollup.revenue)
+                              .where(OrderRollup.owner_type == owner_type, OrderRollup.owner_id == owner_id)).all()
+
+def order_rollup_summary(owner_type, owner_id):
+    by_status = {status: {'orders': 0, 'revenue': 0.0} for status in ORDER_TRANSITIONS}
+    for row in order_rollup_rows(owner_type, owner_id):
+        by_status[row.status] = {'orders': row.order_count, 'revenue': round(row.revenue, 2)}
+    return {
+        'orders': sum(entry['orders'] for entry in by_status.values()),
+        'revenue': round(sum(entry['revenue'] for entry in by_status.values()), 2),
+        'byStatus': by_status
+    }
+
+@api.route('/api/producers/<producer_id>/dashboard', methods=['GET'])
+@replica_reads
+def api_producer_dashboard(producer_id):
+    rating = db.session.execute(db.select(Producer.rating).where(Producer.id == producer_id)).first()
+    
+    if rating is None:
+        return jsonify({'success': False, 'message': 'Producer not found'}), 404
+    
+    return jsonify({'rating': rating.rating or 0.0, **order_rollup_summary('producer', producer_id)})
+
+@api.route('/api/designers/<designer_id>/dashboard', methods=['GET'])
+@replica_reads
+def api_designer_dashboard(designer_id):
+    rating = db.session.execute(db.select(Designer.rating).where(Designer.id == designer_id)).first()
+    
+    if rating is None:
+        return jsonify({'success': False, 'message': 'Designer not found'}), 404
+    
+    return jsonify({'rating': rating.rating or 0.0, **order_rollup_summary('designer', designer_id)})
+
+# Producer matching
+# /api/match scores every producer for a design in one pass over the in-memory
+# producer matrix. Committed producer changes are applied to it row by row; it is
+# reloaded from the database in the background once older than MATCH_MATRIX_MAX_AGE,
+# which also picks up changes made by other workers.
+MATCH_LIMIT = 10
+MATCH_LIMIT_MAX = 100
+
+def producer_match_features():
+    query = db.session.query(Producer.id, Producer.production_capabilities, Producer.rating, Producer.verified,
+                             Producer.capacity, Producer.latitude, Producer.longitude)
+    return [(producer_id, normalize_capabilities(capabilities, strict=False), *rest)
+            for producer_id, capabilities, *rest in query]
+
+def reload_producer_matrix(app):
+    with app.app_context():
+        return producer_match_features()
+
+def current_producer_matrix():
+    if producer_matrix.loaded_at is None:
+        producer_matrix.load(producer_match_features())
+    elif producer_matrix.is_stale():
+        app = current_app._get_current_object()
+        producer_matrix.reload_in_background(lambda: reload_producer_matrix(app))
+    return producer_matrix
+
+def design_requirements(design_id):
+    # Capabilities named by the design's specifications and its active listings' printing requirements
+    design = db.session.query(Design.id, Design.specifications).filter(Design.id == design_id).first()
+    if design is None:
+        return None
+    requirements = normalize_capabilities(design.specifications, strict=False)
+    listings = db.session.query(ProductListing.printing_requirements).filter(
+        ProductListing.design_id == design_id, ProductListing.is_active == db.true())
+    for (printing_requirements,) in listings:
+        requirements.extend(normalize_capabilities(printing_requirements, strict=False))
+    return sorted(set(requirements))
+
+def queue_producer_match_update(target, producer):
+    session = db.inspect(target).session
+    if session is not None:
+        session.info.setdefault('producer_match_updates', {})[target.id] = producer
+
+@db.event.listens_for(Producer, 'after_insert')
+@db.event.listens_for(Producer, 'after_update')
+def producer_match_changed(mapper, connection, target):
+    queue_producer_match_update(target, (normalize_capabilities(target.production_capabilities), target.rating,
+                                         target.verified, target.capacity, target.latitude, target.longitude))
+
+@db.event.listens_for(Producer, 'after_delete')
+def producer_match_deleted(mapper, connection, target):
+    queue_producer_match_update(target, None)
+
+@db.event.listens_for(db.session, 'after_commit')
+def apply_producer_match_updates(session):
+    # Only a loaded matrix is patched; an unloaded one reads these rows when it loads
+    updates = session.info.pop('producer_match_updates', None)
+    matrix = loaded_service('producer_matrix')
+    if updates is None or matrix is None:
+        return
+    for producer_id, producer in updates.items():
+        if producer is None:
+            matrix.remove(producer_id)
+        else:
+            matrix.upsert(producer_id, *producer)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_producer_match_updates(session):
+    session.info.pop('producer_match_updates', None)
+
+@api.route('/api/match', methods=['POST'])
+def api_match():
+    # Requirements come from a design (designId) and/or an explicit capability list
+    data = request.json or {}
+    capabilities = normalize_capabilities(data.get('capabilities', []))
+    location = data.get('location') or {}
+    
+    if data.get('designId'):
+        requirements = design_requirements(data['designId'])
+        if requirements is None:
+            return jsonify({'success': False, 'message': 'Design not found'}), 404
+        capabilities = sorted(set(capabilities) | set(requirements))
+    
+    try:
+        limit = max(1, min(int(data.get('limit', MATCH_LIMIT)), MATCH_LIMIT_MAX))
+        latitude = float(location['lat']) if location.get('lat') is not None else None
+        longitude = float(location['lng']) if location.get('lng') is not None else None
+        max_distance = float(data['maxDistanceKm']) if data.get('maxDistanceKm') is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'success': False, 'message': 'Invalid limit, location or maxDistanceKm'}), 400
+    
+    matches = current_producer_matrix().match(capabilities, limit, data.get('match', 'any') == 'all',
+                                              latitude, longitude, max_distance)
+    
+    # One query for the details of the top producers, returned in score order
+    rows = {row.id: row for row in producer_rows_query().filter(Producer.id.in_([match[0] for match in matches]))}
+    result = []
+    for producer_id, score, matched, distance in matches:
+        if producer_id in rows:
+            producer = producer_row_to_dict(rows[producer_id], include_contact=False)
+            producer['matchScore'] = round(score, 4)
+            producer['matchedCapabilities'] = matched
+            producer['distanceKm'] = round(distance, 1) if distance is not None else None
+            result.append(producer)
+    
+    return jsonify({'requirements': capabilities, 'matches': result})
+
+# Producer capacity
+# Slots hold the units of a capability a producer can run per day and how many are
+# booked. Availability is answered from the in-process capacity index. A booking is
+# planned from the index and reserved with one UPDATE over all of its days that only
+# matches if every day still has room, so concurrent bookings can't overbook and
+# never take explicit row locks; one that loses a race refreshes the producer in
+# the index and is planned again.
+CAPACITY_BOOKING_ATTEMPTS = 3
+CAPACITY_RESULTS_MAX = 200
+
+def capacity_slot_rows(producer_id=None, capability=None):
+    # A Core select: the full index load reads every slot in the horizon, and ORM rows roughly double its cost
+    slot = CapacitySlot.__table__.c
+    query = db.select(slot.producer_id, slot.capability, slot.day, slot.capacity, slot.booked).where(
+        slot.day >= date.today())
+    if producer_id:
+        query = query.where(slot.producer_id == producer_id)
+    if capability:
+        query = query.where(slot.capability == capability)
+    return db.session.connection().execute(query).all()
+
+def reload_capacity_index(app):
+    with app.app_context():
+        return capacity_slot_rows()
+
+def current_capacity_index():
+    if capacity_index.loaded_at is None:
+        capacity_index.load(capacity_slot_rows())
+    elif capacity_index.is_stale():
+        app = current_app._get_current_object()
+        capacity_index.reload_in_background(lambda: reload_capacity_index(app))
+    return capacity_index
+
+def refresh_producer_capacity(producer_id, capability):
+    for row in capacity_slot_rows(producer_id, capability):
+        capacity_index.set_slot(*row)
+
+def capacity_window(data):
+    # (capability, quantity, first day, last day) from a request body; raises ValueError
+    message = 'capability, a positive quantity and an ISO by date on or after from are required'
+    try:
+        capability = str(data.get('capability') or '').strip().lower()
+        quantity = int(data.get('quantity'))
+        start = date.fromisoformat(data['from']) if data.get('from') else date.today()
+        end = date.fromisoformat(data['by'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(message)
+    if not capability or quantity < 1 or end < start:
+        raise ValueError(message)
+    if start < date.today():
+        raise ValueError('from can not be in the past')
+    return capability, quantity, start, end
+
+def reserve_capacity(producer_id, capability, allocations):
+    # Adds every allocation in one statement; False (and nothing booked) if any day lacks room
+    units = db.case({day: amount for day, amount in allocations}, value=CapacitySlot.day)
+    statement = (db.update(CapacitySlot)
+                 .where(CapacitySlot.producer_id == producer_id, CapacitySlot.capability == capability,
+                        CapacitySlot.day.in_([day for day, _ in allocations]),
+                        CapacitySlot.booked + units <= CapacitySlot.capacity)
+                 .values(booked=CapacitySlot.booked + units)
+                 .execution_options(synchronize_session=False))
+    return db.session.execute(statement).rowcount == len(allocations)
+
+def release_capacity(producer_id, capability, allocations):
+    units = db.case({day: amount for day, amount in allocations}, value=CapacitySlot.day)
+    db.session.execute(db.update(CapacitySlot)
+                       .where(CapacitySlot.producer_id == producer_id, CapacitySlot.capability == capability,
+                              CapacitySlot.day.in_([day for day, _ in allocations]))
+                       .values(booked=CapacitySlot.booked - units)
+                       .execution_options(synchronize_session=False))
+
+def upsert_capacity_slots(rows):
+    # New slots are inserted; existing ones take the new capacity unless it is below what is booked
+    table = CapacitySlot.__table__
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = upsert_statement(dialect, table)
+        connection.execute(insert.on_conflict_do_update(
+            index_elements=[table.c.producer_id, table.c.capability, table.c.day],
+            set_={'capacity': insert.excluded.capacity},
+            where=table.c.booked <= insert.excluded.capacity), rows)
+        return
+    
+    for row in rows:
+        key = db.and_(table.c.producer_id == row['producer_id'], table.c.capability == row['capability'],
+                      table.c.day == row['day'])
+        result = connection.execute(table.update().where(key, table.c.booked <= row['capacity'])
+                                    .values(capacity=row['capacity']))
+        if result.rowcount == 0 and connection.execute(db.select(table.c.day).where(key)).first() is None:
+            connection.execute(table.insert(), row)
+
+@api.route('/api/producers/<producer_id>/capacity', methods=['PUT'])
+def api_set_producer_capacity(producer_id):
+    data = request.json or {}
+    slots = data.get('slots')
+    
+    if db.session.get(Producer, producer_id) is None:
+        return jsonify({'success': False, 'message': 'Producer not found'}), 404
+    if not isinstance(slots, list) or not slots:
+        return jsonify({'success': False, 'message': 'slots must be a non-empty list'}), 400
+    
+    try:
+        rows = [{'producer_id': producer_id, 'capability': str(slot['capability']).strip().lower(),
+                 'day': date.fromisoformat(slot['day']), 'capacity': int(slot['capacity']), 'booked': 0}
+                for slot in slots]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Each slot needs a capability, an ISO day and an integer capacity'}), 400
+    if any(row['capacity'] < 0 or not row['capability'] for row in rows):
+        return jsonify({'success': False, 'message': 'Capacities must not be negative'}), 400
+    # A day repeated within the request keeps its last slot, as if the slots were written in order;
+    # one INSERT ... ON CONFLICT can't update the same row twice
+    rows = list({(row['capability'], row['day']): row for row in rows}.values())
+    
+    upsert_capacity_slots(rows)
+    db.session.commit()
+    
+    # Slots whose capacity is below what is already booked kept their old capacity
+    capabilities = {row['capability'] for row in rows}
+    current = {(row.capability, row.day): row for row in db.session.query(CapacitySlot).filter(
+        CapacitySlot.producer_id == producer_id, CapacitySlot.capability.in_(capabilities))}
+    rejected = [{'capability': row['capability'], 'day': row['day'].isoformat(),
+                 'booked': current[(row['capability'], row['day'])].booked}
+                for row in rows if current[(row['capability'], row['day'])].capacity != row['capacity']]
+    if loaded_service('capacity_index') is not None:
+        for capability in capabilities:
+            refresh_producer_capacity(producer_id, capability)
+    
+    return jsonify({'success': True, 'updated': len(rows) - len(rejected), 'rejected': rejected})
+
+@api.route('/api/producers/<producer_id>/capacity', methods=['GET'])
+def api_producer_capacity(producer_id):
+    try:
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else date.today()
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'from and to must be ISO dates'}), 400
+    
+    query = CapacitySlot.query.filter(CapacitySlot.producer_id == producer_id, CapacitySlot.day >= start)
+    if end:
+        query = query.filter(CapacitySlot.day <= end)
+    if request.args.get('capability'):
+        query = query.filter(CapacitySlot.capability == request.args['capability'].strip().lower())
+    
+    return jsonify([{'capability': slot.capability, 'day': slot.day.isoformat(), 'capacity': slot.capacity,
+                     'booked': slot.booked} for slot in query.order_by(CapacitySlot.capability, CapacitySlot.day)])
+
+@api.route('/api/capacity/availability', methods=['POST'])
+def api_capacity_availability():
+    # e.g. {'capability': 'digital', 'quantity': 500, 'by': '2026-10-23'}: who can run it in time
+    data = request.json or {}
+    try:
+        capability, quantity, start, end = capacity_window(data)
+        limit = max(1, min(int(data.get('limit', PRODUCER_PAGE_SIZE)), CAPACITY_RESULTS_MAX))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    index = current_capacity_index()
+    if index.offset(end) is None:
+        return jsonify({'success': False, 'message': f'by is beyond the {index.horizon_days}-day capacity horizon'}), 400
+    
+    available = index.available(capability, start, end, quantity, limit)
+    rows = {row.id: row for row in producer_rows_query().filter(Producer.id.in_([producer_id for producer_id, _, _ in available]))}
+    result = []
+    for producer_id, free, finish in available:
+        if producer_id in rows:
+            producer = producer_row_to_dict(rows[producer_id], include_contact=False)
+            producer['freeUnits'] = free
+            producer['earliestFinish'] = finish.isoformat()
+            result.append(producer)
+    
+    return jsonify(result)
+
+@api.route('/api/capacity/bookings', methods=['POST'])
+def api_book_capacity():
+    data = request.json or {}
+    producer_id = data.get('producerId')
+    order_id = data.get('orderId')
+    try:
+        capability, quantity, start, end = capacity_window(data)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if not isinstance(producer_id, str) or (order_id is not None and not isinstance(order_id, str)):
+        return jsonify({'success': False, 'message': 'producerId and orderId must be strings'}), 400
+    # Checked here so a bad id is a 404 rather than a foreign key violation on insert
+    if not db.session.get(Producer, producer_id):
+        return jsonify({'success': False, 'message': 'Producer not found'}), 404
+    if order_id and not db.session.get(Order, order_id):
+        return jsonify({'success': False, 'message': 'Order not found'}), 404
+    
+    index = current_capacity_index()
+    if index.offset(end) is None:
+        return jsonify({'success': False, 'message': f'by is beyond the {index.horizon_days}-day capacity horizon'}), 400
+    
+    for _ in range(CAPACITY_BOOKING_ATTEMPTS):
+        allocations = index.plan(producer_id, capability, start, end, quantity)
+        if allocations is None:
+            break
+        if reserve_capacity(producer_id, capability, allocations):
+            booking = CapacityBooking(producer_id=producer_id, capability=capability, order_id=order_id,
+                                      quantity=quantity,
+                                      allocations=[[day.isoformat(), units] for day, units in allocations])
+            db.session.add(booking)
+            db.session.commit()
+            index.apply(producer_id, capability, allocations, -1)
+            return jsonify({'success': True, 'id': booking.id, 'allocations': booking.allocations}), 201
+        # Another booking got there first: re-read this producer's slots and plan again
+        db.session.rollback()
+        refresh_producer_capacity(producer_id, capability)
+    
+    return jsonify({'success': False, 'message': 'Not enough free capacity in that window'}), 409
+
+@api.route('/api/capacity/bookings/<booking_id>', methods=['DELETE'])
+def api_cancel_capacity_booking(booking_id):
+    booking = db.session.get(CapacityBooking, booking_id)
+    
+    if not booking:
+        return jsonify({'success': False, 'message': 'Booking not found'}), 404
+    
+    allocations = [(date.fromisoformat(day), units) for day, units in booking.allocations]
+    producer_id, capability = booking.producer_id, booking.capability
+    release_capacity(producer_id, capability, allocations)
+    db.session.delete(booking)
+    db.session.commit()
+    if loaded_service('capacity_index') is not None:
+        capacity_index.apply(producer_id, capability, allocations, 1)
+    
+    return jsonify({'success': True})
+
+# Shipping rates
+# Quotes are fetched from the external rates service. The database connection is
+# handed back before the call, so requests waiting on a slow carrier don't hold
+# pool connections; under a gevent worker they don't hold a thread either.
+@api.route('/api/shipping/rates', methods=['POST'])
+def api_shipping_rates():
+    data = request.get_json(silent=True) or {}
+    destination = data.get('destination')
+    parcels = data.get('parcels')
+    
+    if not isinstance(destination, dict) or not destination:
+        return jsonify({'success': False, 'message': 'destination is required'}), 400
+    if not isinstance(parcels, list) or not parcels or not all(isinstance(parcel, dict) for parcel in parcels):
+        return jsonify({'success': False, 'message': 'parcels must be a non-empty list'}), 400
+    
+    producer = db.session.query(Producer.id, Producer.business_name, Producer.latitude, Producer.longitude) \
+        .filter(Producer.id == data.get('producerId')).first()
+    if not producer:
+        return jsonify({'success': False, 'message': 'Producer not found'}), 404
+    origin = {'producerId': producer.id, 'name': producer.business_name,
+              'latitude': producer.latitude, 'longitude': producer.longitude}
+    
+    # Give the connection back to the pool while waiting
+    db.session.close()
+    rates = shipping_rates.quote(origin, destination, parcels)
+    
+    return jsonify({'success': True, 'producerId': producer.id, 'rates': rates})
+
+# Metrics
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(instrumentation.metrics.render(), mimetype='text/plain; version=0.0.4')
 
 # Error handlers
-@app.errorhandler(404)
+@api.app_errorhandler(UploadError)
+def upload_error(e):
+    return jsonify({'success': False, 'message': e.message, **e.details}), e.status
+
+@api.app_errorhandler(CatalogFormatError)
+def catalog_format_error(e):
+    return jsonify({'success': False, 'message': e.message}), 400
+
+@api.app_errorhandler(CapabilityError)
+def capability_error(e):
+    # May be raised while flushing a producer, so the session has to be reset
+    db.session.rollback()
+    return jsonify({'success': False, 'message': e.message}), 400
+
+@api.app_errorhandler(FieldSelectionError)
+def field_selection_error(e):
+    return jsonify({'success': False, 'message': e.message}), 400
+
+@api.app_errorhandler(HashingBusy)
+def hashing_busy(e):
+    response = jsonify({'success': False, 'message': 'Too many login attempts in progress, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 429
+
+@api.app_errorhandler(ShippingRatesUnavailable)
+def shipping_rates_unavailable(e):
+    return jsonify({'success': False, 'message': e.message}), 503
+
+@api.app_errorhandler(SnapshotUnavailable)
+def snapshot_unavailable(e):
+    response = jsonify({'success': False, 'message': e.message})
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+@api.app_errorhandler(PoolTimeout)
+def database_busy(e):
+    # Every pooled connection stayed checked out for DB_POOL_TIMEOUT seconds
+    db.session.rollback()
+    response = jsonify({'success': False, 'message': 'The service is busy, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@api.app_errorhandler(404)
 def page_not_found(e):
     return render_template('404.html'), 404
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def server_error(e):
     return render_template('500.html'), 500
 
 # For running locally
 if __name__ == '__main__':
+    from flask_migrate import upgrade
+    app = create_app(migrations=True)
+    with app.app_context():
+        upgrade()
     app.run(debug=True)
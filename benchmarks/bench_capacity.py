@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Producer capacity benchmark for Pressly
+
+Seeds capacity slots for every producer's capabilities over the booking
+horizon, then times availability queries ("who can run N units of X by day
+D") against the capacity index and against a SQL GROUP BY over the slots,
+and measures booking throughput through POST /api/capacity/bookings from
+several threads competing for the same producers. Finishes by checking that
+no slot ended up booked past its capacity.
+
+    python benchmarks/bench_capacity.py --producers 10000 --days 90
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [('digital', 500, 4), ('offset', 2000, 13), ('letterpress', 5000, 30), ('embroidery', 20000, 89)]
+
+
+def seed_slots(producer_capabilities, days):
+    # One slot per producer capability per day, with a daily capacity of 50 to 400 units
+    from app import db, CapacitySlot
+
+    rng = random.Random(7)
+    today = date.today()
+    table = CapacitySlot.__table__
+    batch = []
+    for producer_id, capabilities in producer_capabilities:
+        for capability in capabilities:
+            daily = rng.choice((50, 100, 200, 400))
+            for offset in range(days):
+                batch.append({'producer_id': producer_id, 'capability': capability,
+                              'day': today + timedelta(days=offset), 'capacity': daily, 'booked': 0})
+        if len(batch) >= 50000:
+            db.session.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark capacity availability queries and bookings')
+    parser.add_argument('--producers', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--bookings', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pressly-bench-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['CAPACITY_HORIZON_DAYS'] = str(args.days)
+
+    from flask_migrate import upgrade
+    from bench_producers import percentile, seed
+    from app import (app, db, CapacitySlot, Producer, capacity_slot_rows, current_capacity_index,
+                     normalize_capabilities)
+
+    with app.app_context():
+        upgrade()
+        seed(args.producers)
+        producers = [(producer_id, normalize_capabilities(capabilities)) for producer_id, capabilities in
+                     db.session.query(Producer.id, Producer.production_capabilities)]
+        seed_slots(producers, args.days)
+        slots = db.session.query(db.func.count()).select_from(CapacitySlot).scalar()
+
+        started = time.perf_counter()
+        index = current_capacity_index()
+        load_ms = (time.perf_counter() - started) * 1000
+        print(f'{args.producers} producers x {args.days} days: {slots} slots, index load {load_ms:.0f} ms')
+
+        today = date.today()
+        free = CapacitySlot.capacity - CapacitySlot.booked
+
+        def sql_available(capability, quantity, end):
+            return (db.session.query(CapacitySlot.producer_id, db.func.sum(free))
+                    .filter(CapacitySlot.capability == capability, CapacitySlot.day.between(today, end))
+                    .group_by(CapacitySlot.producer_id).having(db.func.sum(free) >= quantity).limit(50).all())
+
+        print(f'{"query":<30}{"index p50":>11}{"index p99":>11}{"sql p50":>10}{"sql p99":>10}{"matches":>9}')
+        for capability, quantity, days in QUERIES:
+            end = today + timedelta(days=days)
+            row = []
+            for case in (lambda: index.available(capability, today, end, quantity, 50),
+                         lambda: sql_available(capability, quantity, end)):
+                timings = []
+                for _ in range(args.runs):
+                    started = time.perf_counter()
+                    result = case()
+                    timings.append((time.perf_counter() - started) * 1000)
+                row += [percentile(timings, 50), percentile(timings, 99)]
+            label = f'{quantity} {capability} in {days + 1}d'
+            print(f'{label:<30}{row[0]:>11.2f}{row[1]:>11.2f}{row[2]:>10.2f}{row[3]:>10.2f}{len(result):>9}')
+
+        # Bookings from several threads, all aimed at a small pool of producers so they collide
+        pool = [producer for producer in producers if 'digital' in producer[1]][:20]
+        outcomes = {'booked': 0, 'full': 0}
+        lock = threading.Lock()
+
+        def book(count, seed_value):
+            rng = random.Random(seed_value)
+            with app.app_context():
+                client = app.test_client()
+                for _ in range(count):
+                    producer_id = rng.choice(pool)[0]
+                    response = client.post('/api/capacity/bookings', json={
+                        'producerId': producer_id, 'capability': 'digital', 'quantity': rng.randint(10, 300),
+                        'by': (today + timedelta(days=rng.randint(0, 14))).isoformat()})
+                    with lock:
+                        outcomes['booked' if response.status_code == 201 else 'full'] += 1
+
+        threads = [threading.Thread(target=book, args=(args.bookings // args.threads, i)) for i in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        overbooked = db.session.query(db.func.count()).filter(CapacitySlot.booked > CapacitySlot.capacity).scalar()
+        print(f'bookings: {outcomes["booked"] + outcomes["full"]} requests from {args.threads} threads on '
+              f'{len(pool)} producers, {(outcomes["booked"] + outcomes["full"]) / elapsed:.0f}/s, '
+              f'{outcomes["booked"]} booked, {outcomes["full"]} refused, {overbooked} overbooked slots')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Product listing catalog benchmark for Pressly
+
+Generates a collection of SKU x size x color listings as CSV and NDJSON files
+(with a share of invalid rows), imports each through POST /api/listings/import,
+imports the CSV again (every row now an update), traces peak Python memory of
+an import from the file as `flask import-listings` runs it, and exports it back
+through GET /api/listings/export. A per-listing ORM loop (one object and commit
+per listing, as before) is timed on a sample for comparison. Reports listings
+per minute for each.
+
+    python benchmarks/bench_catalog.py --listings 100000 --designs 50 --invalid 0.01
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+COLORS = ['black', 'white', 'navy', 'red', 'heather', 'forest', 'sand', 'pink']
+
+
+def seed_designs(count):
+    from app import db, User, Designer, Design
+
+    user = User(email='designer@example.com', password_hash='x', full_name='Designer', user_type='designer')
+    db.session.add(user)
+    db.session.flush()
+    designer = Designer(user_id=user.id)
+    db.session.add(designer)
+    db.session.flush()
+    designs = [Design(designer_id=designer.id, title=f'Collection piece {i}', status='active') for i in range(count)]
+    db.session.add_all(designs)
+    db.session.commit()
+    return [design.id for design in designs]
+
+
+def generate_records(count, design_ids, invalid_share, seed=42):
+    # One listing per design x product x size x color variant, in order
+    rng = random.Random(seed)
+    for i in range(count):
+        design_id = design_ids[i % len(design_ids)]
+        size = SIZES[(i // len(design_ids)) % len(SIZES)]
+        color = COLORS[(i // (len(design_ids) * len(SIZES))) % len(COLORS)]
+        record = {
+            'sku': f'PR-{i:07d}-{size}-{color.upper()[:3]}',
+            'designId': design_id,
+            'basePrice': round(rng.uniform(8, 60), 2),
+            'availableSizes': [size],
+            'availableColors': [color],
+            'printingRequirements': {'method': rng.choice(['dtg', 'screen', 'sublimation']), 'dpi': 300},
+            'isActive': True,
+        }
+        if rng.random() < invalid_share:
+            if rng.random() < 0.5:
+                record['basePrice'] = -1
+            else:
+                record['designId'] = str(uuid.uuid4())
+        yield record
+
+
+def write_files(directory, count, design_ids, invalid_share):
+    from catalog import write_listings
+
+    paths = {}
+    for format_name in ('csv', 'ndjson'):
+        paths[format_name] = os.path.join(directory, f'listings.{format_name}')
+        with open(paths[format_name], 'w', encoding='utf-8', newline='') as f:
+            for chunk in write_listings(generate_records(count, design_ids, invalid_share), format_name):
+                f.write(chunk)
+    return paths
+
+
+def import_file(client, path, format_name):
+    with open(path, 'rb') as f:
+        started = time.perf_counter()
+        response = client.post(f'/api/listings/import?format={format_name}', data=f,
+                               content_type='text/csv' if format_name == 'csv' else 'application/x-ndjson')
+        elapsed = time.perf_counter() - started
+    summary = response.get_json()
+    return summary, elapsed
+
+
+def orm_loop(count, design_ids):
+    from app import db, ProductListing
+
+    started = time.perf_counter()
+    for record in generate_records(count, design_ids, 0, seed=7):
+        db.session.add(ProductListing(sku='ORM' + record['sku'][2:], design_id=record['designId'],
+                                      base_price=record['basePrice'], available_sizes=record['availableSizes'],
+                                      available_colors=record['availableColors'],
+                                      printing_requirements=record['printingRequirements']))
+        db.session.commit()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bulk listing import and export')
+    parser.add_argument('--listings', type=int, default=100000)
+    parser.add_argument('--designs', type=int, default=50)
+    parser.add_argument('--invalid', type=float, default=0.01, help='share of rows that fail validation')
+    parser.add_argument('--orm-sample', type=int, default=2000, help='listings for the per-object ORM baseline')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pressly-bench-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+    from flask_migrate import upgrade
+    from app import app, db, ProductListing, import_listings
+    from catalog import read_listings
+
+    # The request body limit is for uploads through the browser; the benchmark files may exceed it
+    app.config['MAX_CONTENT_LENGTH'] = None
+    with app.app_context():
+        upgrade()
+        design_ids = seed_designs(args.designs)
+        paths = write_files(workdir, args.listings, design_ids, args.invalid)
+        client = app.test_client()
+
+        print(f'{args.listings} listings over {args.designs} designs, {args.invalid:.1%} invalid; '
+              f'CSV {os.path.getsize(paths["csv"]) / 2**20:.1f} MiB, NDJSON {os.path.getsize(paths["ndjson"]) / 2**20:.1f} MiB')
+        print(f'{"case":<34}{"written":>9}{"failed":>8}{"seconds":>9}{"per minute":>12}')
+
+        def report(label, written, failed, elapsed):
+            rate = (written + failed) / elapsed * 60
+            print(f'{label:<34}{written:>9}{failed:>8}{elapsed:>9.2f}{rate:>12,.0f}')
+
+        summary, elapsed = import_file(client, paths['ndjson'], 'ndjson')
+        report('import NDJSON (inserts)', summary['written'], summary['failed'], elapsed)
+        db.session.execute(ProductListing.__table__.delete())
+        db.session.commit()
+        summary, elapsed = import_file(client, paths['csv'], 'csv')
+        report('import CSV (inserts)', summary['written'], summary['failed'], elapsed)
+
+        summary, elapsed = import_file(client, paths['csv'], 'csv')
+        report('import CSV again (updates)', summary['written'], summary['failed'], elapsed)
+
+        # The test client buffers request bodies, so memory is traced on the file path the CLI uses
+        with open(paths['csv'], 'rb') as f:
+            tracemalloc.start()
+            import_listings(read_listings(f, 'csv'))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        print(f'  peak traced memory importing the CSV file: {peak / 2**20:.1f} MiB; first errors: '
+              + json.dumps(summary['errors'][:2]))
+
+        for format_name in ('ndjson', 'csv'):
+            started = time.perf_counter()
+            response = client.get(f'/api/listings/export?format={format_name}')
+            body = response.get_data()
+            elapsed = time.perf_counter() - started
+            rows = len(body.splitlines()) - (1 if format_name == 'csv' else 0)
+            report(f'export {format_name.upper()}', rows, 0, elapsed)
+
+        elapsed = orm_loop(args.orm_sample, design_ids)
+        report('ORM object + commit per listing', args.orm_sample, 0, elapsed)
+
+
+if __name__ == '__main__':
+    main()
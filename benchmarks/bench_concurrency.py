@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Serving-mode load test for Pressly
+
+Starts a local stub of the shipping rates service that answers after a fixed
+delay, then runs the app under gunicorn in each worker mode (sync, gthread,
+gevent) with the same number of worker processes and drives it with a mix of
+shipping quotes (mostly waiting on the stub) and producer dashboards (database
+reads) from many concurrent clients. Reports throughput, p50/p99 latency and
+errors per mode. Every response is checked against the producer it was asked
+about, so a session or request context leaking between concurrent requests
+shows up as a mismatch.
+
+    python benchmarks/bench_concurrency.py --clients 200 --latency 100 --seconds 15
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'sync': {'GUNICORN_WORKER_CLASS': 'sync'},
+    'gthread': {'GUNICORN_WORKER_CLASS': 'gthread', 'GUNICORN_THREADS': '16'},
+    'gevent': {'GUNICORN_WORKER_CLASS': 'gevent', 'GUNICORN_WORKER_CONNECTIONS': '1000'},
+}
+
+
+class StubRatesServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def stub_rates_handler(latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            quote = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            time.sleep(latency)
+            body = json.dumps({'rates': [
+                {'carrier': 'stub', 'service': 'ground', 'amount': 9.5, 'currency': 'USD',
+                 'destination': quote['destination'], 'origin': quote['origin']['producerId']},
+            ]}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def seed_database(path, producers):
+    # Seeded in a child process so this one never imports the app (and its threads) before gunicorn forks
+    code = ('from flask_migrate import upgrade\n'
+            'from bench_producers import seed\n'
+            'from app import app, db, Producer\n'
+            'import json\n'
+            'with app.app_context():\n'
+            '    upgrade()\n'
+            f'    seed({producers})\n'
+            '    print(json.dumps(dict(db.session.query(Producer.id, Producer.rating).all())))\n')
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + path)
+    output = subprocess.run([sys.executable, '-c', code], env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/metrics')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start')
+
+
+def drive(port, ratings, clients, seconds, quote_share):
+    producer_ids = list(ratings)
+    latencies = []
+    counts = {'ok': 0, 'error': 0, 'mismatch': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client(seed_value):
+        rng = random.Random(seed_value)
+        connection = HTTPConnection('127.0.0.1', port, timeout=60)
+        while time.monotonic() < deadline:
+            producer_id = rng.choice(producer_ids)
+            postal_code = f'{rng.randrange(100000):05d}'
+            started = time.perf_counter()
+            try:
+                if rng.random() < quote_share:
+                    connection.request('POST', '/api/shipping/rates', body=json.dumps({
+                        'producerId': producer_id, 'destination': {'postalCode': postal_code},
+                        'parcels': [{'weightKg': 1.5}]}), headers={'Content-Type': 'application/json'})
+                    response = connection.getresponse()
+                    data = json.loads(response.read())
+                    correct = (response.status == 200 and data['producerId'] == producer_id and
+                               data['rates'][0]['origin'] == producer_id and
+                               data['rates'][0]['destination']['postalCode'] == postal_code)
+                else:
+                    connection.request('GET', f'/api/producers/{producer_id}/dashboard')
+                    response = connection.getresponse()
+                    data = json.loads(response.read())
+                    correct = response.status == 200 and abs(data['rating'] - (ratings[producer_id] or 0.0)) < 1e-9
+                outcome = 'ok' if correct else ('mismatch' if response.status == 200 else 'error')
+            except (OSError, ValueError, KeyError):
+                connection.close()
+                connection = HTTPConnection('127.0.0.1', port, timeout=60)
+                outcome = 'error'
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                counts[outcome] += 1
+                if outcome == 'ok':
+                    latencies.append(elapsed)
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare gunicorn worker modes under an I/O-heavy request mix')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--latency', type=float, default=100, help='stub rates service delay in ms')
+    parser.add_argument('--quote-share', type=float, default=0.8, help='share of requests that are shipping quotes')
+    parser.add_argument('--producers', type=int, default=1000)
+    args = parser.parse_args()
+
+    from bench_producers import percentile
+
+    workdir = tempfile.mkdtemp(prefix='pressly-bench-')
+    database = os.path.join(workdir, 'bench.db')
+    ratings = seed_database(database, args.producers)
+
+    stub = StubRatesServer(('127.0.0.1', 0), stub_rates_handler(args.latency / 1000))
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    print(f'{args.workers} workers, {args.clients} clients, {args.seconds:.0f}s per mode, '
+          f'{args.quote_share:.0%} quotes with {args.latency:.0f} ms upstream latency')
+    print(f'{"mode":<10}{"req/s":>9}{"p50 ms":>10}{"p99 ms":>10}{"ok":>9}{"errors":>8}{"mismatches":>12}')
+    for mode in args.modes:
+        port = free_port()
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + database, WEB_CONCURRENCY=str(args.workers),
+                   SHIPPING_RATES_URL=f'http://127.0.0.1:{stub.server_address[1]}/rates',
+                   SHIPPING_RATES_POOL_SIZE='200', GUNICORN_TIMEOUT='120', **MODES[mode])
+        server = subprocess.Popen(['gunicorn', '--bind', f'127.0.0.1:{port}', 'wsgi:app'], cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_up(port)
+            started = time.monotonic()
+            latencies, counts = drive(port, ratings, args.clients, args.seconds, args.quote_share)
+            elapsed = time.monotonic() - started
+        finally:
+            server.terminate()
+            server.wait()
+        p50 = percentile(latencies, 50) if latencies else float('nan')
+        p99 = percentile(latencies, 99) if latencies else float('nan')
+        print(f'{mode:<10}{counts["ok"] / elapsed:>9.0f}{p50:>10.1f}{p99:>10.1f}{counts["ok"]:>9}'
+              f'{counts["error"]:>8}{counts["mismatch"]:>12}')
+    stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
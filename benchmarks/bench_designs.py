@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Design sync benchmark for Pressly
+
+Creates a designer's library through POST /api/designers/<id>/designs, once in
+batches and once a design per request, then compares a client that downloads
+the whole library (what a fresh page load costs, and what every save cost when
+the library was one localStorage array) with a reconnecting client that sends
+the cursor from its last sync after a few designs were edited and deleted:
+requests, bytes transferred, SQL statements and time.
+
+    python benchmarks/bench_designs.py --designs 10000 --batch 500 --edits 20 --deletes 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def new_design(i):
+    return {'id': str(uuid.uuid4()), 'title': f'Poster series {i}', 'description': 'Risograph poster, two colors ' * 3,
+            'specifications': {'size': '18x24 inches', 'colors': 'CMYK', 'materials': '100lb Matte'},
+            'status': 'active' if i % 3 else 'draft'}
+
+
+def sync(client, url, cursor=None):
+    # Pages until the server has nothing more; returns (cursor, designs, deleted, requests, bytes)
+    designs = deleted = requests = size = 0
+    while True:
+        response = client.get(url + (f'?since={cursor}' if cursor else ''))
+        page = response.get_json()
+        requests += 1
+        size += len(response.data)
+        designs += len(page['designs'])
+        deleted += len(page['deleted'])
+        cursor = page['cursor']
+        if not page['hasMore']:
+            return cursor, designs, deleted, requests, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched design writes and delta sync')
+    parser.add_argument('--designs', type=int, default=10000)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--single', type=int, default=500, help='designs created one request at a time')
+    parser.add_argument('--edits', type=int, default=20)
+    parser.add_argument('--deletes', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pressly-bench-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+    from flask_migrate import upgrade
+    from sqlalchemy import event
+    from app import app, db, User, Designer
+    from bench_producers import QueryCounter
+
+    app.config['DESIGN_SYNC_LAG'] = 1
+    with app.app_context():
+        upgrade()
+        user = User(email='designer@example.com', password_hash='x', full_name='Designer', user_type='designer')
+        db.session.add(user)
+        db.session.flush()
+        designer = Designer(user_id=user.id)
+        db.session.add(designer)
+        db.session.commit()
+        url = f'/api/designers/{designer.id}/designs'
+        client = app.test_client()
+        counter = QueryCounter(db.engine, event)
+
+        print(f'{"write":<34}{"designs":>9}{"requests":>10}{"seconds":>9}{"per second":>12}')
+        designs = [new_design(i) for i in range(args.designs)]
+        started = time.perf_counter()
+        for start in range(0, len(designs), args.batch):
+            response = client.post(url, json={'designs': designs[start:start + args.batch]})
+            assert response.status_code == 200, response.get_json()
+        elapsed = time.perf_counter() - started
+        requests = -(-len(designs) // args.batch)
+        print(f'{f"batches of {args.batch}":<34}{len(designs):>9}{requests:>10}{elapsed:>9.2f}{len(designs) / elapsed:>12,.0f}')
+        started = time.perf_counter()
+        for i in range(args.single):
+            assert client.post(url, json={'designs': [new_design(args.designs + i)]}).status_code == 200
+        elapsed = time.perf_counter() - started
+        print(f'{"one per request":<34}{args.single:>9}{args.single:>10}{elapsed:>9.2f}{args.single / elapsed:>12,.0f}')
+
+        print(f'\n{"read":<34}{"designs":>9}{"deleted":>9}{"requests":>10}{"KiB":>9}{"queries":>9}{"ms":>9}')
+
+        def report(label, result, queries, elapsed):
+            _, changed, deleted, requests, size = result
+            print(f'{label:<34}{changed:>9}{deleted:>9}{requests:>10}{size / 1024:>9.1f}{queries:>9}{elapsed * 1000:>9.1f}')
+
+        with counter:
+            started = time.perf_counter()
+            result = sync(client, url)
+            elapsed = time.perf_counter() - started
+        report('full sync (no cursor)', result, counter.count, elapsed)
+        cursor = result[0]
+
+        time.sleep(app.config['DESIGN_SYNC_LAG'] + 0.1)
+        ids = [design['id'] for design in designs]
+        client.post(url, json={'designs': [{'id': design_id, 'status': 'archived'} for design_id in ids[:args.edits]],
+                               'deleted': ids[-args.deletes:] if args.deletes else []})
+        with counter:
+            started = time.perf_counter()
+            result = sync(client, url, cursor)
+            elapsed = time.perf_counter() - started
+        report(f'delta after {args.edits} edits, {args.deletes} deletes', result, counter.count, elapsed)
+        cursor = result[0]
+
+        time.sleep(app.config['DESIGN_SYNC_LAG'] + 0.1)
+        with counter:
+            started = time.perf_counter()
+            result = sync(client, url, cursor)
+            elapsed = time.perf_counter() - started
+        report('delta with no changes', result, counter.count, elapsed)
+
+
+if __name__ == '__main__':
+    main()
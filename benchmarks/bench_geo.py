@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Producer location search benchmark for Pressly
+
+Times radius and k-nearest producer queries through the spatial index
+(R*Tree on SQLite), the (latitude, longitude) B-tree fallback, and a full
+scan that computes the distance to every producer, at several catalog sizes.
+
+    python benchmarks/bench_geo.py --sizes 10000 100000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+POINTS = [('Chicago', 41.88, -87.63), ('Denver', 39.74, -104.99), ('rural Nevada', 39.5, -116.9)]
+RADIUS_KM = 50
+NEAREST = 10
+
+
+def run_size(size, runs):
+    from bench_producers import percentile, seed
+
+    workdir = tempfile.mkdtemp(prefix='pressly-bench-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+    from flask_migrate import upgrade
+    from app import (app, distance_km, nearest_producers, producer_location_backend, producer_rows_query,
+                     producers_within)
+
+    with app.app_context():
+        upgrade()
+        seed(size)
+        indexed_backend = producer_location_backend()
+
+        def scan_radius(lat, lng):
+            rows = producer_rows_query().all()
+            return [row for row in rows if distance_km(lat, lng, row.latitude, row.longitude) <= RADIUS_KM]
+
+        def scan_nearest(lat, lng):
+            rows = producer_rows_query().all()
+            return sorted(rows, key=lambda row: distance_km(lat, lng, row.latitude, row.longitude))[:NEAREST]
+
+        def with_backend(backend, run):
+            def case(lat, lng):
+                app.config['PRODUCER_LOCATION_BACKEND'] = backend
+                return run(lat, lng)
+            return case
+
+        strategies = [
+            (indexed_backend, with_backend(indexed_backend, lambda lat, lng: list(producers_within(producer_rows_query(), lat, lng, RADIUS_KM))),
+             with_backend(indexed_backend, lambda lat, lng: nearest_producers(producer_rows_query(), lat, lng, NEAREST))),
+            ('btree', with_backend('btree', lambda lat, lng: list(producers_within(producer_rows_query(), lat, lng, RADIUS_KM))),
+             with_backend('btree', lambda lat, lng: nearest_producers(producer_rows_query(), lat, lng, NEAREST))),
+            ('full scan', scan_radius, scan_nearest),
+        ]
+
+        print(f'{size} producers, {runs} runs per case, {RADIUS_KM} km radius, {NEAREST} nearest (p50 / p99 ms)')
+        print(f'{"point":<16}{"strategy":<12}{"radius p50":>12}{"radius p99":>12}{"nearest p50":>13}{"nearest p99":>13}')
+        for label, lat, lng in POINTS:
+            for name, radius, nearest in strategies:
+                row = []
+                for case in (radius, nearest):
+                    timings = []
+                    for _ in range(runs):
+                        started = time.perf_counter()
+                        case(lat, lng)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    row += [percentile(timings, 50), percentile(timings, 99)]
+                print(f'{label:<16}{name:<12}{row[0]:>12.2f}{row[1]:>12.2f}{row[2]:>13.2f}{row[3]:>13.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark indexed producer location search against a full scan')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.size:
+        run_size(args.size, args.runs)
+        return
+
+    # Each size runs in its own process so the app binds to a fresh database
+    for size in args.sizes:
+        subprocess.run([sys.executable, __file__, '--size', str(size), '--runs', str(args.runs)], check=True)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark for Pressly
+
+Drives /api/login from concurrent client threads through the Flask test client
+and reports logins per second, logins per second per hashing core, latency
+percentiles and how many requests were shed with 429.
+
+    python benchmarks/bench_login.py --workers 2 --threads 16 --seconds 10 --rounds 12
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PASSWORD = 'correct horse battery staple'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /api/login throughput')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='hashing processes')
+    parser.add_argument('--queue-limit', type=int, help='hashing queue limit (default 4 x workers)')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rounds', type=int, default=12, help='bcrypt cost')
+    parser.add_argument('--users', type=int, default=100)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pressly-bench-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['BCRYPT_ROUNDS'] = str(args.rounds)
+    os.environ['PASSWORD_HASH_WORKERS'] = str(args.workers)
+    if args.queue_limit is not None:
+        os.environ['PASSWORD_HASH_QUEUE_LIMIT'] = str(args.queue_limit)
+
+    from flask_migrate import upgrade
+    from bench_producers import percentile
+    from app import app, db, passwords, User
+
+    with app.app_context():
+        upgrade()
+        password_hash = passwords.hash(PASSWORD)
+        now = datetime.utcnow()
+        db.session.execute(User.__table__.insert(), [{
+            'id': str(uuid.uuid4()), 'email': f'user{i}@example.com', 'password_hash': password_hash,
+            'full_name': f'User {i}', 'user_type': 'designer', 'created_at': now, 'updated_at': now,
+            'is_active': True,
+        } for i in range(args.users)])
+        db.session.commit()
+
+    timings = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def client_loop(index):
+        client = app.test_client()
+        n = index
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = client.post('/api/login', json={'email': f'user{n % args.users}@example.com',
+                                                       'password': PASSWORD})
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 200:
+                    timings.append(elapsed)
+            if response.status_code == 429:
+                # Back off briefly like a real client honouring Retry-After
+                time.sleep(0.01)
+            n += args.threads
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    with app.app_context():
+        passwords.shutdown()
+
+    logins = statuses.get(200, 0)
+    cores = max(1, args.workers)
+    print(f'bcrypt cost {args.rounds}, {args.workers} hashing workers, {args.threads} client threads, {elapsed:.1f}s')
+    print(f'logins/s: {logins / elapsed:.1f}   logins/s/core: {logins / elapsed / cores:.1f}')
+    if timings:
+        print(f'p50: {percentile(timings, 50):.1f} ms   p99: {percentile(timings, 99):.1f} ms')
+    print('responses: ' + ', '.join(f'{status}={count}' for status, count in sorted(statuses.items())))
+
+
+if __name__ == '__main__':
+    main()
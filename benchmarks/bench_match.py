@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Producer matching benchmark for Pressly
+
+Seeds producers, loads the in-memory producer matrix from the database and
+times top-k matches against it for a few requirement sets, with and without a
+location, next to the SQL capability ranking /api/producers/search uses.
+
+    python benchmarks/bench_match.py --sizes 10000 100000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+REQUIREMENTS = [
+    ['offset'],
+    ['digital', 'binding'],
+    ['letterpress', 'foil-stamping', 'embroidery'],
+]
+CHICAGO = (41.88, -87.63)
+
+
+def run_size(size, runs, k):
+    from bench_producers import percentile, seed
+
+    workdir = tempfile.mkdtemp(prefix='pressly-bench-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+    from flask_migrate import upgrade
+    from app import app, capability_match_query, producer_match_features, producer_rows_query
+    from matching import ProducerMatrix
+
+    with app.app_context():
+        upgrade()
+        seed(size)
+        started = time.perf_counter()
+        matrix = ProducerMatrix()
+        matrix.load(producer_match_features())
+        load_ms = (time.perf_counter() - started) * 1000
+
+        print(f'{size} producers, top {k}, {runs} runs per case, matrix load {load_ms:.0f} ms')
+        print(f'{"requirements":<52}{"matrix p50":>12}{"matrix p99":>12}{"sql p50":>10}{"sql p99":>10}')
+        for capabilities in REQUIREMENTS:
+            for location in (None, CHICAGO):
+                cases = [
+                    lambda: matrix.match(capabilities, k, False, *(location or (None, None))),
+                    lambda: capability_match_query(producer_rows_query(), capabilities).limit(k).all(),
+                ]
+                row = []
+                for case in cases:
+                    timings = []
+                    for _ in range(runs):
+                        started = time.perf_counter()
+                        case()
+                        timings.append((time.perf_counter() - started) * 1000)
+                    row += [percentile(timings, 50), percentile(timings, 99)]
+                label = ', '.join(capabilities) + (' near Chicago' if location else '')
+                sql = f'{row[2]:>10.2f}{row[3]:>10.2f}' if location is None else f'{"-":>10}{"-":>10}'
+                print(f'{label:<52}{row[0]:>12.2f}{row[1]:>12.2f}{sql}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark in-memory producer matching against SQL ranking')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.size:
+        run_size(args.size, args.runs, args.k)
+        return
+
+    # Each size runs in its own process so the app binds to a fresh database
+    for size in args.sizes:
+        subprocess.run([sys.executable, __file__, '--size', str(size), '--runs', str(args.runs),
+                        '--k', str(args.k)], check=True)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Order pipeline benchmark for Pressly
+
+Creates orders through POST /api/orders in batches and moves them from pending
+to in_production, once with the set-based POST /api/orders/transition and once
+with a per-order ORM loop (load, check, assign, commit per batch), and reports
+orders and transitions per second for each.
+
+    python benchmarks/bench_orders.py --orders 20000 --batch 200 --producers 50
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed_catalog(listings):
+    # One designer with a design and some active listings, plus a customer
+    from app import db, User, Designer, Design, ProductListing
+
+    now = datetime.utcnow()
+    customer = User(email='customer@example.com', password_hash='x', full_name='Customer', user_type='designer')
+    designer_user = User(email='designer@example.com', password_hash='x', full_name='Designer', user_type='designer')
+    db.session.add_all([customer, designer_user])
+    db.session.flush()
+    designer = Designer(user_id=designer_user.id)
+    db.session.add(designer)
+    db.session.flush()
+    design = Design(designer_id=designer.id, title='Poster', status='active')
+    db.session.add(design)
+    db.session.flush()
+    listing_ids = [str(uuid.uuid4()) for _ in range(listings)]
+    db.session.execute(ProductListing.__table__.insert(), [{
+        'id': listing_id, 'design_id': design.id, 'sku': f'SKU-{i:05d}', 'base_price': 10.0 + i,
+        'is_active': True, 'created_at': now, 'updated_at': now,
+    } for i, listing_id in enumerate(listing_ids)])
+    db.session.commit()
+    return customer.id, listing_ids
+
+
+def batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bulk order creation and status transitions')
+    parser.add_argument('--orders', type=int, default=20000, help='orders per transition strategy')
+    parser.add_argument('--batch', type=int, default=200)
+    parser.add_argument('--producers', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pressly-bench-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+    from flask_migrate import upgrade
+    from sqlalchemy import event
+    from bench_producers import QueryCounter, seed
+    from app import app, db, Order, Producer, ORDER_TRANSITIONS
+
+    with app.app_context():
+        upgrade()
+        seed(args.producers)
+        producer_ids = db.session.execute(db.select(Producer.id)).scalars().all()
+        customer_id, listing_ids = seed_catalog(20)
+        counter = QueryCounter(db.engine, event)
+        client = app.test_client()
+
+        # Bulk creation, for both halves of the run
+        payloads = [{'customerId': customer_id, 'producerId': producer_ids[i % len(producer_ids)],
+                     'productListingId': listing_ids[i % len(listing_ids)]} for i in range(2 * args.orders)]
+        order_ids = []
+        started = time.perf_counter()
+        for batch in batches(payloads, args.batch):
+            response = client.post('/api/orders', json={'orders': batch})
+            assert response.status_code == 201, response.json
+            order_ids.extend(order['id'] for order in response.json['created'])
+        create_rate = len(order_ids) / (time.perf_counter() - started)
+        bulk_ids, loop_ids = order_ids[:args.orders], order_ids[args.orders:]
+
+        # Set-based transitions through the API
+        started = time.perf_counter()
+        with counter:
+            for batch in batches(bulk_ids, args.batch):
+                response = client.post('/api/orders/transition', json={'ids': batch, 'status': 'in_production'})
+                assert len(response.json['updated']) == len(batch), response.json
+            bulk_queries = counter.count
+        bulk_rate = len(bulk_ids) / (time.perf_counter() - started)
+
+        # Per-order ORM loop
+        started = time.perf_counter()
+        with counter:
+            for batch in batches(loop_ids, args.batch):
+                for order_id in batch:
+                    order = db.session.get(Order, order_id)
+                    if 'in_production' in ORDER_TRANSITIONS.get(order.status, ()):
+                        order.status = 'in_production'
+                db.session.commit()
+            loop_queries = counter.count
+        loop_rate = len(loop_ids) / (time.perf_counter() - started)
+
+        print(f'{args.orders} orders per strategy, batches of {args.batch}, {args.producers} producers')
+        print(f'bulk create: {create_rate:.0f} orders/s')
+        print(f'{"transitions":<28}{"per second":>12}{"queries":>10}')
+        print(f'{"set-based UPDATE (API)":<28}{bulk_rate:>12.0f}{bulk_queries:>10}')
+        print(f'{"per-order ORM loop":<28}{loop_rate:>12.0f}{loop_queries:>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Producer API benchmark for Pressly
+
+Seeds N producers into a throwaway SQLite database and reports the number of
+SQL statements and the p50/p99 latency of the producer read endpoints.
+Cached GET endpoints are measured warm unless --cold clears the response
+cache before every request.
+
+    python benchmarks/bench_producers.py --producers 5000 --runs 20 [--cold]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CAPABILITIES = ['digital', 'offset', 'large-format', 'letterpress', 'foil-stamping',
+                'screen-printing', 'embroidery', 'binding', 'variable-data']
+NAME_WORDS = ['Print', 'Press', 'Studio', 'Ink', 'Graphics', 'Works', 'Copy', 'Label',
+              'Signs', 'Paper', 'Foundry', 'Atelier', 'Impressions', 'Media', 'Supply']
+DESCRIPTION_WORDS = ['posters', 'banners', 'business', 'cards', 'apparel', 'packaging',
+                     'stickers', 'vinyl', 'canvas', 'booklets', 'brochures', 'invitations',
+                     'eco', 'fast', 'turnaround', 'premium', 'recycled', 'local', 'bulk',
+                     'custom', 'wedding', 'menus', 'catalogs', 'magazines', 'textiles']
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed(count):
+    from app import db, User, Producer, ProducerCapability, capability_rows
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    users = []
+    producers = []
+    for i in range(count):
+        user_id = str(uuid.uuid4())
+        users.append({
+            'id': user_id,
+            'email': f'producer{i}@example.com',
+            'password_hash': 'x',
+            'full_name': f'Producer Owner {i}',
+            'phone': f'555-{i:06d}',
+            'user_type': 'producer',
+            'created_at': now,
+            'updated_at': now,
+            'is_active': True,
+        })
+        producers.append({
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'business_name': ' '.join(rng.sample(NAME_WORDS, 2)) + f' {i}',
+            'description': ' '.join(rng.sample(DESCRIPTION_WORDS, 8)),
+            'production_capabilities': {'capabilities': [CAPABILITIES[i % len(CAPABILITIES)],
+                                                         CAPABILITIES[(i * 7) % len(CAPABILITIES)]]},
+            'rating': round((i % 50) / 10.0, 1),
+            'verified': i % 3 == 0,
+            'capacity': round(rng.random(), 2),
+            'latitude': round(rng.uniform(25.0, 49.0), 5),
+            'longitude': round(rng.uniform(-124.0, -67.0), 5),
+            'joined_at': now - timedelta(minutes=i),
+        })
+    db.session.execute(User.__table__.insert(), users)
+    db.session.execute(Producer.__table__.insert(), producers)
+    capabilities = []
+    for producer in producers:
+        capabilities.extend(capability_rows(producer['id'], producer['production_capabilities']))
+    db.session.execute(ProducerCapability.__table__.insert(), capabilities)
+    db.session.commit()
+
+
+class QueryCounter:
+    def __init__(self, engine, event):
+        self.count = 0
+        self.engine = engine
+        self.event = event
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        self.event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        self.event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def measure(client, counter, method, url, runs, before=None, **kwargs):
+    timings = []
+    with counter:
+        getattr(client, method)(url, **kwargs)
+        queries = counter.count
+    for _ in range(runs):
+        if before:
+            before()
+        started = time.perf_counter()
+        response = getattr(client, method)(url, **kwargs)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.status_code
+    return queries, percentile(timings, 50), percentile(timings, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the producer API endpoints')
+    parser.add_argument('--producers', type=int, default=5000)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--cold', action='store_true', help='clear the response cache before each request')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pressly-bench-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+    from flask_migrate import upgrade
+    from sqlalchemy import event
+    from app import app, db, cache, Producer
+
+    with app.app_context():
+        upgrade()
+        seed(args.producers)
+        producer_id = db.session.query(Producer.id).first()[0]
+        counter = QueryCounter(db.engine, event)
+        client = app.test_client()
+
+        cases = [
+            ('GET /api/producers', 'get', '/api/producers', {}),
+            ('GET /api/producers/<id>', 'get', f'/api/producers/{producer_id}', {}),
+            ('POST /api/producers/search', 'post', '/api/producers/search',
+             {'json': {'query': 'press', 'capabilities': ['offset', 'binding']}}),
+            ('POST /api/producers/search all', 'post', '/api/producers/search',
+             {'json': {'capabilities': ['offset', 'binding'], 'match': 'all'}}),
+        ]
+
+        print(f'{args.producers} producers, {args.runs} runs per endpoint')
+        print(f'{"endpoint":<36}{"queries":>8}{"p50 ms":>10}{"p99 ms":>10}')
+        for label, method, url, kwargs in cases:
+            queries, p50, p99 = measure(client, counter, method, url, args.runs,
+                                        before=cache.clear if args.cold else None, **kwargs)
+            print(f'{label:<36}{queries:>8}{p50:>10.2f}{p99:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
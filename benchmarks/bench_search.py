@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Producer text search benchmark for Pressly
+
+Compares the full-text index used by /api/producers/search (ranked, top 50)
+against the old leading-wildcard ILIKE filter (every match, unordered, as the
+endpoint used to return) at several catalog sizes, using typeahead-style
+prefixes of the kind the search box sends on each keystroke.
+
+    python benchmarks/bench_search.py --sizes 10000 100000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = ['pr', 'pre', 'press', 'eco pos', 'wedding invitations', 'studio ink', 'atelier foundry 4242']
+
+
+def run_size(size, runs):
+    import tempfile
+    from bench_producers import percentile, seed
+
+    workdir = tempfile.mkdtemp(prefix='pressly-bench-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+    from flask_migrate import upgrade
+    from app import app, db, Producer, producer_rows_query, producer_search_backend, producer_text_search
+
+    with app.app_context():
+        upgrade()
+        seed(size)
+        backend = producer_search_backend()
+
+        def indexed(text):
+            return producer_text_search(producer_rows_query(), text).limit(50)
+
+        def ilike(text):
+            return producer_rows_query().filter(Producer.business_name.ilike(f'%{text}%') |
+                                                Producer.description.ilike(f'%{text}%'))
+
+        print(f'{size} producers, {runs} runs per query, index backend: {backend}')
+        print(f'{"query":<22}{"index p50":>11}{"index p99":>11}{"ilike p50":>11}{"ilike p99":>11}')
+        for text in QUERIES:
+            row = [text]
+            for build in (indexed, ilike):
+                timings = []
+                for _ in range(runs):
+                    started = time.perf_counter()
+                    build(text).all()
+                    timings.append((time.perf_counter() - started) * 1000)
+                row += [percentile(timings, 50), percentile(timings, 99)]
+            print(f'{row[0]:<22}{row[1]:>11.2f}{row[2]:>11.2f}{row[3]:>11.2f}{row[4]:>11.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark producer full-text search against ILIKE')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.size:
+        run_size(args.size, args.runs)
+        return
+
+    # Each size runs in its own process so the app binds to a fresh database
+    for size in args.sizes:
+        subprocess.run([sys.executable, __file__, '--size', str(size), '--runs', str(args.runs)], check=True)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+API serialization benchmark for Pressly
+
+Seeds N producers into a throwaway SQLite database, fetches the listing rows
+once and then times only turning them into a response body, per 10k producers:
+the hand-built dicts and Flask's JSON provider the handlers used before, the
+compiled schema encoders with the standard library and with orjson (when
+installed), and a `fields=id,businessName` projection. The database fetch and
+a full GET /api/producers (cache cleared) are timed too, to show serialization's
+share of the request. Every variant is checked to produce the same document.
+
+    python benchmarks/bench_serialization.py --producers 10000 --runs 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def handwritten_row_to_dict(row):
+    # The field-by-field builder the producer handlers used before the schemas
+    return {
+        'id': row.id,
+        'businessName': row.business_name,
+        'description': row.description,
+        'capabilities': row.production_capabilities,
+        'rating': row.rating,
+        'verified': row.verified,
+        'location': {'lat': row.latitude, 'lng': row.longitude} if row.latitude is not None and row.longitude is not None else None,
+        'joinedAt': row.joined_at.isoformat(),
+        'fullName': row.full_name,
+        'email': row.email,
+        'phone': row.phone,
+    }
+
+
+def timed(function, runs):
+    # Median milliseconds of `runs` calls, and the last result
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark API response serialization')
+    parser.add_argument('--producers', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pressly-bench-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+    from flask_migrate import upgrade
+    from app import app, cache, PRODUCER_SCHEMA, producer_rows_query, producers_after
+    from bench_producers import seed
+    import serializers
+
+    with app.app_context():
+        upgrade()
+        seed(args.producers)
+        fetch_ms, rows = timed(lambda: producers_after(producer_rows_query()).all(), max(3, args.runs // 4))
+        scale = 10000 / len(rows)
+        encode = PRODUCER_SCHEMA.encoder()
+        projected = ['id', 'businessName']
+
+        cases = [
+            ('handler dicts + Flask JSON provider (before)',
+             lambda: app.json.dumps([handwritten_row_to_dict(row) for row in rows]).encode()),
+            ('compiled encoder + stdlib json',
+             lambda: serializers.stdlib_dumps(list(map(encode, rows)))),
+            ('compiled encoder, fields=id,businessName, stdlib',
+             lambda: serializers.stdlib_dumps(list(map(PRODUCER_SCHEMA.encoder(projected), rows)))),
+        ]
+        if serializers.orjson is not None:
+            cases += [
+                ('compiled encoder + orjson', lambda: serializers.orjson.dumps(list(map(encode, rows)))),
+                ('compiled encoder, fields=id,businessName, orjson',
+                 lambda: serializers.orjson.dumps(list(map(PRODUCER_SCHEMA.encoder(projected), rows)))),
+            ]
+        else:
+            print('orjson is not installed; only the standard library backend is measured')
+
+        print(f'{len(rows)} producers, median of {args.runs} runs, scaled to 10k producers')
+        print(f'{"case":<52}{"ms/10k":>9}{"KiB":>9}{"speedup":>9}')
+        expected = None
+        baseline = None
+        for label, function in cases:
+            elapsed, body = timed(function, args.runs)
+            document = json.loads(body)
+            if 'fields=' not in label:
+                expected = expected or document
+                assert document == expected, f'{label} produced a different document'
+            baseline = baseline or elapsed
+            print(f'{label:<52}{elapsed * scale:>9.1f}{len(body) / 1024:>9.0f}{baseline / elapsed:>8.1f}x')
+
+        client = app.test_client()
+
+        def request_listing():
+            cache.clear()
+            return client.get('/api/producers')
+
+        request_ms, response = timed(request_listing, max(3, args.runs // 4))
+        assert json.loads(response.data) == expected
+        print(f'{"database fetch of the rows":<52}{fetch_ms * scale:>9.1f}')
+        print(f'{"GET /api/producers, cache cleared":<52}{request_ms * scale:>9.1f}{len(response.data) / 1024:>9.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Producer snapshot benchmark for Pressly
+
+Seeds N producers into a throwaway SQLite database, exports the producer
+snapshot and publishes it with static_server.py (which answers conditional
+GETs), then compares GET /api/producers and /api/producers/featured served
+from the database (response cache cleared before every request, as in a fresh
+serverless container) with the same requests served from the snapshot:
+SQL statements, p50/p99 latency, bytes sent and 304 revalidations. Finally a
+producer is changed, the snapshot is exported again and the time until the
+serving app returns the change is reported.
+
+    python benchmarks/bench_snapshot.py --producers 5000 --runs 50 --max-age 1
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(client, counter, url, runs, headers=None, before=None, status=200):
+    timings = []
+    sizes = []
+    with counter:
+        for _ in range(runs):
+            if before:
+                before()
+            started = time.perf_counter()
+            response = client.get(url, headers=headers or {})
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == status, response.status_code
+            sizes.append(len(response.data))
+        queries = counter.count / runs
+    return queries, timings, sum(sizes) / len(sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare producer listings served from the database and from the snapshot')
+    parser.add_argument('--producers', type=int, default=5000)
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--max-age', type=int, default=1, help='PRODUCER_SNAPSHOT_MAX_AGE for the freshness check')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pressly-bench-')
+    published = os.path.join(workdir, 'published')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+    from flask_migrate import upgrade
+    from sqlalchemy import event
+    from app import app, db, cache, Producer, export_producer_snapshot
+    from bench_producers import QueryCounter, percentile, seed
+    from static_server import make_server
+
+    server = make_server(published, 0, '127.0.0.1')
+    server.verbose = False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with app.app_context():
+        upgrade()
+        seed(args.producers)
+        started = time.perf_counter()
+        documents = export_producer_snapshot(os.path.join(published, 'producers.snapshot'))
+        export_ms = (time.perf_counter() - started) * 1000
+        counter = QueryCounter(db.engine, event)
+        client = app.test_client()
+
+        print(f'{args.producers} producers, {args.runs} runs per case, export took {export_ms:.0f} ms')
+        for name, document in documents.items():
+            print(f'  {name}: {document.size / 1024:.0f} KiB of JSON, {len(document.body) / 1024:.0f} KiB gzipped')
+        print(f'{"case":<44}{"queries":>8}{"p50 ms":>9}{"p99 ms":>9}{"KiB sent":>10}')
+
+        def report(label, result):
+            queries, timings, size = result
+            print(f'{label:<44}{queries:>8.1f}{percentile(timings, 50):>9.2f}{percentile(timings, 99):>9.2f}{size / 1024:>10.1f}')
+
+        gzip_headers = {'Accept-Encoding': 'gzip'}
+        for url in ('/api/producers', '/api/producers/featured'):
+            report(f'database {url}', measure(client, counter, url, args.runs, before=cache.clear))
+
+        app.config['PRODUCER_SNAPSHOT_URL'] = f'http://127.0.0.1:{server.server_address[1]}/producers.snapshot'
+        app.config['PRODUCER_SNAPSHOT_MAX_AGE'] = args.max_age
+        started = time.perf_counter()
+        etag = client.get('/api/producers', headers=gzip_headers).headers['ETag']
+        print(f'first snapshot request (loads the artifact): {(time.perf_counter() - started) * 1000:.1f} ms')
+        for url in ('/api/producers', '/api/producers/featured'):
+            report(f'snapshot {url} gzip', measure(client, counter, url, args.runs, gzip_headers))
+        report('snapshot /api/producers identity', measure(client, counter, '/api/producers', args.runs))
+        report('snapshot /api/producers If-None-Match', measure(
+            client, counter, '/api/producers', args.runs, dict(gzip_headers, **{'If-None-Match': etag}), status=304))
+
+        # Freshness: a change reaches the serving app one export plus at most one max age later
+        producer = db.session.get(Producer, db.session.query(Producer.id).first()[0])
+        producer.business_name = 'Renamed Press'
+        db.session.commit()
+        time.sleep(1)  # static_server's ETag has one-second resolution
+        started = time.monotonic()
+        export_producer_snapshot(os.path.join(published, 'producers.snapshot'))
+        while True:
+            body = client.get('/api/producers', headers=gzip_headers).data
+            if any(item['businessName'] == 'Renamed Press' for item in json.loads(gzip.decompress(body))):
+                break
+            time.sleep(0.05)
+        print(f'change visible {time.monotonic() - started:.2f} s after the export started (max age {args.max_age} s)')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
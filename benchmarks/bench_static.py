@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Static server benchmark for Pressly
+
+Serves the same generated build directory with the old single-threaded
+socketserver.TCPServer + SimpleHTTPRequestHandler setup and with
+static_server.py, then drives both with concurrent keep-alive clients.
+--slow-clients opens connections that send half a request and stall, which
+blocks the old server entirely.
+
+    python benchmarks/bench_static.py --clients 32 --seconds 5 --slow-clients 1
+"""
+
+import argparse
+import http.client
+import http.server
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from static_server import make_server, precompress
+
+PATHS = ['/', '/static/js/main.3f9a1c2e.js', '/static/css/main.7b2d4e1f.css', '/producers', '/logo192.png']
+
+
+def build_directory():
+    directory = tempfile.mkdtemp(prefix='pressly-static-')
+    os.makedirs(os.path.join(directory, 'static', 'js'))
+    os.makedirs(os.path.join(directory, 'static', 'css'))
+    files = {
+        'index.html': b'<!doctype html><html><head><title>Pressly</title></head><body><div id="root"></div></body></html>' * 20,
+        'static/js/main.3f9a1c2e.js': b'function pressly(){return "print";}\n' * 6000,
+        'static/css/main.7b2d4e1f.css': b'.producer-card{display:flex;margin:0 auto;}\n' * 2000,
+        'logo192.png': os.urandom(20000),
+    }
+    for name, body in files.items():
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(body)
+    precompress(directory)
+    return directory
+
+
+def legacy_server(directory):
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=directory, **kwargs)
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            # Handle SPA routing - redirect all paths to index.html
+            if self.path != "/" and "." not in self.path:
+                self.path = "/index.html"
+            return super().do_GET()
+
+    socketserver.TCPServer.allow_reuse_address = True
+    return socketserver.TCPServer(('127.0.0.1', 0), Handler)
+
+
+def new_server(directory):
+    server = make_server(directory, 0, '127.0.0.1')
+    server.verbose = False
+    return server
+
+
+def stall(port, stop):
+    # Sends an incomplete request line and holds the connection open
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.sendall(b'GET / HTTP/1.1\r\nHost: localhost\r\n')
+    stop.wait()
+    sock.close()
+
+
+def run(server, clients, seconds, slow_clients):
+    port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    stop = threading.Event()
+    stallers = [threading.Thread(target=stall, args=(port, stop), daemon=True) for _ in range(slow_clients)]
+    for staller in stallers:
+        staller.start()
+    time.sleep(0.1)
+
+    counts = {'ok': 0, 'errors': 0, 'bytes': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client_loop(index):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+        n = index
+        while time.perf_counter() < deadline:
+            try:
+                connection.request('GET', PATHS[n % len(PATHS)], headers={'Accept-Encoding': 'gzip'})
+                body = connection.getresponse().read()
+                with lock:
+                    counts['ok'] += 1
+                    counts['bytes'] += len(body)
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                with lock:
+                    counts['errors'] += 1
+            n += 1
+        connection.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(clients)]
+    for client in threads:
+        client.start()
+    for client in threads:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    server.shutdown()
+    server.server_close()
+    return counts['ok'] / elapsed, counts['errors'], counts['bytes'] / max(1, counts['ok'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark static_server.py against SimpleHTTPRequestHandler')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--slow-clients', type=int, default=0)
+    args = parser.parse_args()
+
+    directory = build_directory()
+    print(f'{args.clients} clients, {args.slow_clients} stalled connections, {args.seconds}s per server')
+    print(f'{"server":<28}{"req/s":>10}{"errors":>10}{"bytes/req":>12}')
+    for label, factory in (('TCPServer + SimpleHTTP', legacy_server), ('static_server.py', new_server)):
+        throughput, errors, size = run(factory(directory), args.clients, args.seconds, args.slow_clients)
+        print(f'{label:<28}{throughput:>10.1f}{errors:>10}{size:>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Synthetic marketplace data for Pressly
+
+Populates users, designers, producers (with their capability index), designs,
+product listings, orders (with the dashboard rollups) and messages at a scale
+given as the number of orders: 1k, 100k, 1m, ... Other tables are sized from
+it (see table_sizes), so a scale of N writes roughly 2N rows. The same scale
+and seed always produce the same rows, ids and timestamps; only the password
+hash, which every user shares, is salted afresh. Rows are generated lazily and
+written with one executemany INSERT per batch, so memory stays flat at any scale.
+
+Every user's password is PASSWORD. Emails are producer<i>@, designer<i>@ and
+customer<i>@example.com.
+
+    DATABASE_URL=sqlite:////tmp/pressly.db python benchmarks/marketplace.py --scale 100k [--seed 42]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_producers import CAPABILITIES, DESCRIPTION_WORDS, NAME_WORDS  # noqa: E402
+
+PASSWORD = 'pressly-benchmark'
+EPOCH = datetime(2025, 1, 1)  # every timestamp falls in the year after this
+BATCH_ROWS = 5000
+MESSAGE_ORDER_SAMPLE = 50000  # orders remembered for messages to refer to
+ORDER_STATUSES = ['pending', 'in_production', 'shipped', 'delivered', 'dispute']
+ORDER_STATUS_WEIGHTS = [20, 15, 15, 45, 5]
+DESIGN_STATUSES = ['draft', 'active', 'archived']
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+COLORS = ['black', 'white', 'navy', 'red', 'heather', 'forest', 'sand', 'pink']
+TITLE_WORDS = ['Poster', 'Tee', 'Tote', 'Print', 'Card', 'Sticker', 'Zine', 'Label', 'Banner', 'Mug']
+
+
+def parse_scale(value):
+    # '1k', '100k', '1m' or a plain number of orders
+    value = str(value).strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(value[-1:], 1)
+    number = value[:-1] if multiplier > 1 else value
+    try:
+        scale = int(float(number) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{value} is not a scale like 1k, 100k or 1m') from None
+    if scale < 1:
+        raise argparse.ArgumentTypeError('The scale must be at least 1')
+    return scale
+
+
+def table_sizes(scale):
+    return {
+        'producers': max(10, scale // 100),
+        'designers': max(10, scale // 50),
+        'customers': max(20, scale // 20),
+        'designs': max(20, scale // 10),
+        'listings': max(40, scale // 5),
+        'orders': scale,
+        'messages': scale // 2,
+    }
+
+
+def make_id(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def moment(rng, days=365):
+    return EPOCH + timedelta(seconds=rng.randrange(days * 86400))
+
+
+def insert_rows(table, rows):
+    # One executemany INSERT and commit per BATCH_ROWS rows; returns how many were written
+    from app import db
+
+    written = 0
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, BATCH_ROWS))
+        if not batch:
+            return written
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+        written += len(batch)
+
+
+def user_rows(rng, kind, count, password_hash, ids):
+    for i in range(count):
+        ids.append(make_id(rng))
+        created_at = moment(rng)
+        yield {
+            'id': ids[-1], 'email': f'{kind}{i}@example.com', 'password_hash': password_hash,
+            'full_name': f'{kind.title()} {i}', 'phone': f'555-{i:07d}', 'user_type': kind,
+            'created_at': created_at, 'updated_at': created_at, 'is_active': True,
+        }
+
+
+def producer_rows(rng, user_ids, ids, capabilities):
+    for i, user_id in enumerate(user_ids):
+        ids.append(make_id(rng))
+        production_capabilities = {'capabilities': rng.sample(CAPABILITIES, rng.randint(1, 4))}
+        capabilities.append((ids[-1], production_capabilities))
+        yield {
+            'id': ids[-1], 'user_id': user_id,
+            'business_name': ' '.join(rng.sample(NAME_WORDS, 2)) + f' {i}',
+            'description': ' '.join(rng.sample(DESCRIPTION_WORDS, 8)),
+            'production_capabilities': production_capabilities,
+            'rating': round(rng.uniform(0, 5), 1), 'verified': rng.random() < 0.4,
+            'capacity': round(rng.random(), 2),
+            'latitude': round(rng.uniform(25.0, 49.0), 5), 'longitude': round(rng.uniform(-124.0, -67.0), 5),
+            'joined_at': moment(rng),
+        }
+
+
+def designer_rows(rng, user_ids, ids):
+    for i, user_id in enumerate(user_ids):
+        ids.append(make_id(rng))
+        yield {
+            'id': ids[-1], 'user_id': user_id, 'brand_name': f'Studio {i}',
+            'bio': ' '.join(rng.sample(DESCRIPTION_WORDS, 6)), 'rating': round(rng.uniform(0, 5), 1),
+            'design_preferences': {'capabilities': rng.sample(CAPABILITIES, 2)}, 'joined_at': moment(rng),
+        }
+
+
+def design_rows(rng, count, designer_ids, ids):
+    for i in range(count):
+        ids.append(make_id(rng))
+        created_at = moment(rng)
+        yield {
+            'id': ids[-1], 'designer_id': rng.choice(designer_ids),
+            'title': f'{rng.choice(TITLE_WORDS)} {i}', 'description': ' '.join(rng.sample(DESCRIPTION_WORDS, 10)),
+            'specifications': {'capabilities': rng.sample(CAPABILITIES, rng.randint(1, 3)),
+                               'colors': rng.choice(['CMYK', 'Pantone', 'RGB'])},
+            'status': rng.choices(DESIGN_STATUSES, [1, 8, 1])[0],
+            'created_at': created_at, 'updated_at': created_at + timedelta(hours=rng.randrange(24 * 30)),
+            'is_active': True,
+        }
+
+
+def listing_rows(rng, count, design_ids, listings):
+    for i in range(count):
+        created_at = moment(rng)
+        listings.append((make_id(rng), round(rng.uniform(8, 60), 2)))
+        yield {
+            'id': listings[-1][0], 'design_id': rng.choice(design_ids), 'sku': f'SKU-{i:08d}',
+            'base_price': listings[-1][1], 'available_sizes': rng.sample(SIZES, 3),
+            'available_colors': rng.sample(COLORS, 2),
+            'printing_requirements': {'method': rng.choice(['dtg', 'screen', 'sublimation']), 'dpi': 300},
+            'is_active': True, 'created_at': created_at, 'updated_at': created_at,
+        }
+
+
+def order_rows(rng, count, customer_ids, producer_ids, listings, sample):
+    for i in range(count):
+        listing_id, price = rng.choice(listings)
+        created_at = moment(rng)
+        order = {
+            'id': make_id(rng), 'customer_id': rng.choice(customer_ids), 'producer_id': rng.choice(producer_ids),
+            'product_listing_id': listing_id, 'total_amount': round(price * rng.randint(1, 5), 2),
+            'status': rng.choices(ORDER_STATUSES, ORDER_STATUS_WEIGHTS)[0],
+            'created_at': created_at, 'updated_at': created_at + timedelta(hours=rng.randrange(24 * 14)),
+            'shipping_details': {'postalCode': f'{rng.randrange(100000):05d}'}, 'payment_details': None,
+        }
+        if len(sample) < MESSAGE_ORDER_SAMPLE:
+            sample.append((order['id'], order['customer_id'], order['producer_id']))
+        yield order
+
+
+def message_rows(rng, count, orders, producer_users):
+    # Conversations between a customer and the producer of one of their orders, both ways
+    for i in range(count):
+        order_id, customer_id, producer_id = rng.choice(orders)
+        sender, receiver = customer_id, producer_users[producer_id]
+        if rng.random() < 0.5:
+            sender, receiver = receiver, sender
+        yield {
+            'id': make_id(rng), 'sender_id': sender, 'receiver_id': receiver,
+            'order_id': order_id if rng.random() < 0.7 else None,
+            'content': ' '.join(rng.choices(DESCRIPTION_WORDS, k=rng.randint(4, 20))),
+            'sent_at': moment(rng), 'is_read': rng.random() < 0.6,
+        }
+
+
+def seed_marketplace(scale, seed=42, log=None):
+    """Write a marketplace of `scale` orders into the current app's database; returns rows per table."""
+    from app import (db, passwords, capability_rows, reconcile_order_rollups, Design, Designer, Message, Order,
+                     Producer, ProducerCapability, ProductListing, User)
+
+    sizes = table_sizes(scale)
+    password_hash = passwords.hash(PASSWORD)
+    written = {}
+
+    def step(name, table, rows):
+        # Each table gets its own generator, so adding one doesn't shift the rows of the others
+        started = time.perf_counter()
+        written[name] = written.get(name, 0) + insert_rows(table, rows)
+        if log:
+            log(f'{name:<22}{written[name]:>10} rows {time.perf_counter() - started:>8.1f} s')
+
+    def rng(name):
+        return random.Random(f'{seed}:{name}')
+
+    producer_user_ids, designer_user_ids, customer_ids = [], [], []
+    step('users', User.__table__, user_rows(rng('producer users'), 'producer', sizes['producers'], password_hash,
+                                            producer_user_ids))
+    step('users', User.__table__, user_rows(rng('designer users'), 'designer', sizes['designers'], password_hash,
+                                            designer_user_ids))
+    step('users', User.__table__, user_rows(rng('customers'), 'customer', sizes['customers'], password_hash,
+                                            customer_ids))
+
+    producer_ids, capabilities = [], []
+    step('producers', Producer.__table__, producer_rows(rng('producers'), producer_user_ids, producer_ids, capabilities))
+    step('producer_capabilities', ProducerCapability.__table__,
+         (row for producer_id, value in capabilities for row in capability_rows(producer_id, value)))
+    designer_ids = []
+    step('designers', Designer.__table__, designer_rows(rng('designers'), designer_user_ids, designer_ids))
+    design_ids = []
+    step('designs', Design.__table__, design_rows(rng('designs'), sizes['designs'], designer_ids, design_ids))
+    listings = []
+    step('listings', ProductListing.__table__, listing_rows(rng('listings'), sizes['listings'], design_ids, listings))
+    orders = []
+    step('orders', Order.__table__, order_rows(rng('orders'), sizes['orders'], customer_ids, producer_ids, listings,
+                                               orders))
+    producer_users = dict(zip(producer_ids, producer_user_ids))
+    step('messages', Message.__table__, message_rows(rng('messages'), sizes['messages'], orders, producer_users))
+
+    # The bulk inserts bypass the ORM events that keep the dashboard rollups, so rebuild them
+    started = time.perf_counter()
+    written['order_rollups'] = reconcile_order_rollups()
+    if log:
+        log(f'{"order_rollups":<22}{written["order_rollups"]:>10} rows {time.perf_counter() - started:>8.1f} s')
+    db.session.commit()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed the database with a synthetic marketplace')
+    parser.add_argument('--scale', type=parse_scale, default='10k', help='number of orders: 1k, 100k, 1m, ...')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from flask_migrate import upgrade
+    from app import app
+
+    with app.app_context():
+        upgrade()
+        started = time.perf_counter()
+        written = seed_marketplace(args.scale, args.seed, log=print)
+        print(f'{sum(written.values())} rows in {time.perf_counter() - started:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
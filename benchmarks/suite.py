@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite for Pressly
+
+Seeds a synthetic marketplace (marketplace.py) into a throwaway SQLite database,
+or uses --database as it is, then drives the real endpoints twice:
+
+- in process through the Flask test client, one request at a time with the
+  response cache cleared first where an endpoint caches: SQL statements per
+  request, p50/p95/p99 latency and sequential throughput per endpoint;
+- over HTTP against gunicorn (sync workers), from several load-generator
+  processes with keep-alive connections and a weighted mix of the same
+  requests: throughput and latency percentiles per endpoint and overall.
+
+Results are written as JSON (--output). With --update-baseline they become the
+baseline; otherwise they are compared with the baseline and the suite exits 1
+if an endpoint runs more SQL statements, its p50 or p99 latency grows, or its
+throughput drops by more than --threshold. Latency changes smaller than
+--min-delta-ms are ignored as noise, and HTTP percentiles are only compared for
+endpoints with enough requests in both runs. Baselines only compare on the
+machine and dataset they were recorded on; the suite refuses a baseline from
+another dataset, database, bcrypt cost or load setting.
+
+    python benchmarks/suite.py --scale 10k --update-baseline     # record benchmarks/baseline.json
+    python benchmarks/suite.py --scale 10k --threshold 0.25      # compare a change against it
+    python benchmarks/suite.py --database postgresql://... --http-seconds 30 --output results.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.client import HTTPConnection
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCHMARKS)
+
+from bench_concurrency import free_port, wait_until_up  # noqa: E402
+from bench_producers import percentile  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCHMARKS, 'baseline.json')
+VARIANTS = 20  # distinct ids or queries each endpoint cycles through
+MIN_HTTP_SAMPLES = 50  # HTTP endpoints with fewer requests in either run are not compared
+MIN_P99_SAMPLES = 200  # nor is p99 below this many requests
+
+
+def endpoints(samples):
+    """(name, weight in the HTTP mix, cold, [(method, path, json body), ...]) for every endpoint.
+
+    Cold endpoints cache their responses; in process the cache is cleared before each request.
+    """
+    rng = random.Random(7)
+    producers, designers, customers = samples['producers'], samples['designers'], samples['customers']
+    return [
+        ('GET /api/producers', 1, True, [('GET', '/api/producers', None)]),
+        ('GET /api/producers?limit=50', 4, True, [('GET', '/api/producers?limit=50', None)]),
+        ('GET /api/producers/<id>', 10, True, [('GET', f'/api/producers/{id}', None) for id in producers]),
+        ('POST /api/producers/search', 6, False, [
+            ('POST', '/api/producers/search', {'query': rng.choice(['press', 'print', 'studio', 'ink']),
+                                               'capabilities': rng.sample(['offset', 'digital', 'binding',
+                                                                           'embroidery', 'screen-printing'], 2)})
+            for _ in range(VARIANTS)]),
+        ('POST /api/producers/search nearest', 3, False, [
+            ('POST', '/api/producers/search', {'capabilities': ['digital'], 'sort': 'distance', 'limit': 20,
+                                               'location': {'lat': round(rng.uniform(30, 45), 3),
+                                                            'lng': round(rng.uniform(-120, -75), 3)}})
+            for _ in range(VARIANTS)]),
+        ('POST /api/match', 3, False, [
+            ('POST', '/api/match', {'capabilities': rng.sample(['offset', 'digital', 'binding', 'foil-stamping'], 2)})
+            for _ in range(VARIANTS)]),
+        ('POST /api/login', 1, False, [
+            ('POST', '/api/login', {'email': email, 'password': samples['password']}) for email in samples['emails']]),
+        ('GET /api/designers/<id>/designs', 3, False, [
+            ('GET', f'/api/designers/{id}/designs', None) for id in designers]),
+        ('GET /api/producers/<id>/orders', 4, False, [
+            ('GET', f'/api/producers/{id}/orders?status=pending', None) for id in producers]),
+        ('GET /api/producers/<id>/dashboard', 4, False, [
+            ('GET', f'/api/producers/{id}/dashboard', None) for id in producers]),
+        ('GET /api/designers/<id>/dashboard', 4, False, [
+            ('GET', f'/api/designers/{id}/dashboard', None) for id in designers]),
+        ('GET /api/messages', 4, False, [('GET', f'/api/messages?userId={id}', None) for id in customers]),
+        ('GET /api/listings/export', 1, False, [
+            ('GET', f'/api/listings/export?designerId={id}&format=ndjson', None) for id in designers]),
+    ]
+
+
+def load_samples(db, models):
+    # The first VARIANTS rows by id: deterministic for a seeded database, whatever seeded it
+    from marketplace import PASSWORD
+
+    User, Designer, Producer = models
+    first = lambda column: [value for value, in db.session.query(column).order_by(column).limit(VARIANTS)]
+    return {
+        'producers': first(Producer.id),
+        'designers': first(Designer.id),
+        'customers': [id for id, in db.session.query(User.id).filter(User.user_type == 'customer')
+                      .order_by(User.id).limit(VARIANTS)],
+        'emails': [email for email, in db.session.query(User.email).filter(User.user_type == 'customer')
+                   .order_by(User.id).limit(VARIANTS)],
+        'password': PASSWORD,
+    }
+
+
+def summarize(latencies, elapsed, requests):
+    if not latencies:
+        return {'requests': requests, 'p50': None, 'p95': None, 'p99': None, 'throughput': 0.0}
+    return {
+        'requests': requests,
+        'p50': round(percentile(latencies, 50), 3),
+        'p95': round(percentile(latencies, 95), 3),
+        'p99': round(percentile(latencies, 99), 3),
+        'throughput': round(len(latencies) / elapsed, 2),
+    }
+
+
+def run_in_process(app, db, cache, cases, runs):
+    from sqlalchemy import event
+
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    results = {}
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+    for name, weight, cold, variants in cases:
+        # One untimed request warms lazily built services (matching matrix, password pool)
+        method, path, body = variants[0]
+        client.open(path, method=method, json=body)
+        latencies = []
+        total_statements = 0
+        elapsed = 0.0
+        for index in range(runs):
+            method, path, body = variants[index % len(variants)]
+            if cold:
+                with app.app_context():
+                    cache.clear()
+            statements[0] = 0
+            event.listen(engine, 'before_cursor_execute', count)
+            started = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            response.get_data()
+            took = time.perf_counter() - started
+            event.remove(engine, 'before_cursor_execute', count)
+            if response.status_code != 200:
+                raise RuntimeError(f'{name} answered {response.status_code}: {response.get_data(as_text=True)[:200]}')
+            latencies.append(took * 1000)
+            elapsed += took
+            total_statements += statements[0]
+        results[name] = dict(summarize(latencies, elapsed, runs), queries=round(total_statements / runs, 2))
+    return results
+
+
+def load_process(port, mix, seconds, connections, seed):
+    """Runs in a load-generator process; returns {endpoint: [latencies in ms]} and the error count."""
+    names = [name for name, _, _ in mix]
+    weights = [weight for _, weight, _ in mix]
+    variants = {name: requests for name, _, requests in mix}
+    latencies = {name: [] for name in names}
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def connection_loop(index):
+        rng = random.Random(f'{seed}:{index}')
+        connection = HTTPConnection('127.0.0.1', port, timeout=60)
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body = rng.choice(variants[name])
+            started = time.perf_counter()
+            try:
+                if body is None:
+                    connection.request(method, path)
+                else:
+                    connection.request(method, path, body=json.dumps(body),
+                                       headers={'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                connection.close()
+                connection = HTTPConnection('127.0.0.1', port, timeout=60)
+                ok = False
+            took = (time.perf_counter() - started) * 1000
+            with lock:
+                if ok:
+                    latencies[name].append(took)
+                else:
+                    errors[0] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=connection_loop, args=(index,)) for index in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def run_http(database_url, cases, args):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, WEB_CONCURRENCY=str(args.server_workers),
+               GUNICORN_WORKER_CLASS='sync', GUNICORN_TIMEOUT='120')
+    server = subprocess.Popen(['gunicorn', '--bind', f'127.0.0.1:{port}', 'wsgi:app'], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    mix = [(name, weight, variants) for name, weight, _, variants in cases]
+    try:
+        wait_until_up(port, timeout=60)
+        # A short round first so every worker has built its services before the measured one
+        load_process(port, mix, 1, args.server_workers * 2, 'warmup')
+        # Spawned, not forked: this process has imported the app and started its threads
+        context = multiprocessing.get_context('spawn')
+        started = time.monotonic()
+        with context.Pool(args.http_processes) as pool:
+            outcomes = pool.starmap(load_process, [(port, mix, args.http_seconds, args.http_connections, index)
+                                                   for index in range(args.http_processes)])
+        elapsed = time.monotonic() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    results = {}
+    everything = []
+    for name, _, _ in mix:
+        latencies = [took for process_latencies, _ in outcomes for took in process_latencies[name]]
+        everything += latencies
+        results[name] = summarize(latencies, elapsed, len(latencies))
+    total = dict(summarize(everything, elapsed, len(everything)), errors=sum(errors for _, errors in outcomes))
+    return {'total': total, 'endpoints': results}
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Regressions of results against baseline, as printable lines."""
+    regressions = []
+    http = results.get('http') or {}
+    baseline_http = baseline.get('http') or {}
+    phases = [('inProcess', results.get('inProcess') or {}, baseline.get('inProcess') or {}),
+              ('http', http.get('endpoints', {}), baseline_http.get('endpoints', {}))]
+    if http and baseline_http:
+        phases.append(('http', {'total': http['total']}, {'total': baseline_http['total']}))
+    for phase, current, previous in phases:
+        for name, before in previous.items():
+            after = current.get(name)
+            if after is None:
+                continue
+            if 'queries' in before and after['queries'] >= before['queries'] + 1:
+                regressions.append(f'{phase} {name}: {after["queries"]:g} SQL statements per request, '
+                                   f'was {before["queries"]:g}')
+            # A handful of requests says nothing about a percentile: p99 needs MIN_P99_SAMPLES in both runs,
+            # and HTTP endpoints that got fewer than MIN_HTTP_SAMPLES of the mix aren't compared at all
+            samples = min(before['requests'], after['requests'])
+            if phase == 'http' and samples < MIN_HTTP_SAMPLES:
+                continue
+            for metric in ('p50', 'p99') if samples >= MIN_P99_SAMPLES else ('p50',):
+                if after[metric] > before[metric] * (1 + threshold) and after[metric] - before[metric] >= min_delta_ms:
+                    regressions.append(f'{phase} {name}: {metric} {after[metric]:.2f} ms, was {before[metric]:.2f} ms')
+            # In process, requests run one at a time, so throughput is the mean latency again
+            if phase == 'http' and after['throughput'] < before['throughput'] / (1 + threshold):
+                regressions.append(f'{phase} {name}: {after["throughput"]:.1f} req/s, was {before["throughput"]:.1f}')
+    return regressions
+
+
+def print_table(title, results):
+    print(f'\n{title}')
+    print(f'{"endpoint":<40}{"queries":>8}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"req/s":>9}{"requests":>10}')
+    for name, result in results.items():
+        queries = f'{result["queries"]:g}' if 'queries' in result else '-'
+        cells = [f'{result[metric]:>9.2f}' if result[metric] is not None else f'{"-":>9}' for metric in ('p50', 'p95', 'p99')]
+        print(f'{name:<40}{queries:>8}{"".join(cells)}{result["throughput"]:>9.1f}{result["requests"]:>10}')
+
+
+def main():
+    from marketplace import parse_scale
+
+    parser = argparse.ArgumentParser(description='Run the end-to-end benchmark suite and compare it with a baseline')
+    parser.add_argument('--scale', type=parse_scale, default='10k', help='orders in the seeded marketplace')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', help='use this database instead of a fresh SQLite one; seeded if empty')
+    parser.add_argument('--runs', type=int, default=50, help='in-process requests per endpoint')
+    parser.add_argument('--http-seconds', type=float, default=10, help='0 skips the HTTP phase')
+    parser.add_argument('--http-processes', type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)))
+    parser.add_argument('--http-connections', type=int, default=8, help='keep-alive connections per process')
+    parser.add_argument('--server-workers', type=int, default=2, help='gunicorn sync workers')
+    parser.add_argument('--bcrypt-rounds', type=int, default=10, help='password hashing cost for seeding and login')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help='record the results as the baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed relative slowdown, 0.25 = 25%%')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='latency changes below this are noise')
+    args = parser.parse_args()
+
+    database_url = args.database or 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='pressly-suite-'), 'suite.db')
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['BCRYPT_ROUNDS'] = str(args.bcrypt_rounds)
+
+    from flask_migrate import upgrade
+    from marketplace import seed_marketplace
+    from app import app, db, cache, Designer, Message, Order, Producer, ProductListing, Design, User
+
+    with app.app_context():
+        upgrade()
+        if db.session.query(Producer.id).first() is None:
+            print(f'Seeding {args.scale} orders (seed {args.seed})')
+            seed_marketplace(args.scale, args.seed)
+        rows = {model.__tablename__: db.session.query(model).count()
+                for model in (User, Producer, Designer, Design, ProductListing, Order, Message)}
+        samples = load_samples(db, (User, Designer, Producer))
+        dialect = db.engine.dialect.name
+    cases = endpoints(samples)
+
+    results = {
+        'meta': {
+            'createdAt': datetime.utcnow().isoformat(timespec='seconds'),
+            'database': dialect,
+            'rows': rows,
+            'bcryptRounds': args.bcrypt_rounds,
+            'python': platform.python_version(),
+            'machine': platform.node(),
+            'cpus': os.cpu_count(),
+            'runs': args.runs,
+            'http': {'seconds': args.http_seconds, 'processes': args.http_processes,
+                     'connections': args.http_connections, 'serverWorkers': args.server_workers},
+        },
+    }
+    print(f'{dialect} database with ' + ', '.join(f'{count} {table}' for table, count in rows.items()))
+
+    results['inProcess'] = run_in_process(app, db, cache, cases, args.runs)
+    print_table(f'In process, {args.runs} requests per endpoint', results['inProcess'])
+    if args.http_seconds > 0:
+        results['http'] = run_http(database_url, cases, args)
+        print_table(f'HTTP, {args.http_processes} processes x {args.http_connections} connections for '
+                    f'{args.http_seconds:g} s against {args.server_workers} gunicorn workers',
+                    dict(results['http']['endpoints'], total=results['http']['total']))
+        if results['http']['total']['errors']:
+            print(f'{results["http"]["total"]["errors"]} HTTP requests failed')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nBaseline written to {args.baseline}')
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'\nNo baseline at {args.baseline}; record one with --update-baseline')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    recorded = {key: baseline['meta'].get(key) for key in ('database', 'rows', 'bcryptRounds', 'runs', 'http')}
+    if recorded != {key: results['meta'][key] for key in recorded}:
+        print(f'\nThe baseline was recorded on a different dataset or configuration: {recorded}')
+        return 2
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    for line in regressions:
+        print(f'REGRESSION {line}')
+    print(f'\n{len(regressions)} regressions against {args.baseline}' if regressions
+          else f'\nNo regressions beyond {args.threshold:.0%} against {args.baseline}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,13 +5,12 @@ This script creates a simple server to serve the static files
 and bypass the React development server that's freezing.
 """
 
-import http.server
-import socketserver
 import os
-import sys
 import webbrowser
 from pathlib import Path
 
+from static_server import make_server
+
 # Check which directory to serve from
 build_dir = Path("./build")
 static_fallback = Path("./static_fallback")
@@ -106,19 +105,14 @@ else:
 
 # Configure the server
 PORT = 5001
-Handler = http.server.SimpleHTTPRequestHandler
-
-class MyHandler(Handler):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory=serve_dir, **kwargs)
 
 # Start the server
-print(f"Starting Pressly server on http://localhost:{PORT}")
-print(f"Press Ctrl+C to stop the server")
-try:
-    with socketserver.TCPServer(("", PORT), MyHandler) as httpd:
+with make_server(serve_dir, PORT) as httpd:
+    print(f"Starting Pressly server on http://localhost:{PORT}")
+    print(f"Press Ctrl+C to stop the server")
+    try:
         print("Opening browser...")
         webbrowser.open(f"http://localhost:{PORT}")
         httpd.serve_forever()
-except KeyboardInterrupt:
-    print("\nServer stopped.")
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
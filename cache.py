@@ -0,0 +1,102 @@
+"""
+Response cache backends for Pressly
+
+Both backends expose the same small interface (get/set/delete/incr) so the API
+can switch between an in-process LRU and a shared Redis without code changes.
+Values are JSON-serializable dicts.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    # In-process cache with a bounded number of entries and a per-entry TTL
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # Counters (e.g. the producer cache generation) live apart from the entries, so trimming the
+        # LRU can't evict one; a counter that restarted would make older entries current again
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._counters.pop(key, None)
+
+    def incr(self, key):
+        # Counters never expire or get evicted, so a generation can't silently reset
+        with self._lock:
+            value = self._counters[key] = self._counters.get(key, 0) + 1
+            return value
+
+    def clear(self):
+        # Drops the counters too, which is safe because every entry they versioned goes with them
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisCache:
+    # Shared cache on any client with the redis-py get/set/delete/incr API
+
+    def __init__(self, client, prefix='pressly:', ttl=300):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl or None)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def incr(self, key):
+        return int(self.client.incr(self.prefix + key))
+
+
+def create_cache(config):
+    # CACHE_URL selects Redis (redis://...); anything else uses the in-process LRU
+    url = config.get('CACHE_URL')
+    ttl = config.get('CACHE_TTL', 300)
+
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis
+        return RedisCache(redis.Redis.from_url(url), prefix=config.get('CACHE_KEY_PREFIX', 'pressly:'), ttl=ttl)
+
+    return LRUCache(max_entries=config.get('CACHE_MAX_ENTRIES', 1024), ttl=ttl)
@@ -0,0 +1,202 @@
+"""
+Producer capacity calendar index for Pressly
+
+Free capacity (slot capacity minus booked units) is held per capability as a
+producers x days NumPy array over a rolling horizon, alongside a Fenwick tree
+(binary indexed tree) over the days of every producer. A range query such as
+"who has 500 free units of digital between today and Friday" is O(log days)
+vectorized steps across all producers, and a booking or slot change updates
+O(log days) tree nodes. The database stays the source of truth: bookings are
+reserved there with a guarded UPDATE, and the index is refreshed from it.
+"""
+
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+
+class CapabilityCalendar:
+    # Free units per (producer row, day) for one capability, with its Fenwick tree
+
+    def __init__(self, rows, days):
+        self.free = np.zeros((rows, days), dtype=np.int64)
+        self.tree = np.zeros((rows, days + 1), dtype=np.int64)
+
+    def rebuild(self):
+        # O(days) vectorized passes: each node adds itself to its parent
+        days = self.free.shape[1]
+        self.tree[:, 1:] = self.free
+        for i in range(1, days + 1):
+            parent = i + (i & -i)
+            if parent <= days:
+                self.tree[:, parent] += self.tree[:, i]
+
+    def grow(self, rows):
+        extra = rows - self.free.shape[0]
+        if extra > 0:
+            self.free = np.vstack([self.free, np.zeros((extra, self.free.shape[1]), dtype=np.int64)])
+            self.tree = np.vstack([self.tree, np.zeros((extra, self.tree.shape[1]), dtype=np.int64)])
+
+    def add(self, row, day, delta):
+        self.free[row, day] += delta
+        i = day + 1
+        while i < self.tree.shape[1]:
+            self.tree[row, i] += delta
+            i += i & -i
+
+    def prefix(self, days):
+        # Free units on days [0, days) for every producer
+        total = np.zeros(self.tree.shape[0], dtype=np.int64)
+        i = days
+        while i > 0:
+            total += self.tree[:, i]
+            i -= i & -i
+        return total
+
+    def range_free(self, start, end):
+        return self.prefix(end) - self.prefix(start)
+
+
+class CapacityIndex:
+    def __init__(self, horizon_days=90, max_age=300):
+        self.horizon_days = horizon_days
+        self.max_age = max_age
+        self.loaded_at = None
+        self.base_day = None
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._reset(1)
+
+    def _reset(self, rows):
+        self.ids = []
+        self.rows = {}  # producer id -> row
+        self.row_capacity = rows
+        self.calendars = {}  # capability -> CapabilityCalendar
+
+    def is_stale(self, today=None):
+        today = today or date.today()
+        return (self.loaded_at is None or self.base_day != today or
+                time.monotonic() - self.loaded_at > self.max_age)
+
+    def load(self, slots, today=None):
+        # slots are (producer id, capability, day, capacity, booked) tuples; days outside the horizon are skipped
+        today = today or date.today()
+        fresh = CapacityIndex(self.horizon_days, self.max_age)
+        fresh.base_day = today
+        cells = {}  # capability -> ([rows], [offsets], [free units])
+        for producer_id, capability, day, capacity, booked in slots:
+            offset = (day - today).days
+            if 0 <= offset < self.horizon_days:
+                rows, offsets, free = cells.setdefault(capability, ([], [], []))
+                rows.append(fresh._row(producer_id))
+                offsets.append(offset)
+                free.append(capacity - booked)
+        for capability, (rows, offsets, free) in cells.items():
+            calendar = fresh._calendar(capability)
+            calendar.grow(fresh.row_capacity)
+            calendar.free[rows, offsets] = np.maximum(np.array(free, dtype=np.int64), 0)
+            calendar.rebuild()
+        with self._lock:
+            self.ids, self.rows, self.row_capacity = fresh.ids, fresh.rows, fresh.row_capacity
+            self.calendars, self.base_day = fresh.calendars, fresh.base_day
+            self.loaded_at = time.monotonic()
+
+    def reload_in_background(self, fetch):
+        # fetch() returns the slot tuples; only one reload runs at a time. Bookings committed
+        # while it runs may look free afterwards, which the guarded UPDATE catches.
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def run():
+            try:
+                self.load(fetch())
+            finally:
+                self._reloading = False
+
+        threading.Thread(target=run, name='capacity-index-reload', daemon=True).start()
+
+    def _row(self, producer_id):
+        row = self.rows.get(producer_id)
+        if row is None:
+            row = self.rows[producer_id] = len(self.ids)
+            self.ids.append(producer_id)
+            if row >= self.row_capacity:
+                self.row_capacity *= 2
+                for calendar in self.calendars.values():
+                    calendar.grow(self.row_capacity)
+        return row
+
+    def _calendar(self, capability):
+        calendar = self.calendars.get(capability)
+        if calendar is None:
+            calendar = self.calendars[capability] = CapabilityCalendar(self.row_capacity, self.horizon_days)
+        return calendar
+
+    def offset(self, day):
+        # Day index inside the horizon, or None when the day falls outside it
+        offset = (day - self.base_day).days
+        return offset if 0 <= offset < self.horizon_days else None
+
+    def set_slot(self, producer_id, capability, day, capacity, booked):
+        with self._lock:
+            offset = self.offset(day)
+            if offset is not None:
+                row = self._row(producer_id)
+                calendar = self._calendar(capability)
+                calendar.add(row, offset, max(capacity - booked, 0) - int(calendar.free[row, offset]))
+
+    def apply(self, producer_id, capability, allocations, sign=-1):
+        # Books (sign -1) or releases (sign 1) (day, units) allocations
+        with self._lock:
+            row = self._row(producer_id)
+            calendar = self._calendar(capability)
+            for day, units in allocations:
+                offset = self.offset(day)
+                if offset is not None:
+                    calendar.add(row, offset, sign * units)
+
+    def available(self, capability, start, end, quantity, limit=50):
+        """Producers with at least `quantity` free units of `capability` on days [start, end].
+
+        Returns (producer id, free units in the range, earliest day the quantity
+        can be finished by) tuples, earliest finish first.
+        """
+        with self._lock:
+            calendar = self.calendars.get(capability)
+            first, last = self.offset(start), self.offset(end)
+            if calendar is None or first is None or last is None or first > last:
+                return []
+            free = calendar.range_free(first, last + 1)[:len(self.ids)]
+            candidates = np.flatnonzero(free >= quantity)
+            if not len(candidates):
+                return []
+
+            # Only the feasible producers are walked day by day for their finish date
+            cumulative = np.cumsum(calendar.free[candidates, first:last + 1], axis=1)
+            finish = np.argmax(cumulative >= quantity, axis=1)
+            order = np.lexsort((-free[candidates], finish))[:limit]
+            return [(self.ids[candidates[i]], int(free[candidates[i]]),
+                     self.base_day + timedelta(days=first + int(finish[i]))) for i in order]
+
+    def plan(self, producer_id, capability, start, end, quantity):
+        # Earliest-first (day, units) allocations covering `quantity`, or None if it doesn't fit
+        with self._lock:
+            calendar = self.calendars.get(capability)
+            row = self.rows.get(producer_id)
+            first, last = self.offset(start), self.offset(end)
+            if calendar is None or row is None or first is None or last is None:
+                return None
+            allocations = []
+            remaining = quantity
+            for offset in range(first, last + 1):
+                units = min(int(calendar.free[row, offset]), remaining)
+                if units > 0:
+                    allocations.append((self.base_day + timedelta(days=offset), units))
+                    remaining -= units
+                    if not remaining:
+                        return allocations
+            return None
@@ -0,0 +1,134 @@
+"""
+Product listing catalog formats for Pressly
+
+Listings are imported and exported as CSV or NDJSON with the same field names
+the API uses. Both readers work line by line over a binary stream, so an import
+never holds more than the batch being validated; both writers yield text in
+chunks for a streamed response or file. In CSV the list and object fields
+(availableSizes, availableColors, printingRequirements) are JSON-encoded cells.
+"""
+
+import csv
+import io
+import json
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+FIELDS = ['sku', 'designId', 'basePrice', 'availableSizes', 'availableColors', 'printingRequirements', 'isActive']
+JSON_FIELDS = {'availableSizes', 'availableColors', 'printingRequirements'}
+BOOLEAN_CELLS = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+WRITE_BUFFER_ROWS = 500
+
+
+class CatalogFormatError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+def detect_format(name=None, content_type=None):
+    # An explicit format name wins over the Content-Type
+    if name:
+        if name not in FORMATS:
+            raise CatalogFormatError(f'Unknown format {name}; use csv or ndjson')
+        return name
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    for format_name, mimetype in FORMATS.items():
+        if content_type == mimetype:
+            return format_name
+    if content_type in ('application/ndjson', 'application/jsonl', 'application/json-lines'):
+        return 'ndjson'
+    raise CatalogFormatError('Send text/csv or application/x-ndjson, or pass format=csv|ndjson')
+
+
+def read_listings(stream, format_name):
+    """Yield (line number, record, error) for each listing in a binary stream.
+
+    Exactly one of record and error is set; a row that can't be parsed is
+    reported and the rest of the stream is still read.
+    """
+    if format_name == 'ndjson':
+        # json.loads takes the UTF-8 bytes of each line, so a bad line can't affect its neighbours
+        yield from _read_ndjson(stream)
+        return
+    line_number = 0
+    try:
+        for line_number, record, error in _read_csv(io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')):
+            yield line_number, record, error
+    except (csv.Error, UnicodeDecodeError) as e:
+        # Nothing after a malformed stretch of CSV can be trusted
+        yield line_number + 1, None, f'Stopped reading after line {line_number}: {e}'
+
+
+def _read_csv(text):
+    reader = csv.DictReader(text)
+    missing = {'sku', 'designId', 'basePrice'} - set(reader.fieldnames or ())
+    if missing:
+        raise CatalogFormatError(f'CSV header is missing {", ".join(sorted(missing))}')
+    for cells in reader:
+        record = {}
+        try:
+            for field in FIELDS:
+                value = (cells.get(field) or '').strip()
+                if not value:
+                    continue
+                if field in JSON_FIELDS:
+                    value = json.loads(value)
+                elif field == 'isActive':
+                    value = BOOLEAN_CELLS.get(value.lower(), value)
+                record[field] = value
+        except ValueError:
+            yield reader.line_num, None, f'{field} is not valid JSON'
+            continue
+        yield reader.line_num, record, None
+
+
+def _read_ndjson(stream):
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, 'Line is not valid JSON'
+            continue
+        if isinstance(record, dict):
+            yield line_number, record, None
+        else:
+            yield line_number, None, 'Line must be a JSON object'
+
+
+def write_listings(records, format_name):
+    # Yields the export in chunks of WRITE_BUFFER_ROWS records
+    if format_name == 'ndjson':
+        lines = []
+        for record in records:
+            lines.append(json.dumps(record, separators=(',', ':')) + '\n')
+            if len(lines) >= WRITE_BUFFER_ROWS:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    count = 0
+    for record in records:
+        writer.writerow([_csv_cell(field, record.get(field)) for field in FIELDS])
+        count += 1
+        if count % WRITE_BUFFER_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _csv_cell(field, value):
+    if value is None:
+        return ''
+    if field in JSON_FIELDS:
+        return json.dumps(value, separators=(',', ':'))
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for Pressly
+
+Imports a serving entry point (wsgi.py, or api/index.py for the serverless
+function) in fresh interpreters with `python -X importtime`, which also builds
+its app, and exits non-zero if the app's own share of the time (everything
+beyond Flask and Flask-SQLAlchemy, which any entry point pays) exceeds the
+budget, or if a module that should only load on first use was imported.
+
+It then builds the app on a throwaway SQLite database and makes one request
+to every route and method, reading the first chunk of each body, and fails if
+any of them raises or answers 500. Services built on first use are LocalProxy
+objects bound to the app context, so this catches code, such as a streamed
+body, that reaches one after the request's context is gone.
+
+    python check_import_time.py [--entry wsgi] [--budget-ms 150] [--runs 5] [--verbose] [--no-requests]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Loaded by the services and code paths that need them, never by building the app
+DEFERRED_MODULES = ['numpy', 'PIL', 'alembic', 'flask_migrate', 'requests', 'boto3', 'redis', 'matching', 'capacity']
+# Paid by every Flask + SQLAlchemy app, so they don't count against the budget
+BASELINE_MODULES = ['flask', 'flask_sqlalchemy']
+# Stands in for every <id> in a route; the query string covers the endpoints that need a user or a timeout
+PLACEHOLDER_ID = '00000000-0000-4000-8000-000000000000'
+QUERY_STRING = f'userId={PLACEHOLDER_ID}&timeout=0'
+
+
+def measure(entry):
+    # Cumulative microseconds per module as -X importtime lists them, and the modules left imported
+    code = f'import sys; import {entry}; print(" ".join(sorted(sys.modules)))'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        fields = line[len('import time:'):].split('|')
+        if not line.startswith('import time:') or len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        cumulative.setdefault(fields[2].strip(), int(fields[1]))
+    return cumulative, set(result.stdout.split())
+
+
+def request_every_endpoint():
+    # Failed requests as 'METHOD /path: reason'
+    workdir = tempfile.mkdtemp(prefix='pressly-import-')
+    database_url = 'sqlite:///' + os.path.join(workdir, 'check.db')
+    os.environ['DATABASE_URL'] = database_url
+    sys.path.insert(0, ROOT)
+
+    from flask_migrate import upgrade
+    from app import create_app
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url, 'PROPAGATE_EXCEPTIONS': True,
+                      'UPLOAD_FOLDER': os.path.join(workdir, 'uploads')}, migrations=True)
+    with app.app_context():
+        upgrade()
+
+    # Requests run outside any app context of the check's own, so each gets a fresh one as under a server
+    client = app.test_client()
+    failures = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        path = re.sub(r'<[^>]+>', PLACEHOLDER_ID, rule.rule)
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            body = {} if method in ('POST', 'PUT') else None
+            try:
+                response = client.open(f'{path}?{QUERY_STRING}', method=method, json=body, buffered=False)
+                # Only the first chunk: the message stream never ends
+                next(response.iter_encoded(), None)
+                response.close()
+            except Exception as e:
+                failures.append(f'{method} {rule.rule}: {type(e).__name__}: {e}')
+                continue
+            if response.status_code == 500:
+                failures.append(f'{method} {rule.rule}: 500')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail if importing an entry point exceeds its time budget')
+    parser.add_argument('--entry', default='wsgi', help='module to import, e.g. wsgi or api.index')
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('IMPORT_BUDGET_MS', 150)))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--verbose', action='store_true', help='print the slowest modules of the last run')
+    parser.add_argument('--no-requests', action='store_true', help="only measure the import, don't request every route")
+    args = parser.parse_args()
+
+    own_times = []
+    for _ in range(args.runs):
+        cumulative, modules = measure(args.entry)
+        total = cumulative[args.entry]
+        baseline = sum(cumulative.get(name, 0) for name in BASELINE_MODULES)
+        own_times.append((total - baseline) / 1000)
+
+    own = statistics.median(own_times)
+    deferred = [name for name in DEFERRED_MODULES if name in modules]
+    print(f'{args.entry}: {total / 1000:.0f} ms to import and build the app, '
+          f'{own:.0f} ms of it beyond Flask and SQLAlchemy (median of {args.runs}, budget {args.budget_ms:.0f} ms)')
+    if args.verbose:
+        for name, time_us in sorted(cumulative.items(), key=lambda item: -item[1])[:25]:
+            print(f'  {time_us / 1000:8.1f} ms  {name}')
+
+    failures = 0
+    if own > args.budget_ms:
+        print(f'FAIL over budget by {own - args.budget_ms:.0f} ms')
+        failures += 1
+    if deferred:
+        print(f'FAIL imported modules that should load on first use: {", ".join(deferred)}')
+        failures += 1
+    if not args.no_requests:
+        failed_requests = request_every_endpoint()
+        for line in failed_requests:
+            print(f'FAIL {line}')
+        failures += len(failed_requests)
+    if not failures:
+        print('Import time is within budget and every route answers')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Query plan check for Pressly
+
+Runs EXPLAIN on the app's hot queries against the configured database and
+exits non-zero if any of them falls back to a sequential scan of a table.
+Unbounded exports (the plain /api/producers list and its NDJSON mode) and the
+capacity index load read every row by design and are not checked.
+
+The database has to be migrated to the latest revision first
+(`FLASK_APP=app.py flask db upgrade`); the check says so and exits 2 if it isn't.
+
+    DATABASE_URL=postgresql://... python check_query_plans.py [--verbose]
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime
+
+from app import (app, db, CapacitySlot, Design, Designer, LISTING_COLUMNS, Message, Order, OrderRollup, Producer, ProductListing,
+                 User, bounding_box, capability_match_query, encode_cursor, messages_before, order_queue_query,
+                 producer_rows_query, producer_text_search, producers_after, producers_in_box)
+
+SAMPLE_ID = '00000000-0000-0000-0000-000000000000'
+OTHER_ID = '00000000-0000-0000-0000-000000000001'
+
+
+def hot_queries():
+    # (name, query) pairs mirroring what the endpoints and dashboards run
+    cursor = encode_cursor(datetime(2024, 1, 1), SAMPLE_ID)
+    message_cursor = encode_cursor(datetime(2024, 1, 1), OTHER_ID)
+    box = bounding_box(41.88, -87.63, 50)
+    return [
+        ('producer page (keyset)', producers_after(producer_rows_query(), cursor).limit(50)),
+        ('producer profile', producer_rows_query().filter(Producer.id == SAMPLE_ID)),
+        ('producer search by capability',
+         capability_match_query(producer_rows_query(), ['offset', 'digital']).limit(50)),
+        ('producer search by text', producer_text_search(producer_rows_query(), 'press').limit(50)),
+        ('producers near a point', producers_in_box(producer_rows_query(), box)),
+        ('producer search by capability near a point',
+         producers_in_box(capability_match_query(producer_rows_query(), ['offset', 'digital']), box)),
+        ('producers for a user', db.session.query(Producer.id).filter(Producer.user_id == SAMPLE_ID)),
+        ('login by email', User.query.filter_by(email='someone@example.com')),
+        ('designer for a user', Designer.query.filter_by(user_id=SAMPLE_ID)),
+        ('designs by designer and status', Design.query.filter_by(designer_id=SAMPLE_ID, status='active')),
+        ('designs changed since cursor', Design.query.filter(Design.designer_id == SAMPLE_ID, db.tuple_(
+            Design.updated_at, Design.id) > db.tuple_(datetime(2024, 1, 1), SAMPLE_ID))
+         .order_by(Design.updated_at, Design.id).limit(501)),
+        ('designer by id or user id', db.session.query(Designer.id).filter(
+            db.or_(Designer.id == SAMPLE_ID, Designer.user_id == SAMPLE_ID))),
+        ('listings for a design', ProductListing.query.filter_by(design_id=SAMPLE_ID)),
+        ('listing export for a design', db.session.query(*LISTING_COLUMNS).filter(
+            ProductListing.design_id == SAMPLE_ID).order_by(ProductListing.sku)),
+        ('producer work queue (keyset)', order_queue_query(SAMPLE_ID, 'pending', cursor).limit(50)),
+        ('producer dashboard rollup', OrderRollup.query.filter_by(owner_type='producer', owner_id=SAMPLE_ID)),
+        ('designer dashboard rollup', OrderRollup.query.filter_by(owner_type='designer', owner_id=SAMPLE_ID)),
+        ('producer capacity calendar', CapacitySlot.query.filter(
+            CapacitySlot.producer_id == SAMPLE_ID, CapacitySlot.day >= date(2024, 1, 1))
+         .order_by(CapacitySlot.capability, CapacitySlot.day)),
+        ('producer capacity for a capability', db.session.query(CapacitySlot.day).filter_by(
+            producer_id=SAMPLE_ID, capability='digital')),
+        ('customer orders', Order.query.filter_by(customer_id=SAMPLE_ID)
+         .order_by(Order.created_at.desc()).limit(50)),
+        ('orders for a listing', Order.query.filter_by(product_listing_id=SAMPLE_ID)),
+        ('unread inbox', Message.query.filter_by(receiver_id=SAMPLE_ID, is_read=False)
+         .order_by(Message.sent_at.desc()).limit(50)),
+        ('unread count', db.session.query(db.func.count(Message.id))
+         .filter_by(receiver_id=SAMPLE_ID, is_read=False)),
+        ('inbox page (keyset)', messages_before(Message.query.filter_by(receiver_id=SAMPLE_ID), message_cursor)
+         .limit(50)),
+        ('conversation thread (keyset)', messages_before(Message.query.filter(db.or_(
+            db.and_(Message.sender_id == SAMPLE_ID, Message.receiver_id == OTHER_ID),
+            db.and_(Message.sender_id == OTHER_ID, Message.receiver_id == SAMPLE_ID))), message_cursor).limit(50)),
+        ('messages since cursor', Message.query.filter(Message.receiver_id == SAMPLE_ID, db.tuple_(
+            Message.sent_at, Message.id) > db.tuple_(datetime(2024, 1, 1), SAMPLE_ID))
+         .order_by(Message.sent_at, Message.id).limit(200)),
+        ('sent messages', Message.query.filter_by(sender_id=SAMPLE_ID)
+         .order_by(Message.sent_at.desc()).limit(50)),
+        ('messages for an order', Message.query.filter_by(order_id=SAMPLE_ID)),
+    ]
+
+
+def compile_query(query, dialect):
+    compiled = query.statement.compile(dialect=dialect, compile_kwargs={'render_postcompile': True})
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    return str(compiled), params
+
+
+def explain_sqlite(connection, sql, params):
+    # EXPLAIN QUERY PLAN reports 'SCAN <table>' without 'USING ... INDEX' for full table scans
+    tables = set(db.metadata.tables)
+    lines = [row[3] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params)]
+    scans = []
+    for line in lines:
+        words = line.split()
+        if words[:1] == ['SCAN'] and len(words) > 1 and words[1] in tables and 'USING' not in words:
+            scans.append(words[1])
+    return lines, scans
+
+
+def explain_postgres(connection, sql, params):
+    # Seq scans are disabled for the check so one is only chosen when no index can serve the query
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sql, params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    lines = []
+    scans = []
+
+    def walk(node, depth):
+        relation = node.get('Relation Name')
+        lines.append('  ' * depth + node['Node Type'] + (f' on {relation}' if relation else ''))
+        if node['Node Type'] == 'Seq Scan':
+            scans.append(relation)
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+
+    walk(plan[0]['Plan'], 0)
+    return lines, scans
+
+
+def pending_migrations(connection):
+    # True unless the database is at every head revision in migrations/; plans depend on its indexes
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    script = ScriptDirectory(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
+    return set(MigrationContext.configure(connection).get_current_heads()) != set(script.get_heads())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail if a hot query plans a sequential scan')
+    parser.add_argument('--verbose', action='store_true', help='print every query plan')
+    args = parser.parse_args()
+
+    failures = 0
+    checked = 0
+    with app.app_context():
+        dialect = db.engine.dialect
+        explain = {'sqlite': explain_sqlite, 'postgresql': explain_postgres}.get(dialect.name)
+        if explain is None:
+            print(f'EXPLAIN checks are not supported on {dialect.name}')
+            return 2
+        with db.engine.connect() as connection:
+            if pending_migrations(connection):
+                print(f'{db.engine.url.render_as_string(hide_password=True)} is not migrated to the latest revision; '
+                      'run `FLASK_APP=app.py flask db upgrade` first')
+                return 2
+
+        for name, query in hot_queries():
+            sql, params = compile_query(query, dialect)
+            with db.engine.connect() as connection, connection.begin():
+                lines, scans = explain(connection, sql, params)
+
+            status = 'FAIL' if scans else 'ok'
+            detail = f' (sequential scan on {", ".join(scans)})' if scans else ''
+            print(f'{status:<5}{name}{detail}')
+            if args.verbose or scans:
+                for line in lines:
+                    print(f'       {line}')
+            failures += bool(scans)
+            checked += 1
+
+    print(f'{failures} of {checked} hot queries use a sequential scan' if failures
+          else 'All hot queries are index-backed')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Read replica routing check for Pressly
+
+Stands up a primary and read replicas as SQLite files in a temporary directory.
+Each replica is a copy of the primary, opened read-only, so it stays behind
+every later write the way a lagging replica would. The check then exercises
+the routing through the API and exits non-zero if any case fails:
+
+- catalog and dashboard reads are served by a replica, and writes never reach one
+- a client reads its own writes from the primary after writing, and other clients keep using replicas
+- reads are spread round-robin over the replicas
+- a replica that can't be opened is ejected, and its requests are served by another replica or the primary
+
+    python check_replicas.py [--replicas 2] [--requests 20]
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+from collections import Counter
+
+from sqlalchemy import event
+
+
+def copy_database(source, target):
+    # The backup API copies a consistent snapshot even if the source is open
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+
+
+def read_only_url(path):
+    return f'sqlite:///file:{path}?mode=ro&uri=true'
+
+
+def seed(db, models):
+    User, Designer, Producer, Design, ProductListing = models
+    customer = User(email='customer@example.com', password_hash='x', full_name='Customer', user_type='customer')
+    designer_user = User(email='designer@example.com', password_hash='x', full_name='Designer', user_type='designer')
+    producer_user = User(email='producer@example.com', password_hash='x', full_name='Producer', user_type='producer')
+    db.session.add_all([customer, designer_user, producer_user])
+    db.session.flush()
+    designer = Designer(user_id=designer_user.id)
+    producer = Producer(user_id=producer_user.id, business_name='Original Press', verified=True)
+    db.session.add_all([designer, producer])
+    db.session.flush()
+    design = Design(designer_id=designer.id, title='Poster', status='active')
+    db.session.add(design)
+    db.session.flush()
+    listing = ProductListing(sku='CHECK-1', design_id=design.id, base_price=20.0)
+    db.session.add(listing)
+    db.session.commit()
+    return {'customer': customer.id, 'designer': designer.id, 'producer': producer.id, 'listing': listing.id}
+
+
+def count_statements(engines):
+    # bind key -> Counter of statement verbs run on that engine
+    counts = {name: Counter() for name in engines}
+    for name, engine in engines.items():
+        def record(conn, cursor, statement, parameters, context, executemany, name=name):
+            counts[name][statement.lstrip().split(None, 1)[0].upper()] += 1
+        event.listen(engine, 'before_cursor_execute', record)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check read/write routing between the primary and read replicas')
+    parser.add_argument('--replicas', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pressly-replicas-')
+    primary = os.path.join(workdir, 'primary.db')
+    replica_paths = [os.path.join(workdir, f'replica{index}.db') for index in range(args.replicas)]
+
+    from flask_migrate import upgrade
+    from app import create_app, db, replicas, User, Designer, Producer, Design, ProductListing
+
+    logging.getLogger('app').setLevel(logging.ERROR)
+    setup = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + primary}, migrations=True)
+    with setup.app_context():
+        upgrade()
+        ids = seed(db, (User, Designer, Producer, Design, ProductListing))
+        db.engine.dispose()
+    for path in replica_paths:
+        copy_database(primary, path)
+
+    results = []
+
+    def check(name, passed, detail=''):
+        results.append(passed)
+        print(f'{"ok" if passed else "FAIL":<5}{name}{f" ({detail})" if detail and not passed else ""}')
+
+    def serving_app(replica_urls):
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + primary, 'DATABASE_REPLICA_URLS': replica_urls,
+                          'REPLICA_CHECK_INTERVAL': 3600})
+        app.logger.setLevel(logging.ERROR)
+        return app
+
+    # Requests run outside any app context of the check's own, so each gets a fresh one as under a server
+    app = serving_app([read_only_url(path) for path in replica_paths])
+    with app.app_context():
+        counts = count_statements(db.engines)
+        # The replicas are copies from before this rename, so a read that returns the old name came from one
+        db.session.get(Producer, ids['producer']).business_name = 'Renamed Press'
+        db.session.commit()
+
+    client = app.test_client()
+    name = client.get(f'/api/producers/{ids["producer"]}').get_json()['businessName']
+    check('producer profile is read from a replica', name == 'Original Press', name)
+
+    order = {'customerId': ids['customer'], 'producerId': ids['producer'], 'productListingId': ids['listing']}
+    response = client.post('/api/orders', json=order)
+    check('order is written to the primary', response.status_code == 201, response.get_json())
+    cookie = response.headers.get('Set-Cookie', '')
+    check('the write keeps the client on the primary', f'Max-Age={app.config["REPLICA_STICKY_SECONDS"]}' in cookie, cookie)
+    dashboard = client.get(f'/api/designers/{ids["designer"]}/dashboard').get_json()
+    check('the writer reads its own order from the primary', dashboard['orders'] == 1, dashboard)
+    dashboard = app.test_client().get(f'/api/designers/{ids["designer"]}/dashboard').get_json()
+    check('another client reads the dashboard from a replica', dashboard['orders'] == 0, dashboard)
+
+    for index in range(args.requests):
+        app.test_client().get(f'/api/producers?limit=10&page={index}')  # a new cache key every time
+    served = {name: counts[name]['SELECT'] for name in counts if name}
+    check('reads are spread over every replica', all(served.values()), served)
+    writes = {name: sum(count for verb, count in counts[name].items() if verb != 'SELECT') for name in counts if name}
+    check('no statement other than SELECT reached a replica', not any(writes.values()), writes)
+
+    # A replica that can't be opened fails its first request's connection and is ejected;
+    # that request and the ones after it are read from the other replica
+    app = serving_app([read_only_url(os.path.join(workdir, 'missing.db')), read_only_url(replica_paths[0])])
+    with app.app_context():
+        counts = count_statements(db.engines)
+    statuses = Counter(app.test_client().get(f'/api/producers/{ids["producer"]}/dashboard').status_code
+                       for index in range(args.requests))
+    check('every request succeeds while a replica is down', statuses == Counter({200: args.requests}), dict(statuses))
+    with app.app_context():
+        ejected = set(replicas.ejected_until)
+    check('the failed replica is ejected', ejected == {'replica_0'}, ejected)
+    check('the healthy replica serves the reads', counts['replica_1']['SELECT'] >= args.requests, counts['replica_1'])
+
+    # With every replica down, reads fall back to the primary
+    app = serving_app([read_only_url(os.path.join(workdir, 'missing.db'))])
+    with app.app_context():
+        counts = count_statements(db.engines)
+    response = app.test_client().get(f'/api/producers/{ids["producer"]}/orders/counts')
+    check('reads fall back to the primary when no replica is healthy',
+          response.status_code == 200 and counts[None]['SELECT'] > 0, response.status_code)
+
+    failures = results.count(False)
+    print(f'{failures} of {len(results)} routing checks failed' if failures else 'Reads and writes are routed correctly')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Gunicorn settings for Pressly
+
+gunicorn reads this file from the working directory, so the Procfile picks it
+up as is. The default is the classic sync worker: one request per process at a
+time. For many slow clients, long-polls or outbound calls such as shipping-rate
+lookups, set GUNICORN_WORKER_CLASS=gevent: each worker then serves up to
+GUNICORN_WORKER_CONNECTIONS requests on greenlets and only as many of them as
+DB_POOL_SIZE + DB_MAX_OVERFLOW use the database at once; the rest wait up to
+DB_POOL_TIMEOUT for a connection and then get a 503.
+
+The app is safe to run on greenlets because it is imported after gevent has
+patched the standard library (the app is never preloaded here): Flask-SQLAlchemy
+scopes each session to its app context, which lives in a context variable that
+every greenlet gets its own copy of, and the thread-locals and locks the app
+creates at import are gevent's. psycopg2 is made cooperative with psycogreen.
+"""
+
+import os
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')  # sync, gthread or gevent
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))  # per worker, for gthread
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))  # per worker, for gevent
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Workers must import the app after gevent's monkey patching, never in the master
+preload_app = False
+
+
+def on_starting(server):
+    if worker_class == 'gevent' and os.environ.get('PROFILE_SLOW_REQUESTS'):
+        # The sampling profiler reads OS thread stacks, and every greenlet shares one thread
+        server.log.warning('PROFILE_SLOW_REQUESTS has no effect under the gevent worker')
+
+
+def post_fork(server, worker):
+    if worker_class != 'gevent':
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        # Without psycopg2 (e.g. SQLite) there is nothing to patch
+        return
+    patch_psycopg()
@@ -1,5 +1,9 @@
 import os
-from app import app, db
+from flask_migrate import stamp, upgrade
+from app import app, db, rebuild_producer_capabilities, reconcile_order_rollups
+
+# Revision matching the tables db.create_all() used to build before migrations existed
+INITIAL_REVISION = '0aee203ace36'
 
 print("Initializing Pressly application...")
 
@@ -8,9 +12,15 @@ upload_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static/up
 os.makedirs(upload_dir, exist_ok=True)
 print(f"Upload directory created/verified at: {upload_dir}")
 
-# Create database tables
+# Migrate the database schema
 with app.app_context():
-    db.create_all()
-    print("Database tables created successfully")
+    tables = db.inspect(db.engine).get_table_names()
+    if 'user' in tables and 'alembic_version' not in tables:
+        stamp(revision=INITIAL_REVISION)
+        print("Existing database stamped with the initial migration")
+    upgrade()
+    print("Database schema is up to date")
+    print(f"Indexed {rebuild_producer_capabilities()} producer capabilities")
+    print(f"Corrected {reconcile_order_rollups()} order rollup rows")
 
 print("Pressly initialization complete!")
@@ -0,0 +1,233 @@
+"""
+Request instrumentation for Pressly
+
+Every request records its latency, SQL statement count and SQL time into
+per-endpoint histograms, served in the Prometheus text format at /metrics.
+A statement that runs more than a configured number of times in one request is
+logged as a likely N+1 and counted. With PROFILE_SLOW_REQUESTS set, a sampling
+profiler walks each request thread's stack and writes the samples of requests
+slower than the threshold as folded stacks, ready for flamegraph.pl or
+speedscope. Metrics are local to the process, so scrape each worker.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+MAX_STACK_DEPTH = 64
+
+
+class Histogram:
+    # Cumulative bucket counts per label set, as Prometheus expects them
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self, name):
+        for labels, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                yield f'{name}_bucket{_labels(labels + (("le", _number(bound)),))} {count}'
+            yield f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {series[-1]}'
+            yield f'{name}_sum{_labels(labels)} {_number(series[-2])}'
+            yield f'{name}_count{_labels(labels)} {series[-1]}'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()  # (endpoint, method, status) -> requests
+        self.n_plus_one = Counter()  # endpoint -> requests with a repeated statement
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.query_count = Histogram(QUERY_COUNT_BUCKETS)
+        self.sql_time = Histogram(LATENCY_BUCKETS)
+
+    def observe_request(self, endpoint, method, status, duration, queries, sql_time, repeated):
+        labels = (('endpoint', endpoint), ('method', method))
+        with self._lock:
+            self.requests[labels + (('status', status),)] += 1
+            self.latency.observe(labels, duration)
+            self.query_count.observe(labels, queries)
+            self.sql_time.observe(labels, sql_time)
+            if repeated:
+                self.n_plus_one[(('endpoint', endpoint),)] += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines += ['# HELP pressly_requests_total Requests handled, by endpoint, method and status',
+                      '# TYPE pressly_requests_total counter']
+            lines += [f'pressly_requests_total{_labels(labels)} {count}' for labels, count in sorted(self.requests.items())]
+            lines += ['# HELP pressly_request_duration_seconds Request latency, including any streamed body',
+                      '# TYPE pressly_request_duration_seconds histogram']
+            lines += self.latency.samples('pressly_request_duration_seconds')
+            lines += ['# HELP pressly_request_queries SQL statements executed per request',
+                      '# TYPE pressly_request_queries histogram']
+            lines += self.query_count.samples('pressly_request_queries')
+            lines += ['# HELP pressly_request_sql_seconds Time spent executing SQL per request',
+                      '# TYPE pressly_request_sql_seconds histogram']
+            lines += self.sql_time.samples('pressly_request_sql_seconds')
+            lines += ['# HELP pressly_n_plus_one_total Requests that repeated one SQL statement past the threshold',
+                      '# TYPE pressly_n_plus_one_total counter']
+            lines += [f'pressly_n_plus_one_total{_labels(labels)} {count}' for labels, count in sorted(self.n_plus_one.items())]
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    # One daemon thread samples the stacks of the request threads currently registered
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._samples = {}  # thread id -> Counter of folded stacks
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._samples[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+            self._active.set()
+
+    def stop(self, thread_id):
+        with self._lock:
+            samples = self._samples.pop(thread_id, Counter())
+            if not self._samples:
+                self._active.clear()
+            return samples
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_fold(frame)] += 1
+            time.sleep(self.interval)
+
+
+def _fold(frame):
+    # Root-first, semicolon-separated frames: the folded format flamegraph tools read
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})'.replace(';', ':'))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Instrumentation:
+    def __init__(self, config, logger):
+        self.metrics = Metrics()
+        self.logger = logger
+        self.repeat_threshold = config['METRICS_N_PLUS_ONE_THRESHOLD']
+        self.profile_threshold = config['PROFILE_SLOW_REQUESTS']
+        self.profile_folder = config['PROFILE_FOLDER']
+        self.profiler = SamplingProfiler(config['PROFILE_INTERVAL']) if self.profile_threshold is not None else None
+        self._current = threading.local()  # the profile of the request this thread is serving
+
+    def init_app(self, app, engines):
+        # Statements are timed on the app's own engines (primary and replicas), not the Engine class,
+        # so apps built side by side in one process don't each run every other app's listeners;
+        # they are only attributed while this thread serves a request
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        if self.profiler is not None:
+            os.makedirs(self.profile_folder, exist_ok=True)
+
+    def _before_request(self):
+        g.instrumentation = profile = {
+            'started': time.perf_counter(), 'queries': 0, 'sql_time': 0.0,
+            'statements': Counter(), 'status': 500, 'streamed': False
+        }
+        self._current.profile = profile
+        if self.profiler is not None:
+            self.profiler.start(threading.get_ident())
+
+    def _after_request(self, response):
+        profile = g.get('instrumentation')
+        if profile is not None:
+            profile['status'] = response.status_code
+            profile['streamed'] = response.is_streamed
+        return response
+
+    def _teardown_request(self, exc):
+        # Runs after a streamed body finishes, so its queries and time are included
+        profile = g.pop('instrumentation', None)
+        self._current.profile = None
+        if profile is None:
+            return
+        duration = time.perf_counter() - profile['started']
+        samples = self.profiler.stop(threading.get_ident()) if self.profiler is not None else None
+        endpoint = request.endpoint or '<unmatched>'
+
+        repeated = [(statement, count) for statement, count in profile['statements'].items()
+                    if count > self.repeat_threshold]
+        for statement, count in repeated:
+            self.logger.warning('Possible N+1 in %s %s: statement ran %d times: %s',
+                                request.method, request.path, count, ' '.join(statement.split())[:300])
+        self.metrics.observe_request(endpoint, request.method, profile['status'], duration,
+                                     profile['queries'], profile['sql_time'], bool(repeated))
+
+        # Long-poll and event streams are slow by design and mostly idle, so they aren't dumped
+        if samples and duration >= self.profile_threshold and not profile['streamed']:
+            self._write_profile(endpoint, duration, samples)
+
+    def _write_profile(self, endpoint, duration, samples):
+        name = f'{time.strftime("%Y%m%dT%H%M%S")}-{endpoint}-{int(duration * 1000)}ms-{threading.get_ident()}.folded'
+        path = os.path.join(self.profile_folder, name)
+        with open(path, 'w') as f:
+            f.writelines(f'{stack} {count}\n' for stack, count in samples.most_common())
+        self.logger.info('Slow request profile (%.0f ms) written to %s', duration * 1000, path)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profile = getattr(self._current, 'profile', None)
+        if profile is not None:
+            profile['queries'] += 1
+            profile['statements'][statement] += 1
+            conn.info.setdefault('instrumentation_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profile = getattr(self._current, 'profile', None)
+        started = conn.info.get('instrumentation_started')
+        if profile is not None and started:
+            profile['sql_time'] += time.perf_counter() - started.pop()
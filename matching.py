@@ -0,0 +1,218 @@
+"""
+In-memory producer matching for Pressly
+
+Every producer is a row in a set of NumPy arrays: capability bitsets (one bit
+per known capability, packed into uint64 words), rating, verification,
+available capacity and coordinates. Scoring a design's requirements against
+all producers is a handful of vectorized operations over those arrays, and the
+top k are picked with a partial sort, so a match costs a few milliseconds even
+with 100k producers. Rows are updated in place as producers change; the matrix
+is local to the process and is rebuilt from the database when it gets stale.
+"""
+
+import math
+import threading
+import time
+
+import numpy as np
+
+# Share of the score each criterion contributes; criteria without data score 0
+MATCH_WEIGHTS = {
+    'capability': 0.4,
+    'rating': 0.25,
+    'proximity': 0.15,
+    'capacity': 0.1,
+    'verified': 0.1,
+}
+PROXIMITY_SCALE_KM = 100.0  # a producer this far away gets half the proximity score
+EARTH_RADIUS_KM = 6371.0
+MAX_RATING = 5.0
+
+
+class ProducerMatrix:
+    def __init__(self, max_age=300, initial_rows=1024):
+        self.max_age = max_age
+        self.loaded_at = None
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._pending = []  # changes made while a reload is reading the database
+        self._allocate(initial_rows, 1)
+
+    def _allocate(self, rows, words):
+        self.ids = [None] * rows
+        self.rows = {}  # producer id -> row
+        self.free = list(range(rows - 1, -1, -1))
+        self.vocabulary = {}  # capability -> bit
+        self.bits = np.zeros((rows, words), dtype=np.uint64)
+        self.active = np.zeros(rows, dtype=bool)
+        self.rating = np.zeros(rows, dtype=np.float32)
+        self.verified = np.zeros(rows, dtype=np.float32)
+        self.capacity = np.zeros(rows, dtype=np.float32)
+        self.lat = np.full(rows, np.nan, dtype=np.float32)  # radians
+        self.lon = np.full(rows, np.nan, dtype=np.float32)
+        self.cos_lat = np.full(rows, np.nan, dtype=np.float32)
+
+    @property
+    def size(self):
+        return len(self.rows)
+
+    def is_stale(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.max_age
+
+    def load(self, producers):
+        # Rebuilds every array from (id, capabilities, rating, verified, capacity, latitude, longitude)
+        # tuples and swaps them in at once, so matches keep running against the old ones meanwhile
+        fresh = ProducerMatrix(self.max_age, max(len(producers), 1))
+        for producer in producers:
+            fresh._upsert(*producer)
+        with self._lock:
+            self.__dict__.update({name: value for name, value in fresh.__dict__.items()
+                                  if name not in ('_lock', '_reloading', '_pending', 'max_age')})
+            self.loaded_at = time.monotonic()
+            # Changes committed during the reload may be missing from what it read
+            for producer_id, producer in self._pending:
+                if producer is None:
+                    self._remove(producer_id)
+                else:
+                    self._upsert(producer_id, *producer)
+            self._pending = []
+
+    def reload_in_background(self, fetch):
+        # fetch() returns the producer tuples; only one reload runs at a time
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def run():
+            try:
+                self.load(fetch())
+            finally:
+                with self._lock:
+                    self._reloading = False
+                    self._pending = []
+
+        threading.Thread(target=run, name='producer-matrix-reload', daemon=True).start()
+
+    def upsert(self, producer_id, capabilities, rating, verified, capacity, latitude, longitude):
+        with self._lock:
+            self._upsert(producer_id, capabilities, rating, verified, capacity, latitude, longitude)
+            if self._reloading:
+                self._pending.append((producer_id, (capabilities, rating, verified, capacity, latitude, longitude)))
+
+    def remove(self, producer_id):
+        with self._lock:
+            self._remove(producer_id)
+            if self._reloading:
+                self._pending.append((producer_id, None))
+
+    def _remove(self, producer_id):
+        row = self.rows.pop(producer_id, None)
+        if row is not None:
+            self.ids[row] = None
+            self.active[row] = False
+            self.bits[row] = 0
+            self.free.append(row)
+
+    def _upsert(self, producer_id, capabilities, rating, verified, capacity, latitude, longitude):
+        row = self.rows.get(producer_id)
+        if row is None:
+            if not self.free:
+                self._grow_rows()
+            row = self.free.pop()
+            self.rows[producer_id] = row
+            self.ids[row] = producer_id
+
+        self.bits[row] = 0
+        for capability in capabilities:
+            bit = self.vocabulary.get(capability)
+            if bit is None:
+                bit = self.vocabulary[capability] = len(self.vocabulary)
+                if bit >= 64 * self.bits.shape[1]:
+                    self.bits = np.hstack([self.bits, np.zeros_like(self.bits)])
+            self.bits[row, bit // 64] |= np.uint64(1 << (bit % 64))
+
+        self.active[row] = True
+        self.rating[row] = min(max(rating or 0.0, 0.0), MAX_RATING) / MAX_RATING
+        self.verified[row] = 1.0 if verified else 0.0
+        self.capacity[row] = min(max(capacity or 0.0, 0.0), 1.0)
+        has_location = latitude is not None and longitude is not None
+        self.lat[row] = math.radians(latitude) if has_location else np.nan
+        self.lon[row] = math.radians(longitude) if has_location else np.nan
+        self.cos_lat[row] = math.cos(math.radians(latitude)) if has_location else np.nan
+
+    def _grow_rows(self):
+        rows = len(self.ids)
+        self.ids.extend([None] * rows)
+        self.free.extend(range(2 * rows - 1, rows - 1, -1))
+        self.bits = np.vstack([self.bits, np.zeros_like(self.bits)])
+        self.active = np.concatenate([self.active, np.zeros(rows, dtype=bool)])
+        self.rating = np.concatenate([self.rating, np.zeros(rows, dtype=np.float32)])
+        self.verified = np.concatenate([self.verified, np.zeros(rows, dtype=np.float32)])
+        self.capacity = np.concatenate([self.capacity, np.zeros(rows, dtype=np.float32)])
+        self.lat = np.concatenate([self.lat, np.full(rows, np.nan, dtype=np.float32)])
+        self.lon = np.concatenate([self.lon, np.full(rows, np.nan, dtype=np.float32)])
+        self.cos_lat = np.concatenate([self.cos_lat, np.full(rows, np.nan, dtype=np.float32)])
+
+    def match(self, capabilities, k=10, match_all=False, latitude=None, longitude=None, max_distance_km=None):
+        """Score every producer against the requirements and return the best k.
+
+        Returns (producer id, score, matched capabilities, distance in km or None)
+        tuples, best first. Producers matching none of the requested capabilities,
+        or not all of them with match_all, are left out.
+        """
+        with self._lock:
+            capabilities = list(dict.fromkeys(capabilities))
+            matched = np.zeros(len(self.ids), dtype=np.int32)
+            for capability in capabilities:
+                bit = self.vocabulary.get(capability)
+                if bit is not None:
+                    matched += ((self.bits[:, bit // 64] >> np.uint64(bit % 64)) & np.uint64(1)).astype(np.int32)
+
+            eligible = self.active.copy()
+            if capabilities:
+                eligible &= matched >= (len(capabilities) if match_all else 1)
+                capability_score = matched.astype(np.float32) / len(capabilities)
+            else:
+                capability_score = np.ones(len(self.ids), dtype=np.float32)
+
+            score = (MATCH_WEIGHTS['capability'] * capability_score +
+                     MATCH_WEIGHTS['rating'] * self.rating +
+                     MATCH_WEIGHTS['capacity'] * self.capacity +
+                     MATCH_WEIGHTS['verified'] * self.verified)
+
+            candidates = np.flatnonzero(eligible)
+            candidate_scores = score[candidates]
+
+            # Distances are only worked out for the producers still in the running
+            distance = None
+            if latitude is not None and longitude is not None and len(candidates):
+                distance = self._distances_km(math.radians(latitude), math.radians(longitude), candidates)
+                located = ~np.isnan(distance)
+                proximity = np.where(located, PROXIMITY_SCALE_KM / (PROXIMITY_SCALE_KM + np.nan_to_num(distance)), 0.0)
+                candidate_scores = candidate_scores + MATCH_WEIGHTS['proximity'] * proximity.astype(np.float32)
+                if max_distance_km is not None:
+                    keep = located & (np.nan_to_num(distance, nan=np.inf) <= max_distance_km)
+                    candidates, candidate_scores, distance = candidates[keep], candidate_scores[keep], distance[keep]
+
+            if not len(candidates):
+                return []
+            if len(candidates) > k:
+                top = np.argpartition(-candidate_scores, k - 1)[:k]
+            else:
+                top = np.arange(len(candidates))
+            top = top[np.argsort(-candidate_scores[top], kind='stable')]
+
+            results = []
+            for index in top:
+                row = candidates[index]
+                row_distance = None if distance is None or np.isnan(distance[index]) else float(distance[index])
+                results.append((self.ids[row], float(candidate_scores[index]), int(matched[row]), row_distance))
+            return results
+
+    def _distances_km(self, latitude, longitude, rows):
+        # Haversine distance from one point to the given rows; NaN where a producer has no location
+        half_dlat = (self.lat[rows] - np.float32(latitude)) / 2
+        half_dlon = (self.lon[rows] - np.float32(longitude)) / 2
+        a = np.sin(half_dlat) ** 2 + np.float32(math.cos(latitude)) * self.cos_lat[rows] * np.sin(half_dlon) ** 2
+        return 2 * np.float32(EARTH_RADIUS_KM) * np.arcsin(np.sqrt(np.minimum(a, np.float32(1.0))))
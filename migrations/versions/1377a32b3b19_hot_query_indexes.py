@@ -0,0 +1,42 @@
+"""Indexes for foreign keys and dashboard/inbox query patterns
+
+Revision ID: 1377a32b3b19
+Revises: 908fdcd35e7d
+Create Date: 2026-10-17 16:22:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1377a32b3b19'
+down_revision = '908fdcd35e7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_designer_user_id', 'designer', ['user_id'], unique=False)
+    op.create_index('ix_producer_user_id', 'producer', ['user_id'], unique=False)
+    op.create_index('ix_design_designer_id_status', 'design', ['designer_id', 'status'], unique=False)
+    op.create_index('ix_product_listing_design_id', 'product_listing', ['design_id'], unique=False)
+    op.create_index('ix_order_producer_id_status_created_at', 'order', ['producer_id', 'status', 'created_at'], unique=False)
+    op.create_index('ix_order_customer_id_created_at', 'order', ['customer_id', 'created_at'], unique=False)
+    op.create_index('ix_order_product_listing_id', 'order', ['product_listing_id'], unique=False)
+    op.create_index('ix_message_receiver_id_is_read_sent_at', 'message', ['receiver_id', 'is_read', 'sent_at'], unique=False)
+    op.create_index('ix_message_sender_id_sent_at', 'message', ['sender_id', 'sent_at'], unique=False)
+    op.create_index('ix_message_order_id', 'message', ['order_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_message_order_id', table_name='message')
+    op.drop_index('ix_message_sender_id_sent_at', table_name='message')
+    op.drop_index('ix_message_receiver_id_is_read_sent_at', table_name='message')
+    op.drop_index('ix_order_product_listing_id', table_name='order')
+    op.drop_index('ix_order_customer_id_created_at', table_name='order')
+    op.drop_index('ix_order_producer_id_status_created_at', table_name='order')
+    op.drop_index('ix_product_listing_design_id', table_name='product_listing')
+    op.drop_index('ix_design_designer_id_status', table_name='design')
+    op.drop_index('ix_producer_user_id', table_name='producer')
+    op.drop_index('ix_designer_user_id', table_name='designer')
@@ -0,0 +1,26 @@
+"""Preflight report on designs
+
+Revision ID: 5c2d8e41f7a3
+Revises: 1377a32b3b19
+Create Date: 2026-10-17 17:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2d8e41f7a3'
+down_revision = '1377a32b3b19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('design', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('preflight_report', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('design', schema=None) as batch_op:
+        batch_op.drop_column('preflight_report')
@@ -0,0 +1,82 @@
+"""Spatial index on producer coordinates
+
+Revision ID: 7d3e1b5a9c04
+Revises: f2c7a9d13e58
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3e1b5a9c04'
+down_revision = 'f2c7a9d13e58'
+branch_labels = None
+depends_on = None
+
+
+# Points are stored as degenerate boxes; the producer id rides along as an auxiliary column
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS producer_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng, +producer_id)",
+    """CREATE TRIGGER IF NOT EXISTS producer_rtree_insert AFTER INSERT ON producer
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+        INSERT INTO producer_rtree (min_lat, max_lat, min_lng, max_lng, producer_id)
+        VALUES (new.latitude, new.latitude, new.longitude, new.longitude, new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS producer_rtree_update AFTER UPDATE OF latitude, longitude ON producer BEGIN
+        DELETE FROM producer_rtree WHERE producer_id = old.id;
+        INSERT INTO producer_rtree (min_lat, max_lat, min_lng, max_lng, producer_id)
+        SELECT new.latitude, new.latitude, new.longitude, new.longitude, new.id
+        WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS producer_rtree_delete AFTER DELETE ON producer
+        WHEN old.latitude IS NOT NULL AND old.longitude IS NOT NULL BEGIN
+        DELETE FROM producer_rtree WHERE producer_id = old.id;
+    END""",
+    """INSERT INTO producer_rtree (min_lat, max_lat, min_lng, max_lng, producer_id)
+        SELECT latitude, latitude, longitude, longitude, id FROM producer
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        AND NOT EXISTS (SELECT 1 FROM producer_rtree)""",
+)
+
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS producer_rtree_delete",
+    "DROP TRIGGER IF EXISTS producer_rtree_update",
+    "DROP TRIGGER IF EXISTS producer_rtree_insert",
+    "DROP TABLE IF EXISTS producer_rtree",
+)
+
+POSTGRES_UPGRADE = (
+    "CREATE INDEX IF NOT EXISTS ix_producer_location ON producer USING GIST (point(longitude, latitude))",
+)
+
+POSTGRES_DOWNGRADE = (
+    "DROP INDEX IF EXISTS ix_producer_location",
+)
+
+
+def upgrade():
+    # The B-tree serves databases with neither an R*Tree nor GiST
+    op.create_index('ix_producer_latitude_longitude', 'producer', ['latitude', 'longitude'], unique=False)
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        try:
+            for statement in SQLITE_UPGRADE:
+                op.execute(statement)
+        except sa.exc.OperationalError:
+            # SQLite built without R*Tree: location search uses the B-tree
+            pass
+    elif bind.dialect.name == 'postgresql':
+        for statement in POSTGRES_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    statements = {'sqlite': SQLITE_DOWNGRADE, 'postgresql': POSTGRES_DOWNGRADE}.get(bind.dialect.name, ())
+    for statement in statements:
+        op.execute(statement)
+
+    op.drop_index('ix_producer_latitude_longitude', table_name='producer')
@@ -0,0 +1,108 @@
+"""Producer search indexes: capability table, keyset index and full-text search
+
+Revision ID: 908fdcd35e7d
+Revises: 0aee203ace36
+Create Date: 2026-10-17 16:21:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '908fdcd35e7d'
+down_revision = '0aee203ace36'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_UPGRADE = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS producer_fts USING fts5(
+        producer_id UNINDEXED, business_name, description, prefix='2 3 4')""",
+    """CREATE TRIGGER IF NOT EXISTS producer_fts_insert AFTER INSERT ON producer BEGIN
+        INSERT INTO producer_fts (producer_id, business_name, description)
+        VALUES (new.id, new.business_name, coalesce(new.description, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS producer_fts_update AFTER UPDATE OF business_name, description ON producer BEGIN
+        UPDATE producer_fts SET business_name = new.business_name, description = coalesce(new.description, '')
+        WHERE producer_id = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS producer_fts_delete AFTER DELETE ON producer BEGIN
+        DELETE FROM producer_fts WHERE producer_id = old.id;
+    END""",
+    """INSERT INTO producer_fts (producer_id, business_name, description)
+        SELECT id, business_name, coalesce(description, '') FROM producer
+        WHERE NOT EXISTS (SELECT 1 FROM producer_fts)""",
+)
+
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS producer_fts_delete",
+    "DROP TRIGGER IF EXISTS producer_fts_update",
+    "DROP TRIGGER IF EXISTS producer_fts_insert",
+    "DROP TABLE IF EXISTS producer_fts",
+)
+
+POSTGRES_UPGRADE = (
+    "ALTER TABLE producer ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS ix_producer_search_vector ON producer USING GIN (search_vector)",
+    """CREATE OR REPLACE FUNCTION producer_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.business_name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS producer_search_vector_trigger ON producer",
+    """CREATE TRIGGER producer_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF business_name, description ON producer
+        FOR EACH ROW EXECUTE FUNCTION producer_search_vector_update()""",
+    "UPDATE producer SET business_name = business_name WHERE search_vector IS NULL",
+)
+
+POSTGRES_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS producer_search_vector_trigger ON producer",
+    "DROP FUNCTION IF EXISTS producer_search_vector_update()",
+    "DROP INDEX IF EXISTS ix_producer_search_vector",
+    "ALTER TABLE producer DROP COLUMN IF EXISTS search_vector",
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # Databases built with db.create_all() before migrations may already have these
+    if not inspector.has_table('producer_capability'):
+        op.create_table('producer_capability',
+        sa.Column('producer_id', sa.String(length=36), nullable=False),
+        sa.Column('capability', sa.String(length=50), nullable=False),
+        sa.ForeignKeyConstraint(['producer_id'], ['producer.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('producer_id', 'capability')
+        )
+        op.create_index('ix_producer_capability_capability', 'producer_capability', ['capability', 'producer_id'], unique=False)
+
+    if 'ix_producer_joined_at_id' not in {index['name'] for index in inspector.get_indexes('producer')}:
+        op.create_index('ix_producer_joined_at_id', 'producer', ['joined_at', 'id'], unique=False)
+
+    if bind.dialect.name == 'sqlite':
+        try:
+            for statement in SQLITE_UPGRADE:
+                op.execute(statement)
+        except sa.exc.OperationalError:
+            # SQLite built without FTS5: search falls back to ILIKE
+            pass
+    elif bind.dialect.name == 'postgresql':
+        for statement in POSTGRES_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    statements = {'sqlite': SQLITE_DOWNGRADE, 'postgresql': POSTGRES_DOWNGRADE}.get(bind.dialect.name, ())
+    for statement in statements:
+        op.execute(statement)
+
+    op.drop_index('ix_producer_joined_at_id', table_name='producer')
+    op.drop_index('ix_producer_capability_capability', table_name='producer_capability')
+    op.drop_table('producer_capability')
@@ -0,0 +1,27 @@
+"""Keyset indexes for the inbox and conversation threads
+
+Revision ID: a4f19c62d7e0
+Revises: 5c2d8e41f7a3
+Create Date: 2026-10-17 18:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f19c62d7e0'
+down_revision = '5c2d8e41f7a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_message_receiver_id_sent_at_id', 'message', ['receiver_id', 'sent_at', 'id'], unique=False)
+    op.create_index('ix_message_sender_id_receiver_id_sent_at_id', 'message',
+                    ['sender_id', 'receiver_id', 'sent_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_message_sender_id_receiver_id_sent_at_id', table_name='message')
+    op.drop_index('ix_message_receiver_id_sent_at_id', table_name='message')
@@ -0,0 +1,52 @@
+"""Producer capacity slots and bookings
+
+Revision ID: b6a04e8f2d19
+Revises: 7d3e1b5a9c04
+Create Date: 2026-10-17 21:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6a04e8f2d19'
+down_revision = '7d3e1b5a9c04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('capacity_slot',
+    sa.Column('producer_id', sa.String(length=36), nullable=False),
+    sa.Column('capability', sa.String(length=50), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('capacity', sa.Integer(), nullable=False),
+    sa.Column('booked', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['producer_id'], ['producer.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('producer_id', 'capability', 'day')
+    )
+    op.create_table('capacity_booking',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('producer_id', sa.String(length=36), nullable=False),
+    sa.Column('capability', sa.String(length=50), nullable=False),
+    sa.Column('order_id', sa.String(length=36), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('allocations', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['order.id'], ),
+    sa.ForeignKeyConstraint(['producer_id'], ['producer.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('capacity_booking', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_capacity_booking_order_id'), ['order_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_capacity_booking_producer_id'), ['producer_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('capacity_booking', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_capacity_booking_producer_id'))
+        batch_op.drop_index(batch_op.f('ix_capacity_booking_order_id'))
+
+    op.drop_table('capacity_booking')
+    op.drop_table('capacity_slot')
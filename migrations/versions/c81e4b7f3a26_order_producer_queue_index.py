@@ -0,0 +1,27 @@
+"""Covering index for producer order work queues
+
+Revision ID: c81e4b7f3a26
+Revises: a4f19c62d7e0
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81e4b7f3a26'
+down_revision = 'a4f19c62d7e0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_order_producer_queue', 'order',
+                    ['producer_id', 'status', 'created_at', 'id', 'product_listing_id', 'total_amount'], unique=False)
+    op.drop_index('ix_order_producer_id_status_created_at', table_name='order')
+
+
+def downgrade():
+    op.create_index('ix_order_producer_id_status_created_at', 'order', ['producer_id', 'status', 'created_at'], unique=False)
+    op.drop_index('ix_order_producer_queue', table_name='order')
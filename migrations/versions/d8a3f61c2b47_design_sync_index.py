@@ -0,0 +1,26 @@
+"""Keyset index for syncing a designer's designs by update time
+
+Revision ID: d8a3f61c2b47
+Revises: b6a04e8f2d19
+Create Date: 2026-10-17 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a3f61c2b47'
+down_revision = 'b6a04e8f2d19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows written outside the ORM may lack updated_at; sync cursors compare it, so fill it in
+    op.execute("UPDATE design SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL")
+    op.create_index('ix_design_designer_id_updated_at_id', 'design', ['designer_id', 'updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_design_designer_id_updated_at_id', table_name='design')
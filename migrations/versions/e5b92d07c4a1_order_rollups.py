@@ -0,0 +1,31 @@
+"""Order rollups for the producer and designer dashboards
+
+Revision ID: e5b92d07c4a1
+Revises: c81e4b7f3a26
+Create Date: 2026-10-17 19:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b92d07c4a1'
+down_revision = 'c81e4b7f3a26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('order_rollup',
+    sa.Column('owner_type', sa.String(length=10), nullable=False),
+    sa.Column('owner_id', sa.String(length=36), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('owner_type', 'owner_id', 'status')
+    )
+
+
+def downgrade():
+    op.drop_table('order_rollup')
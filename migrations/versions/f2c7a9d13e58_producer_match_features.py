@@ -0,0 +1,30 @@
+"""Producer capacity and location for matching
+
+Revision ID: f2c7a9d13e58
+Revises: e5b92d07c4a1
+Create Date: 2026-10-17 20:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c7a9d13e58'
+down_revision = 'e5b92d07c4a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('producer', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('capacity', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('producer', schema=None) as batch_op:
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
+        batch_op.drop_column('capacity')
@@ -0,0 +1,120 @@
+"""
+Password hashing for Pressly
+
+Hashes are bcrypt by default; any werkzeug method string (e.g. 'pbkdf2:sha256:600000'
+or 'scrypt') can be configured instead. Hashing and verification run in a small
+process pool so CPU-bound work doesn't hold the request thread's GIL, and the
+number of queued jobs is capped so a login spike is shed with HashingBusy
+instead of piling up behind the pool.
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+BCRYPT_MAX_BYTES = 72
+
+
+class HashingBusy(Exception):
+    # Raised when the hashing queue is full; the API answers 429
+    pass
+
+
+def _bcrypt_secret(password):
+    # bcrypt only reads the first 72 bytes; newer releases raise instead of truncating
+    return password.encode('utf-8')[:BCRYPT_MAX_BYTES]
+
+
+def _bcrypt_rounds(password_hash):
+    return int(password_hash.split('$')[2])
+
+
+def _werkzeug_method(scheme):
+    # The method prefix werkzeug writes for a scheme, defaults filled in: 'pbkdf2' -> 'pbkdf2:sha256:600000'
+    method, *parameters = scheme.split(':')
+    defaults = {'pbkdf2': ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)], 'scrypt': [str(2 ** 15), '8', '1']}
+    return ':'.join([method, *parameters, *defaults.get(method, [])[len(parameters):]])
+
+
+def _hash(scheme, rounds, password):
+    if scheme == 'bcrypt':
+        return bcrypt.hashpw(_bcrypt_secret(password), bcrypt.gensalt(rounds)).decode('ascii')
+    return generate_password_hash(password, method=scheme)
+
+
+def _verify(password_hash, password):
+    if password_hash.startswith(BCRYPT_PREFIXES):
+        return bcrypt.checkpw(_bcrypt_secret(password), password_hash.encode('ascii'))
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    def __init__(self, config):
+        self.scheme = config.get('PASSWORD_HASH_SCHEME', 'bcrypt')
+        self.rounds = config.get('BCRYPT_ROUNDS', 12)
+        self.method = _werkzeug_method(self.scheme) if self.scheme != 'bcrypt' else None
+        self.workers = config.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+        self.queue_limit = config.get('PASSWORD_HASH_QUEUE_LIMIT', self.workers * 4)
+        self._slots = threading.BoundedSemaphore(max(1, self.queue_limit))
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # Created lazily and per process, so forked gunicorn workers each get their own pool
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            pool = self._executor()
+            try:
+                return pool.submit(func, *args).result()
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory) and the pool refuses all later work,
+                # so replace it and retry once rather than fail every hash until a restart
+                self._discard(pool)
+                return self._executor().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def _discard(self, pool):
+        # Only the pool that broke; another thread may already have replaced it
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def hash(self, password):
+        return self._run(_hash, self.scheme, self.rounds, password)
+
+    def needs_rehash(self, password_hash):
+        # Hashes with other parameters than configured (iterations, scrypt or bcrypt cost) are upgraded
+        if self.scheme != 'bcrypt':
+            return password_hash.split('$', 1)[0] != self.method
+        return not password_hash.startswith(BCRYPT_PREFIXES) or _bcrypt_rounds(password_hash) != self.rounds
+
+    def verify(self, password_hash, password):
+        # Returns (matches, needs_rehash) so callers can upgrade legacy hashes on login
+        if not password_hash or password is None:
+            return False, False
+        matches = self._run(_verify, password_hash, password)
+        return matches, matches and self.needs_rehash(password_hash)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
@@ -0,0 +1,158 @@
+"""
+Background preflight and thumbnails for uploaded design files
+
+Each file is processed once in a worker process: Pillow reads its dimensions,
+DPI and colour mode, multi-size previews are written next to a report.json,
+and the report is cached on disk by content hash. Submitting a file whose
+report already exists returns the cached report without touching the pool.
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+PRINT_DPI = 300
+
+COLOR_SPACES = {
+    'CMYK': 'CMYK',
+    'RGB': 'RGB',
+    'RGBA': 'RGB',
+    'P': 'RGB',
+    'L': 'Grayscale',
+    'LA': 'Grayscale',
+    '1': 'Grayscale',
+    'I;16': 'Grayscale',
+}
+
+
+def read_report(output_dir):
+    try:
+        with open(os.path.join(output_dir, 'report.json')) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_report(output_dir, report):
+    path = os.path.join(output_dir, 'report.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(report, f)
+    os.replace(path + '.tmp', path)
+
+
+def _write_thumbnails(image, output_dir, sizes):
+    # Largest preview first, each smaller one is reduced from the previous
+    from PIL import Image
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    preview = image.convert('RGBA' if has_alpha else 'RGB')
+    extension = 'png' if has_alpha else 'jpg'
+    thumbnails = {}
+    for size in sorted(sizes, reverse=True):
+        preview.thumbnail((size, size), Image.LANCZOS, reducing_gap=2.0)
+        name = f'{size}.{extension}'
+        if has_alpha:
+            preview.save(os.path.join(output_dir, name), 'PNG', optimize=True)
+        else:
+            preview.save(os.path.join(output_dir, name), 'JPEG', quality=85, optimize=True)
+        thumbnails[str(size)] = name
+    return thumbnails
+
+
+def run_preflight(source_path, output_dir, sizes):
+    # Runs in a worker process; Pillow is only imported there
+    cached = read_report(output_dir)
+    if cached is not None:
+        return cached
+
+    from PIL import Image, UnidentifiedImageError
+
+    os.makedirs(output_dir, exist_ok=True)
+    report = {'status': 'done', 'fileSize': os.path.getsize(source_path), 'warnings': [], 'thumbnails': {}}
+
+    try:
+        with Image.open(source_path) as image:
+            width, height = image.size
+            dpi = image.info.get('dpi')
+            color_space = COLOR_SPACES.get(image.mode, image.mode)
+            report.update({'format': image.format, 'width': width, 'height': height,
+                           'mode': image.mode, 'colorSpace': color_space})
+
+            if dpi:
+                dpi_x, dpi_y = (round(float(value), 2) for value in dpi)
+                report['dpi'] = [dpi_x, dpi_y]
+                if dpi_x and dpi_y:
+                    report['printSizeInches'] = [round(width / dpi_x, 2), round(height / dpi_y, 2)]
+                if min(dpi_x, dpi_y) < PRINT_DPI:
+                    report['warnings'].append(f'Resolution is below {PRINT_DPI} DPI')
+            else:
+                report['warnings'].append('No DPI recorded in the file')
+            if color_space == 'RGB':
+                report['warnings'].append('RGB artwork will be converted to CMYK for print')
+
+            if image.format == 'JPEG':
+                # Let the decoder downscale while reading instead of decoding full resolution
+                image.draft('RGB', (max(sizes), max(sizes)))
+            report['thumbnails'] = _write_thumbnails(image, output_dir, sizes)
+    except UnidentifiedImageError:
+        report.update({'status': 'unsupported', 'warnings': ['No preview is available for this file type']})
+    except (OSError, Image.DecompressionBombError) as e:
+        report.update({'status': 'failed', 'error': str(e)})
+
+    _write_report(output_dir, report)
+    return report
+
+
+class PreflightQueue:
+    def __init__(self, workers=1, sizes=(256, 1024)):
+        self.workers = workers
+        self.sizes = tuple(sizes)
+        self._pool = None
+        self._pool_pid = None
+        self._pending = {}  # key -> callbacks waiting for that file
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # Created lazily and per process, so forked gunicorn workers each get their own pool
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            self._pool_pid = os.getpid()
+            self._pending = {}
+        return self._pool
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._pending
+
+    def submit(self, key, source_path, output_dir, callback):
+        # callback(report) runs once the file is processed; never blocks the caller
+        cached = read_report(output_dir)
+        if cached is not None:
+            callback(cached)
+            return
+
+        with self._lock:
+            executor = self._executor()
+            if key in self._pending:
+                self._pending[key].append(callback)
+                return
+            self._pending[key] = [callback]
+            future = executor.submit(run_preflight, source_path, output_dir, self.sizes)
+        future.add_done_callback(lambda done: self._finish(key, done))
+
+    def _finish(self, key, future):
+        try:
+            report = future.result()
+        except Exception as e:
+            report = {'status': 'failed', 'error': str(e)}
+        with self._lock:
+            callbacks = self._pending.pop(key, [])
+        for callback in callbacks:
+            callback(report)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
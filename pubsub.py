@@ -0,0 +1,81 @@
+"""
+In-process publish/subscribe for live updates
+
+Subscribers wait on a per-connection buffer, so an idle long-poll or
+Server-Sent Events client costs a blocked thread and no database queries.
+Delivery is best effort and local to the process: clients catch up from the
+database with their last cursor when they reconnect, and streams resync
+periodically so messages published by other workers still arrive.
+"""
+
+import threading
+from collections import deque
+
+
+class Subscription:
+    def __init__(self, broker, channel, max_pending):
+        self.broker = broker
+        self.channel = channel
+        self._events = deque(maxlen=max_pending)  # a stalled reader drops its oldest events
+        self._ready = threading.Condition()
+        self.closed = False
+
+    def deliver(self, event):
+        with self._ready:
+            self._events.append(event)
+            self._ready.notify()
+
+    def wait(self, timeout=None):
+        # Returns the events published since the last call, or [] on timeout
+        with self._ready:
+            if not self._events and not self.closed:
+                self._ready.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+    def close(self):
+        self.broker.unsubscribe(self)
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Broker:
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._channels = {}  # channel -> set of subscriptions
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.max_pending)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return len(subscribers)
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._channels.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._channels.values())
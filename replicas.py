@@ -0,0 +1,110 @@
+"""
+Read replica routing for Pressly
+
+Each URL in DATABASE_REPLICA_URLS becomes a Flask-SQLAlchemy bind (replica_0,
+replica_1, ...) that no model is mapped to, so nothing reaches a replica unless
+RoutingSession sends it there. In a request that picked a replica (endpoints
+decorated with replica_reads in app.py), ORM and Core reads go to that replica.
+Everything else goes to the primary: flushes, INSERT/UPDATE/DELETE, SELECT ...
+FOR UPDATE, explicit session.connection() calls, and every statement after the
+request's first write.
+
+ReplicaSet hands replicas out round-robin. A replica whose connection fails is
+ejected for REPLICA_EJECT_SECONDS. Every REPLICA_CHECK_INTERVAL seconds one
+request probes the replica checked longest ago. On Postgres the probe measures
+replay lag, and a replica more than REPLICA_MAX_LAG seconds behind sits out
+until a later probe finds it caught up.
+"""
+
+import itertools
+import threading
+import time
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql.elements import TextClause
+
+# Zero while the replica has replayed everything it received, so an idle primary doesn't read as lag
+POSTGRES_LAG = text(
+    'SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END')
+
+
+def is_read(clause):
+    # Statements a read-only replica can run; anything unrecognised goes to the primary
+    if clause is None or getattr(clause, 'is_dml', False):
+        return False
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip()[:6].upper() == 'SELECT'
+    return getattr(clause, '_for_update_arg', None) is None
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            if self._flushing or not is_read(clause):
+                g.wrote_primary = True
+            elif g.get('read_replica') and not g.get('wrote_primary'):
+                return self._db.engines[g.read_replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaSet:
+    def __init__(self, engines, eject_seconds=30, max_lag=5, check_interval=10, logger=None):
+        self.engines = engines  # bind key -> Engine
+        self.names = list(engines)
+        self.eject_seconds = eject_seconds
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.logger = logger
+        self.ejected_until = {}  # bind key -> monotonic time it may serve reads again
+        self.checked_at = {}  # bind key -> monotonic time of its last probe
+        self.lag = {}  # bind key -> seconds behind the primary at its last probe
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self, exclude=()):
+        """The bind key of the next healthy replica, or None to read from the primary."""
+        now = time.monotonic()
+        self._probe_due(now)
+        for _ in range(len(self.names)):
+            name = self.names[next(self._turn) % len(self.names)]
+            if name not in exclude and self.ejected_until.get(name, 0) <= now:
+                return name
+        return None
+
+    def eject(self, name, reason, seconds=None):
+        self.ejected_until[name] = time.monotonic() + (seconds or self.eject_seconds)
+        if self.logger is not None:
+            self.logger.warning('Reading from the primary instead of %s for %ss: %s',
+                                name, seconds or self.eject_seconds, reason)
+
+    def measure_lag(self, name):
+        engine = self.engines[name]
+        with engine.connect() as connection:
+            if engine.dialect.name == 'postgresql':
+                return float(connection.execute(POSTGRES_LAG).scalar() or 0)
+            connection.execute(text('SELECT 1'))
+            return 0.0
+
+    def _probe_due(self, now):
+        # One request at a time probes; the others pick from what the last probes found
+        if not self.names or not self._lock.acquire(blocking=False):
+            return
+        try:
+            name = min(self.names, key=lambda name: self.checked_at.get(name, float('-inf')))
+            if now - self.checked_at.get(name, float('-inf')) < self.check_interval:
+                return
+            self.checked_at[name] = now
+            try:
+                self.lag[name] = self.measure_lag(name)
+            except SQLAlchemyError as e:
+                self.eject(name, e)
+                return
+            if self.lag[name] > self.max_lag:
+                # Probed again next interval, and back in rotation as soon as it has caught up
+                self.eject(name, f'{self.lag[name]:.1f}s behind the primary', self.check_interval)
+        finally:
+            self._lock.release()
@@ -0,0 +1,128 @@
+"""
+Compiled JSON serializers for Pressly
+
+A Schema lists the fields of an API object: the camelCase name, the row
+values it is built from and how they are converted. The first time a selection
+of fields is used (all of them, or a `fields=` projection), the schema
+generates one Python function for it that builds the object as a single dict
+literal, so a listing of N rows costs N calls to that function and one encoder
+call, with no per-field loop, getattr or key conversion.
+
+A schema given the `columns` of the query it serializes reads each value by
+position; for SQLAlchemy rows that is an order of magnitude cheaper than by
+attribute name, which dominated the cost of building a large listing. Without
+`columns` (ORM objects) values are read as attributes.
+
+Bodies are encoded with orjson when it is installed and with the standard
+library otherwise. Values are converted to JSON types before encoding (dates
+are ISO 8601 strings), so both produce the same document.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # optional: the standard library encoder is used instead
+    orjson = None
+
+
+class FieldSelectionError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class Field:
+    # One value passed through as is (strings, numbers, booleans, JSON columns)
+    def __init__(self, name, source=None):
+        self.name = name
+        self.sources = (source or name,)
+
+    def expression(self, values, reference, namespace):
+        return values[0]
+
+
+class DateTime(Field):
+    def expression(self, values, reference, namespace):
+        return f'({values[0]}.isoformat() if {values[0]} is not None else None)'
+
+
+class Computed(Field):
+    # A value built by `function(*values of sources)`
+    def __init__(self, name, function, *sources):
+        self.name = name
+        self.function = function
+        self.sources = sources
+
+    def expression(self, values, reference, namespace):
+        namespace[reference] = self.function
+        return f'{reference}({", ".join(values)})'
+
+
+class Schema:
+    def __init__(self, name, *fields, columns=None):
+        self.name = name
+        self.fields = fields
+        self.columns = tuple(columns) if columns is not None else None
+        for field in fields:
+            for source in field.sources:
+                if not source.isidentifier() or (self.columns is not None and source not in self.columns):
+                    raise ValueError(f'{name}.{field.name} reads {source!r}, which is not a column or attribute')
+        self._encoders = {}  # frozenset of selected names (None for all) -> compiled function
+
+    def only(self, *names):
+        # A schema with a subset of the fields, e.g. a public view without contact details
+        return Schema(self.name, *self.select(names), columns=self.columns)
+
+    def select(self, names=None):
+        if not names:
+            return self.fields
+        unknown = set(names) - {field.name for field in self.fields}
+        if unknown:
+            raise FieldSelectionError(f'Unknown field {", ".join(sorted(unknown))}; '
+                                      f'{self.name} has {", ".join(field.name for field in self.fields)}')
+        return tuple(field for field in self.fields if field.name in names)
+
+    def encoder(self, names=None):
+        """The row -> dict function for a selection of fields, compiled once per selection."""
+        key = frozenset(names) if names else None
+        encoder = self._encoders.get(key)
+        if encoder is None:
+            encoder = self._encoders[key] = self._compile(self.select(names))
+        return encoder
+
+    def _value(self, source):
+        if self.columns is None:
+            return f'row.{source}'
+        return f'row[{self.columns.index(source)}]'
+
+    def _compile(self, fields):
+        namespace = {}
+        items = ', '.join(
+            f'{field.name!r}: {field.expression([self._value(source) for source in field.sources], f"_{index}", namespace)}'
+            for index, field in enumerate(fields))
+        source = f'def encode(row):\n    return {{{items}}}\n'
+        exec(compile(source, f'<{self.name} encoder>', 'exec'), namespace)
+        return namespace['encode']
+
+    def dumps(self, rows, names=None):
+        return dumps(list(map(self.encoder(names), rows)))
+
+
+def requested_fields(value):
+    # The `fields=` query parameter: comma-separated names, or None for every field
+    names = [name.strip() for name in (value or '').split(',') if name.strip()]
+    return names or None
+
+
+_stdlib_encoder = json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(',', ':'))
+
+
+def stdlib_dumps(value):
+    return _stdlib_encoder.encode(value).encode()
+
+
+if orjson is not None:
+    dumps = orjson.dumps
+else:
+    dumps = stdlib_dumps
@@ -0,0 +1,72 @@
+"""
+Shipping-rate lookups for Pressly
+
+Quotes come from an external rates service at SHIPPING_RATES_URL, which takes
+the origin, destination and parcels as JSON and answers with a list of rates.
+Requests go through one pooled HTTP session per process, so repeated lookups
+reuse keep-alive connections, and every call has a connect and read timeout
+so a slow carrier fails the quote instead of holding the request forever.
+Under a gevent worker the calls only block their own greenlet.
+"""
+
+import threading
+
+
+class ShippingRatesUnavailable(Exception):
+    # Raised when the service is unconfigured, unreachable, slow or answers with an error
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class ShippingRates:
+    def __init__(self, config):
+        self.url = config.get('SHIPPING_RATES_URL')
+        self.api_key = config.get('SHIPPING_RATES_API_KEY')
+        self.timeout = (config.get('SHIPPING_RATES_CONNECT_TIMEOUT', 2), config.get('SHIPPING_RATES_TIMEOUT', 10))
+        self.pool_size = config.get('SHIPPING_RATES_POOL_SIZE', 20)
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self):
+        return bool(self.url)
+
+    def session(self):
+        # Created lazily, so forked gunicorn workers don't share the master's sockets and
+        # importing this module (for ShippingRatesUnavailable) doesn't import requests
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=True)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                if self.api_key:
+                    session.headers['Authorization'] = f'Bearer {self.api_key}'
+                self._session = session
+            return self._session
+
+    def quote(self, origin, destination, parcels):
+        """Rates for shipping `parcels` from `origin` to `destination`.
+
+        Returns the service's rates, cheapest first, as dicts with at least
+        carrier, service, amount and currency.
+        """
+        import requests
+
+        if not self.configured:
+            raise ShippingRatesUnavailable('Shipping rates are not configured')
+        try:
+            response = self.session().post(self.url, json={
+                'origin': origin, 'destination': destination, 'parcels': parcels
+            }, timeout=self.timeout)
+            response.raise_for_status()
+            rates = response.json()['rates']
+        except requests.Timeout:
+            raise ShippingRatesUnavailable('The shipping rates service timed out')
+        except (requests.RequestException, ValueError, KeyError, TypeError):
+            raise ShippingRatesUnavailable('The shipping rates service is unavailable')
+        return sorted(rates, key=lambda rate: rate.get('amount', 0))
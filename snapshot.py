@@ -0,0 +1,177 @@
+"""
+Precomputed producer snapshots for Pressly
+
+`flask export-snapshot` writes the producer listing and the featured selection
+into one artifact. Each document is serialized once as a JSON array, gzipped
+with a fixed timestamp (so unchanged data compresses to the same bytes) and
+stored with the ETag of its uncompressed body behind a one-line JSON header:
+
+    PRESSLY-SNAPSHOT 1
+    {"generatedAt": ..., "documents": {"producers": {"etag": ..., "size": ..., "length": ...}, ...}}
+    <gzip bytes of each document, in header order>
+
+A serving process loads the artifact from PRODUCER_SNAPSHOT_URL (an http(s) URL
+or a local path) on first use and keeps only the compressed bytes. Once they
+are older than PRODUCER_SNAPSHOT_MAX_AGE seconds, one request checks the source
+again with a conditional GET (or the file's mtime) while the others keep
+serving the documents they have.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+MAGIC = b'PRESSLY-SNAPSHOT 1\n'
+
+
+class SnapshotUnavailable(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class SnapshotDocument:
+    __slots__ = ('body', 'etag', 'size')
+
+    def __init__(self, body, etag, size):
+        self.body = body  # gzip-compressed JSON
+        self.etag = etag
+        self.size = size  # uncompressed bytes
+
+    def decompress(self):
+        return gzip.decompress(self.body)
+
+
+def compress_document(items):
+    # Streams a JSON array into gzip, so the uncompressed body is never held in memory
+    buffer = io.BytesIO()
+    digest = hashlib.sha1()
+    size = 0
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as stream:
+        separator = b'['
+        for item in items:
+            chunk = separator + json.dumps(item, separators=(',', ':')).encode()
+            stream.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+            separator = b','
+        chunk = b'[]' if separator == b'[' else b']'
+        stream.write(chunk)
+        digest.update(chunk)
+        size += len(chunk)
+    return SnapshotDocument(buffer.getvalue(), digest.hexdigest(), size)
+
+
+def write_snapshot(path, documents, generated_at=None):
+    """Write `documents` (name -> iterable of JSON-serializable items) to `path`.
+
+    The artifact is written beside `path` and renamed over it, so a reader never
+    sees a partial file. Returns the compressed documents by name.
+    """
+    generated_at = generated_at or datetime.utcnow()
+    compressed = {name: compress_document(items) for name, items in documents.items()}
+    header = {
+        'generatedAt': generated_at.isoformat(),
+        'documents': {name: {'etag': document.etag, 'size': document.size, 'length': len(document.body)}
+                      for name, document in compressed.items()},
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    partial = f'{path}.{os.getpid()}.tmp'
+    with open(partial, 'wb') as f:
+        f.write(MAGIC)
+        f.write(json.dumps(header, separators=(',', ':')).encode() + b'\n')
+        for document in compressed.values():
+            f.write(document.body)
+    os.replace(partial, path)
+    return compressed
+
+
+def parse_snapshot(data):
+    # Returns (generated_at, {name: SnapshotDocument}); the bodies are copied out so `data` can be freed
+    if not data.startswith(MAGIC):
+        raise ValueError('Not a producer snapshot')
+    header_end = data.index(b'\n', len(MAGIC))
+    header = json.loads(data[len(MAGIC):header_end])
+    view = memoryview(data)
+    offset = header_end + 1
+    documents = {}
+    for name, entry in header['documents'].items():
+        body = bytes(view[offset:offset + entry['length']])
+        if len(body) != entry['length']:
+            raise ValueError('Truncated producer snapshot')
+        documents[name] = SnapshotDocument(body, entry['etag'], entry['size'])
+        offset += entry['length']
+    return datetime.fromisoformat(header['generatedAt']), documents
+
+
+class ProducerSnapshot:
+    def __init__(self, source, max_age=60, timeout=5, logger=None):
+        self.source = source
+        self.max_age = max_age
+        self.timeout = timeout
+        self.logger = logger
+        self.documents = None
+        self.generated_at = None
+        self.loaded_at = None  # when the current documents were read
+        self.checked_at = None  # when the source was last checked for a newer artifact
+        self._validator = None  # the source's ETag, or the file's (mtime, size)
+        self._lock = threading.Lock()
+
+    def document(self, name):
+        if self.checked_at is None or time.monotonic() - self.checked_at >= self.max_age:
+            self.refresh()
+        document = self.documents.get(name)
+        if document is None:
+            raise SnapshotUnavailable(f'The producer snapshot has no {name} document')
+        return document
+
+    def refresh(self):
+        # The first load waits for it; afterwards one request checks the source and the rest serve what is loaded
+        if not self._lock.acquire(blocking=self.documents is None):
+            return
+        try:
+            if self.checked_at is not None and time.monotonic() - self.checked_at < self.max_age:
+                return
+            try:
+                data, validator = self._fetch()
+                if data is not None:
+                    self.generated_at, self.documents = parse_snapshot(data)
+                    self.loaded_at = time.monotonic()
+                    self._validator = validator
+            except (OSError, ValueError, KeyError) as e:
+                if self.documents is None:
+                    raise SnapshotUnavailable('The producer snapshot could not be loaded') from e
+                if self.logger is not None:
+                    self.logger.warning('Keeping the producer snapshot from %s: %s', self.generated_at, e)
+            self.checked_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def _fetch(self):
+        # (artifact bytes, validator), or (None, None) when the source hasn't changed since the last load
+        if self.source.startswith(('http://', 'https://')):
+            from urllib.error import HTTPError
+            from urllib.request import Request, urlopen
+            request = Request(self.source)
+            if self._validator:
+                request.add_header('If-None-Match', self._validator)
+            try:
+                with urlopen(request, timeout=self.timeout) as response:
+                    return response.read(), response.headers.get('ETag')
+            except HTTPError as e:
+                if e.code == 304:
+                    return None, None
+                raise
+        path = self.source[len('file://'):] if self.source.startswith('file://') else self.source
+        stat = os.stat(path)
+        validator = (stat.st_mtime_ns, stat.st_size)
+        if validator == self._validator:
+            return None, None
+        with open(path, 'rb') as f:
+            return f.read(), validator
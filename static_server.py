@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Static asset server for Pressly
+
+Threaded HTTP/1.1 server for the React build (or the static fallback site):
+- SPA routing: paths without a file extension are answered with index.html
+- serves pre-compressed .br/.gz siblings when the client accepts them
+  (python static_server.py --precompress build writes them)
+- content-hashed assets (main.1a2b3c4d.js) are cached for a year as immutable,
+  index.html is always revalidated
+- ETag/Last-Modified conditional requests and single byte-range requests
+
+    python static_server.py --directory build --port 3000
+"""
+
+import argparse
+import email.utils
+import gzip
+import http.server
+import os
+import re
+import shutil
+import sys
+
+HASHED_ASSET = re.compile(r'\.[0-9a-f]{8,}\.(chunk\.)?[a-z0-9]+$')
+COMPRESSIBLE = {'.html', '.js', '.css', '.json', '.svg', '.txt', '.map', '.xml', '.ico', '.webmanifest'}
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class StaticHandler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'PresslyStatic/1.0'
+    # Headers and sendfile body go out as separate writes; without this, Nagle and
+    # delayed ACKs add ~40ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def end_headers(self):
+        # Enable CORS for development testing
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, HEAD, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'X-Requested-With, Content-Type, Range')
+        super().end_headers()
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def resolve(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, 'index.html')
+        if not os.path.isfile(path):
+            # Handle SPA routing - serve index.html for client-side routes
+            request_path = self.path.split('?', 1)[0].split('#', 1)[0]
+            if '.' in os.path.basename(request_path):
+                return None
+            path = os.path.join(self.directory, 'index.html')
+        return path if os.path.isfile(path) else None
+
+    def cache_control(self, path):
+        name = os.path.basename(path)
+        if name == 'index.html':
+            return 'no-cache'
+        if HASHED_ASSET.search(name):
+            return 'public, max-age=31536000, immutable'
+        return 'public, max-age=3600'
+
+    def pick_encoding(self, path):
+        # Pre-compressed siblings are only used for full responses
+        if os.path.splitext(path)[1] not in COMPRESSIBLE or 'Range' in self.headers:
+            return None, path
+        accepted = {part.split(';')[0].strip() for part in self.headers.get('Accept-Encoding', '').split(',')}
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and os.path.isfile(path + suffix):
+                return encoding, path + suffix
+        return None, path
+
+    def not_modified(self, etag, mtime):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag in {tag.strip() for tag in if_none_match.split(',')} or if_none_match.strip() == '*'
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return int(mtime) <= email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def byte_range(self, size, etag):
+        # Returns (start, end) for a satisfiable single range, None for a full response, False for 416
+        header = self.headers.get('Range')
+        if not header:
+            return None
+        if_range = self.headers.get('If-Range')
+        if if_range and if_range.strip() != etag:
+            return None
+        match = RANGE_PATTERN.match(header.strip())
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if first and last and int(last) < int(first):
+            # Syntactically invalid, so the header is ignored (RFC 7233 section 2.1)
+            return None
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(0, size - int(last)), size - 1
+        if start >= size:
+            return False
+        return start, end
+
+    def serve(self, send_body):
+        source = self.resolve()
+        if source is None:
+            self.send_error(404, 'File not found')
+            return
+
+        encoding, path = self.pick_encoding(source)
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404, 'File not found')
+            return
+
+        with f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            etag = '"%x-%x%s"' % (int(stat.st_mtime), size, '-' + encoding if encoding else '')
+            headers = {
+                'ETag': etag,
+                'Last-Modified': self.date_time_string(stat.st_mtime),
+                'Cache-Control': self.cache_control(source),
+                'Accept-Ranges': 'bytes',
+            }
+            if os.path.splitext(source)[1] in COMPRESSIBLE:
+                headers['Vary'] = 'Accept-Encoding'
+
+            if self.not_modified(etag, stat.st_mtime):
+                self.send_response(304)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                return
+
+            byte_range = self.byte_range(size, etag)
+            if byte_range is False:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            start, end = byte_range or (0, size - 1)
+            length = max(0, end - start + 1)
+            self.send_response(206 if byte_range else 200)
+            self.send_header('Content-Type', self.guess_type(source))
+            self.send_header('Content-Length', str(length))
+            if byte_range:
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+
+            if send_body and length:
+                # Zero-copy where the platform supports it
+                self.connection.sendfile(f, start, length)
+
+
+class StaticServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-response are routine, not server errors
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+def make_server(directory, port, host=''):
+    directory = os.path.abspath(directory)
+
+    class Handler(StaticHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=directory, **kwargs)
+
+        def log_message(self, format, *args):
+            if self.server.verbose:
+                super().log_message(format, *args)
+
+    server = StaticServer((host, port), Handler)
+    server.verbose = True
+    return server
+
+
+def serve(directory, port, host=''):
+    with make_server(directory, port, host) as httpd:
+        print(f"Serving directory: {os.path.abspath(directory)}")
+        print(f"Starting Pressly server on http://localhost:{port}")
+        print(f"Press Ctrl+C to stop the server")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\nServer stopped.")
+
+
+def precompress(directory):
+    # Writes .gz (and .br when the brotli package is installed) next to compressible files
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.splitext(name)[1] not in COMPRESSIBLE or os.path.getsize(path) < 1024:
+                continue
+            with open(path, 'rb') as source, gzip.open(path + '.gz', 'wb', compresslevel=9) as target:
+                shutil.copyfileobj(source, target)
+            written += 1
+            if brotli:
+                with open(path, 'rb') as source, open(path + '.br', 'wb') as target:
+                    target.write(brotli.compress(source.read(), quality=11))
+                written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the Pressly static build')
+    parser.add_argument('--directory', default='./build')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--host', default='')
+    parser.add_argument('--precompress', metavar='DIRECTORY', help='write .gz/.br variants and exit')
+    args = parser.parse_args()
+
+    if args.precompress:
+        print(f"Wrote {precompress(args.precompress)} compressed files")
+        return 0
+
+    serve(args.directory, args.port, args.host)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
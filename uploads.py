@@ -0,0 +1,248 @@
+"""
+Chunked, resumable design-file uploads for Pressly
+
+Chunks are streamed straight to a part file while a SHA-256 of the content is
+updated incrementally, so nothing is buffered in memory and no second pass over
+the file is needed. Finished files are stored content-addressed under
+objects/<aa>/<bb>/<sha256>, which makes identical artwork share one copy.
+File types are checked by sniffing magic bytes, not just the extension; the
+types an object's bytes were sniffed as are recorded next to it, and a client
+can only skip the transfer of a known file under one of those types.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+COPY_BUFFER_SIZE = 1024 * 1024
+SNIFF_BYTES = 1024
+
+# Leading bytes accepted for each allowed extension
+SIGNATURES = {
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'gif': (b'GIF87a', b'GIF89a'),
+    'pdf': (b'%PDF-',),
+    'ai': (b'%PDF-', b'%!PS-Adobe'),  # modern .ai files are PDF-compatible
+    'psd': (b'8BPS',),
+    'eps': (b'%!PS-Adobe', b'\xc5\xd0\xd3\xc6'),  # plain and DOS-binary EPS
+}
+
+SVG_PATTERN = re.compile(rb'^(\xef\xbb\xbf)?\s*(<\?xml[^>]*>\s*)?(<!--.*?-->\s*|<!DOCTYPE[^>]*>\s*)*<svg[\s>]',
+                         re.DOTALL | re.IGNORECASE)
+
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.details = details
+
+
+def file_extension(filename):
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
+
+def sniff_matches(extension, header):
+    # True when the first bytes of a file look like the type its extension claims
+    if extension == 'svg':
+        return bool(SVG_PATTERN.match(header))
+    return any(header.startswith(signature) for signature in SIGNATURES.get(extension, ()))
+
+
+class UploadStore:
+    def __init__(self, root, incoming, max_file_size, allowed_extensions):
+        self.objects = os.path.join(root, 'objects')
+        self.root = root
+        self.incoming = incoming
+        self.max_file_size = max_file_size
+        self.allowed_extensions = allowed_extensions
+        # Running hashes of uploads this process has seen: upload id -> (hasher, hashed offset)
+        self._hashers = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.objects, exist_ok=True)
+        os.makedirs(self.incoming, exist_ok=True)
+
+    # Paths
+    def object_path(self, digest):
+        return os.path.join(self.objects, digest[:2], digest[2:4], digest)
+
+    def types_path(self, digest):
+        return self.object_path(digest) + '.types'
+
+    def stored_types(self, digest):
+        # Extensions the stored object's bytes were sniffed as; empty for objects stored before types were recorded
+        try:
+            with open(self.types_path(digest)) as f:
+                return set(json.load(f))
+        except FileNotFoundError:
+            return set()
+
+    def relative_path(self, digest):
+        return os.path.relpath(self.object_path(digest), self.root)
+
+    def _session_dir(self, upload_id):
+        if not UPLOAD_ID_PATTERN.match(upload_id or ''):
+            raise UploadError('Upload not found', 404)
+        return os.path.join(self.incoming, upload_id)
+
+    def _load(self, upload_id):
+        try:
+            with open(os.path.join(self._session_dir(upload_id), 'state.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadError('Upload not found', 404)
+
+    def _offset(self, upload_id):
+        return os.path.getsize(os.path.join(self._session_dir(upload_id), 'data.part'))
+
+    # API
+    def create(self, filename, size, sha256=None, metadata=None):
+        extension = file_extension(filename)
+        if extension not in self.allowed_extensions:
+            raise UploadError('File type not allowed', 415)
+        if not isinstance(size, int) or size <= 0:
+            raise UploadError('Invalid file size')
+        if size > self.max_file_size:
+            raise UploadError('File too large', 413)
+
+        # A client that already knows the content hash skips the transfer when the file exists
+        # and was sniffed as the type the new filename claims; anything else is uploaded and sniffed
+        if sha256 and SHA256_PATTERN.match(sha256) and os.path.exists(self.object_path(sha256)):
+            if os.path.getsize(self.object_path(sha256)) == size and extension in self.stored_types(sha256):
+                return {'complete': True, 'sha256': sha256, 'path': self.relative_path(sha256),
+                        'deduplicated': True, 'metadata': metadata or {}}
+
+        self.expire_stale()
+        upload_id = uuid.uuid4().hex
+        session_dir = os.path.join(self.incoming, upload_id)
+        os.makedirs(session_dir)
+        open(os.path.join(session_dir, 'data.part'), 'wb').close()
+        state = {'filename': filename, 'extension': extension, 'size': size,
+                 'metadata': metadata or {}, 'createdAt': time.time()}
+        with open(os.path.join(session_dir, 'state.json'), 'w') as f:
+            json.dump(state, f)
+        return {'uploadId': upload_id, 'offset': 0, 'size': size, 'complete': False}
+
+    def status(self, upload_id):
+        state = self._load(upload_id)
+        return {'uploadId': upload_id, 'offset': self._offset(upload_id), 'size': state['size'], 'complete': False}
+
+    def write_chunk(self, upload_id, start, stream, length):
+        # Appends one chunk read from a file-like stream; start must equal the bytes already received
+        state = self._load(upload_id)
+        session_dir = self._session_dir(upload_id)
+        part_path = os.path.join(session_dir, 'data.part')
+
+        with open(part_path, 'r+b') as part:
+            if fcntl:
+                fcntl.flock(part, fcntl.LOCK_EX)
+            offset = os.fstat(part.fileno()).st_size
+            if start != offset:
+                raise UploadError('Chunk does not start at the current offset', 409, offset=offset)
+            if length is None or length <= 0 or offset + length > state['size']:
+                raise UploadError('Chunk exceeds the declared file size')
+
+            hasher = self._hasher(upload_id, part, offset)
+            part.seek(offset)
+            header = b''
+            remaining = length
+            while remaining:
+                block = stream.read(min(COPY_BUFFER_SIZE, remaining))
+                if not block:
+                    break
+                if offset == 0 and len(header) < SNIFF_BYTES:
+                    header += block[:SNIFF_BYTES - len(header)]
+                part.write(block)
+                hasher.update(block)
+                remaining -= len(block)
+            part.flush()
+            received = offset + length - remaining
+
+            if remaining:
+                # Client disconnected mid-chunk: drop the partial chunk so it can be resent
+                part.truncate(offset)
+                self._forget(upload_id)
+                raise UploadError('Incomplete chunk', 400, offset=offset)
+
+            if offset == 0 and not sniff_matches(state['extension'], header):
+                self._forget(upload_id)
+                self.discard(upload_id)
+                raise UploadError('File contents do not match its type', 415)
+
+            with self._lock:
+                self._hashers[upload_id] = (hasher, received)
+
+            if received < state['size']:
+                return {'uploadId': upload_id, 'offset': received, 'size': state['size'], 'complete': False}
+
+            digest = hasher.hexdigest()
+            deduplicated = self._commit(part_path, digest)
+
+        self._forget(upload_id)
+        shutil.rmtree(session_dir, ignore_errors=True)
+        return {'complete': True, 'sha256': digest, 'path': self.relative_path(digest),
+                'deduplicated': deduplicated, 'metadata': state['metadata']}
+
+    def discard(self, upload_id):
+        self._forget(upload_id)
+        shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
+
+    def expire_stale(self, max_age=24 * 3600):
+        cutoff = time.time() - max_age
+        for name in os.listdir(self.incoming):
+            path = os.path.join(self.incoming, name)
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+    # Internals
+    def _hasher(self, upload_id, part, offset):
+        # Reuses the running hash when this process received the previous chunk,
+        # otherwise catches up from disk (e.g. chunks spread over several workers)
+        with self._lock:
+            hasher, hashed = self._hashers.pop(upload_id, (None, 0))
+        if hasher is None or hashed > offset:
+            hasher, hashed = hashlib.sha256(), 0
+        part.seek(hashed)
+        while hashed < offset:
+            block = part.read(min(COPY_BUFFER_SIZE, offset - hashed))
+            hasher.update(block)
+            hashed += len(block)
+        return hasher
+
+    def _forget(self, upload_id):
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+
+    def _commit(self, part_path, digest):
+        target = self.object_path(digest)
+        types_path = self.types_path(digest)
+        if os.path.exists(target) and os.path.exists(types_path):
+            return True
+        with open(part_path, 'rb') as part:
+            header = part.read(SNIFF_BYTES)
+        types = sorted(extension for extension in self.allowed_extensions if sniff_matches(extension, header))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        deduplicated = os.path.exists(target)
+        if not deduplicated:
+            os.replace(part_path, target)
+        # Written after the object, so a types file always describes a complete object
+        with open(types_path + '.tmp', 'w') as f:
+            json.dump(types, f)
+        os.replace(types_path + '.tmp', types_path)
+        return deduplicated
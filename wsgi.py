@@ -1,10 +1,8 @@
-from app import app, db
+from app import create_app
 
-# This is important for initializing the app when run with Gunicorn
-# It ensures any initialization code runs when the WSGI app is loaded
-with app.app_context():
-    # Ensure database tables exist
-    db.create_all()
+# The database schema is managed by migrations, which the Procfile release
+# phase applies with init_db.py, so workers don't touch it at startup
+app = create_app()
 
 if __name__ == "__main__":
     app.run()